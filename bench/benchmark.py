@@ -0,0 +1,179 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Benchmark of the generator. It creates synthetic yml specs (same format as
+#   example/pio.yml) of increasing size and measures the parser and each writer
+#   separately: wall time, CPU time and peak memory (tracemalloc).
+#   The result is printed as a table and can be saved as JSON.
+#
+#########################################################################################
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+my_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(my_path + '/../src')
+
+import yaml
+
+from common import *
+from config import *
+from YmlParser import YmlParser
+from HtmlWriter import HtmlWriter
+from VerilogWriter import VerilogWriter
+from DriverWriter import DriverWriter
+from PythonWriter import PythonWriter
+from Emitter import emitAll
+
+ACCESS = (('R', 'W'), ('W', 'R'), ('W', 'W'))
+
+def genSpec(path, regs, fields=4, fifo=0.05, rsvr=0.1, seed=0):
+    """
+    Write a synthetic yml spec
+    parameter:
+        :param path: the yml file
+        :param regs: number of registers
+        :param fields: average number of fields per register
+        :param fifo: ratio of the FIFOR/FIFOW fields
+        :param rsvr: ratio of the RSVR gaps
+        :param seed: random seed
+    """
+    rand = random.Random(seed)
+    with open(path, 'w') as FILE:
+        FILE.write('register:\n')
+        for r in range(regs):
+            FILE.write(f'  reg{r}:\n')
+            count = max(1, min(REG_WIDTH, round(rand.expovariate(1 / fields))))
+            sizes = [REG_WIDTH // count] * count
+            sizes[-1] += REG_WIDTH - sum(sizes)
+            # leave some left-over bits to the implicit RSVR
+            if count > 1 and rand.random() < rsvr:
+                sizes.pop()
+            # a register has at most one RSVR key: the adjacent gaps are merged, the gaps
+            # after it and at the end move to the implicit left-over RSVR at the top
+            (gap, hasRsvr) = (0, False)
+            for (f, size) in enumerate(sizes):
+                if rand.random() < rsvr:
+                    gap += size
+                    continue
+                if gap and not hasRsvr:
+                    FILE.write(f'    {RSVR}:\n      size: {gap}\n')
+                    hasRsvr = True
+                gap = 0
+                if rand.random() < fifo:
+                    (swtype, hwtype) = rand.choice((('FIFOR', 'W'), ('FIFOW', 'R')))
+                else:
+                    (swtype, hwtype) = rand.choice(ACCESS)
+                FILE.write(f'    field{f}:\n')
+                FILE.write(f'      size: {size}\n')
+                FILE.write(f'      reset: {hex(rand.getrandbits(size))}\n')
+                FILE.write(f'      swtype: {swtype}\n')
+                FILE.write(f'      hwtype: {hwtype}\n')
+                FILE.write(f'      note: field {f} of reg{r}\n')
+            if gap == sum(sizes):
+                # only gaps, the register needs a key
+                FILE.write(f'    {RSVR}:\n      size: {gap}\n')
+
+def measure(func, memory):
+    """
+    Run func and return (result, {wall, cpu, peak})
+    The peak memory (bytes) is measured with tracemalloc, which slows down the run,
+    so the time is measured on a separate run when memory is True.
+    """
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    result = func()
+    stats = {'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu}
+    if memory:
+        tracemalloc.start()
+        func()
+        stats['peak'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return (result, stats)
+
+def benchOne(yml, outdir, memory, stream):
+    """ Benchmark all the stages for one spec """
+    name = 'bench'
+    def parse():
+        parser = YmlParser(yml)
+        parser.parserAllReg()
+        return parser.model
+    (model, parseStats) = measure(parse, memory)
+    stages = {
+        'parserAllReg': parseStats,
+        'writeHtml':    measure(lambda: HtmlWriter(name, outdir).writeHtml(model), memory)[1],
+        'writeVerilog': measure(lambda: VerilogWriter(name, outdir).writeVerilog(model), memory)[1],
+        'writeDriver':  measure(lambda: DriverWriter(name, outdir).writeDriver(model), memory)[1],
+        'writePython':  measure(lambda: PythonWriter(name, outdir).writePython(model), memory)[1],
+    }
+    def streamAll():
+        parser = YmlParser(yml)
+        emitters = [HtmlWriter(name, outdir), VerilogWriter(name, outdir), DriverWriter(name, outdir),
+                    PythonWriter(name, outdir)]
+        emitAll(parser.model, emitters, parser.streamAllReg())
+    if stream:
+        stages['stream'] = measure(streamAll, memory)[1]
+    fields = sum(len(reg.fields) for reg in model)
+    return (len(model), fields, stages)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simple CSR Generator benchmark.')
+    parser.add_argument('-regs', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                        help='Number of registers of each spec (default: 10 100 1000 10000)')
+    parser.add_argument('-fields', type=float, default=4,
+                        help='Average number of fields per register (default: 4)')
+    parser.add_argument('-fifo', type=float, default=0.05,
+                        help='Ratio of the FIFO fields (default: 0.05)')
+    parser.add_argument('-rsvr', type=float, default=0.1,
+                        help='Ratio of the RSVR gaps (default: 0.1)')
+    parser.add_argument('-seed', type=int, default=0, help='Random seed')
+    parser.add_argument('-nomem', action='store_true', help='Do not measure the peak memory')
+    parser.add_argument('-stream', action='store_true', help='Also measure the streaming mode')
+    parser.add_argument('-json', type=str, help='Save the result to a JSON file')
+    parser.add_argument('-spec', type=str, help='Only write the spec with the first -regs value to this file')
+    args = parser.parse_args(argv)
+
+    if args.spec:
+        genSpec(args.spec, args.regs[0], args.fields, args.fifo, args.rsvr, args.seed)
+        return 0
+
+    result = {
+        'version': VERSION,
+        'python': platform.python_version(),
+        'pyyaml': yaml.__version__,
+        'libyaml': yaml.__with_libyaml__,
+        'params': {'fields': args.fields, 'fifo': args.fifo, 'rsvr': args.rsvr, 'seed': args.seed},
+        'results': [],
+    }
+    print(f"{'regs':>8} {'fields':>9} {'stage':>14} {'wall(s)':>9} {'cpu(s)':>9} {'peak(MB)':>9}")
+    with tempfile.TemporaryDirectory() as outdir:
+        for regs in args.regs:
+            yml = outdir + '/bench.yml'
+            genSpec(yml, regs, args.fields, args.fifo, args.rsvr, args.seed)
+            (nregs, nfields, stages) = benchOne(yml, outdir, not args.nomem, args.stream)
+            result['results'].append({'regs': nregs, 'fields': nfields,
+                                      'spec_bytes': os.path.getsize(yml), 'stages': stages})
+            for (stage, stats) in stages.items():
+                peak = f"{stats['peak'] / 2**20:9.1f}" if 'peak' in stats else f"{'-':>9}"
+                print(f"{nregs:>8} {nfields:>9} {stage:>14} {stats['wall']:9.3f} {stats['cpu']:9.3f} {peak}")
+
+    if args.json:
+        with open(args.json, 'w') as FILE:
+            json.dump(result, FILE, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,408 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Throughput check of the bus adapters (-bus axil, -bus apb). It creates a spec of
+#   SW RW registers (half of them in a RAM with a read_stages pipeline stage) and a
+#   prefetched FIFOR register, generates the CSR module and the adapters, and simulates
+#   them with a testbench driving back to back transactions (iverilog or verilator).
+#   The read data is checked and the transactions per cycle of each phase are
+#   compared with the expected throughput: 1 per cycle for AXI4-Lite, 1 per 2 cycles
+#   for APB (the setup and access phases, plus the read latency for the reads).
+#   The FIFO returns a counter, so a read popping the FIFO twice or not at all is seen.
+#
+#########################################################################################
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+my_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(my_path + '/../src')
+
+from common import *
+from config import *
+import main as generator
+
+# Transactions of each phase, the first and last cycles are the latency of the pipeline
+TRANSACTIONS = 256
+# Margin of the measured throughput for the latency of the first transaction
+MARGIN = 0.95
+
+def ramCount(regs, readMux, readStages) -> int:
+    """ Number of the registers stored in a RAM, the RAM needs a pipeline stage of the read mux tree """
+    return regs // 2 if readMux and readStages and regs // 2 > 1 else 0
+
+def genSpec(path, regs, width, readMux, readStages):
+    """
+    Write a spec of SW RW / HW RO registers, the last ones are a register array in a RAM
+    (ramCount), followed by a FIFOR register with prefetch at the address of register regs
+    parameter:
+        :param path: the yml file
+        :param regs: number of SW RW registers
+        :param width: register width
+        :param readMux: read_mux of the config section, 0 for the flat read mux
+        :param readStages: read_stages of the config section
+    """
+    ram = ramCount(regs, readMux, readStages)
+    with open(path, 'w') as FILE:
+        FILE.write('config:\n')
+        FILE.write(f'  reg_width: {width}\n')
+        FILE.write(f'  read_mux: {readMux}\n')
+        FILE.write(f'  read_stages: {readStages}\n')
+        FILE.write('register:\n')
+        for r in range(regs - ram):
+            FILE.write(f'  reg{r}:\n')
+            FILE.write(f'    data: {{size: {width}, reset: 0, swtype: W, hwtype: R, note: data {r}}}\n')
+        if ram:
+            FILE.write('  mem:\n')
+            FILE.write(f'    count: {ram}\n')
+            FILE.write('    storage: ram\n')
+            FILE.write(f'    data: {{size: {width}, reset: 0, swtype: W, hwtype: R, note: data in RAM}}\n')
+        FILE.write('  rxfifo:\n')
+        FILE.write('    fifo: {prefetch: true}\n')
+        FILE.write(f'    data: {{size: {width}, reset: 0, swtype: FIFOR, hwtype: R, note: FIFO data}}\n')
+
+def tbCommon(regs, width, stride, addrWidth):
+    """ The declarations shared by the testbenches: clock, reset and the register pattern """
+    return f'''module tb;
+
+  localparam REGS = {regs};
+  localparam N    = {TRANSACTIONS};
+  localparam AW   = {addrWidth};
+  localparam DW   = {width};
+
+  reg              clk = 1'b0;
+  reg              reset = 1'b1;
+  integer          cycle = 0;
+  integer          errors = 0;
+  always #5 clk = ~clk;
+  always @(posedge clk) cycle <= cycle + 1;
+
+  // value written to a register in a phase
+  function [DW-1:0] pattern(input integer r, input integer p);
+    integer i;
+    begin
+      for (i = 0; i < DW / 32; i = i + 1)
+        pattern[i*32 +: 32] = (r + 1) * 32'h9e3779b1 ^ (p << 16) ^ i;
+    end
+  endfunction
+
+  function [AW-1:0] address(input integer r);
+    address = r * {stride};
+  endfunction
+'''
+
+def tbCsr(name, readMux, ram):
+    """
+    The CSR module instance. The HW read port of the RAM is idle, the FIFO is always
+    valid and returns a counter, the other HW ports are left unconnected
+    """
+    rdy = '\n    .i_sw_rdready(sw_rdready), .o_sw_rdready(), .o_sw_rdvalid(sw_rdvalid),' if readMux else ''
+    handshake = '\n  wire             sw_rdready;\n  wire             sw_rdvalid;' if readMux else ''
+    ramPort = f"\n    .i_hw_mem_ram_read(1'b0), .i_hw_mem_ram_addr({(ram - 1).bit_length()}'d0)," if ram else ''
+    return f'''
+  wire    [AW-1:0] sw_address;
+  wire             sw_read;
+  wire             sw_write;
+  wire             sw_select;
+  wire    [DW-1:0] sw_wrdata;
+  wire    [DW-1:0] sw_rddata;{handshake}
+
+  // FIFO of the rxfifo register, word i is i
+  reg     [DW-1:0] fifo_data = 0;
+  wire             fifo_read;
+  always @(posedge clk) if (fifo_read & ~reset) fifo_data <= fifo_data + 1;
+
+  {name}_csr u_csr (
+    .clk(clk), .reset(reset),
+    .i_sw_address(sw_address), .i_sw_read(sw_read), .i_sw_write(sw_write), .i_sw_select(sw_select),{rdy}
+    .i_sw_wrdata(sw_wrdata), .o_sw_rddata(sw_rddata),{ramPort}
+    .o_hw_rxfifo_data_fifo_read(fifo_read), .i_hw_rxfifo_data_fifo_read_data(fifo_data),
+    .i_hw_rxfifo_data_fifo_read_valid(1'b1));
+'''
+
+def tbBridgeSw(readMux):
+    """ The SW interface connection of the bridge """
+    rdy = '\n    .o_sw_rdready(sw_rdready), .i_sw_rdvalid(sw_rdvalid),' if readMux else ''
+    return f'''
+    .o_sw_address(sw_address), .o_sw_read(sw_read), .o_sw_write(sw_write), .o_sw_select(sw_select),{rdy}
+    .o_sw_wrdata(sw_wrdata), .i_sw_rddata(sw_rddata));
+'''
+
+def tbAxil(name, regs, width, stride, addrWidth, readMux, ram):
+    """
+    AXI4-Lite testbench: the master keeps the valids high and the readies high,
+    the transactions of a phase go to the registers [base, base + count), or the
+    reads to the FIFOR register
+    """
+    return tbCommon(regs, width, stride, addrWidth) + tbCsr(name, readMux, ram) + f'''
+  // phase setting
+  reg              start = 1'b0;
+  integer          n_wr = 0;
+  integer          n_rd = 0;
+  integer          wr_base = 0;
+  integer          wr_count = 1;
+  integer          wr_phase = 0;
+  integer          rd_base = 0;
+  integer          rd_count = 1;
+  integer          rd_phase = 0;
+  integer          rd_fifo = 0;
+  // master counters
+  integer          aw_n = 0;
+  integer          w_n = 0;
+  integer          b_n = 0;
+  integer          ar_n = 0;
+  integer          r_n = 0;
+  integer          t_first = -1;
+  integer          t_last = 0;
+
+  wire             awvalid = ~start & (aw_n < n_wr);
+  wire    [AW-1:0] awaddr = address(wr_base + aw_n % wr_count);
+  wire             wvalid = ~start & (w_n < n_wr);
+  wire    [DW-1:0] wdata = pattern(wr_base + w_n % wr_count, wr_phase);
+  wire             arvalid = ~start & (ar_n < n_rd);
+  wire    [AW-1:0] araddr = address(rd_fifo ? REGS : rd_base + ar_n % rd_count);
+  wire    [DW-1:0] rexpect = rd_fifo ? r_n : pattern(rd_base + r_n % rd_count, rd_phase);
+  wire             awready;
+  wire             wready;
+  wire             arready;
+  wire             bvalid;
+  wire    [1:0]    bresp;
+  wire             rvalid;
+  wire    [DW-1:0] rdata;
+  wire    [1:0]    rresp;
+
+  {name}_csr_axil u_axil (
+    .clk(clk), .reset(reset),
+    .s_axil_awaddr(awaddr), .s_axil_awprot(3'b0), .s_axil_awvalid(awvalid), .s_axil_awready(awready),
+    .s_axil_wdata(wdata), .s_axil_wstrb({{(DW/8){{1'b1}}}}), .s_axil_wvalid(wvalid), .s_axil_wready(wready),
+    .s_axil_bresp(bresp), .s_axil_bvalid(bvalid), .s_axil_bready(1'b1),
+    .s_axil_araddr(araddr), .s_axil_arprot(3'b0), .s_axil_arvalid(arvalid), .s_axil_arready(arready),
+    .s_axil_rdata(rdata), .s_axil_rresp(rresp), .s_axil_rvalid(rvalid), .s_axil_rready(1'b1),{tbBridgeSw(readMux)}
+  always @(posedge clk) begin
+    if (start) begin
+      aw_n <= 0;
+      w_n <= 0;
+      b_n <= 0;
+      ar_n <= 0;
+      r_n <= 0;
+      t_first <= -1;
+    end
+    else begin
+      if (awvalid & awready) aw_n <= aw_n + 1;
+      if (wvalid & wready) w_n <= w_n + 1;
+      if (arvalid & arready) ar_n <= ar_n + 1;
+      if ((awvalid & awready | arvalid & arready) && t_first < 0) t_first <= cycle;
+      if (bvalid) begin
+        if (bresp != 2'b00) errors = errors + 1;
+        b_n <= b_n + 1;
+        t_last <= cycle;
+      end
+      if (rvalid) begin
+        if (rdata !== rexpect || rresp != 2'b00) begin
+          errors = errors + 1;
+          $display("ERROR: read %0d of register %0d: %h, expected %h", r_n, rd_fifo ? REGS : rd_base + r_n % rd_count,
+                   rdata, rexpect);
+        end
+        r_n <= r_n + 1;
+        t_last <= cycle;
+      end
+    end
+  end
+
+  task phase(input [8*8-1:0] label, input integer nw, input integer wb, input integer wc, input integer wp,
+             input integer nr, input integer rb, input integer rc, input integer rp, input integer rf);
+    begin
+      @(negedge clk);
+      n_wr = nw; wr_base = wb; wr_count = wc; wr_phase = wp;
+      n_rd = nr; rd_base = rb; rd_count = rc; rd_phase = rp; rd_fifo = rf;
+      start = 1'b1;
+      @(negedge clk);
+      start = 1'b0;
+      wait (b_n == n_wr && r_n == n_rd);
+      @(negedge clk);
+      $display("THROUGHPUT %0s %0d %0d", label, n_wr + n_rd, t_last - t_first + 1);
+    end
+  endtask
+
+  initial begin
+    repeat (4) @(negedge clk);
+    reset = 1'b0;
+    phase("write", N, 0, REGS, 1, 0, 0, 1, 0, 0);
+    phase("read", 0, 0, 1, 0, N, 0, REGS, 1, 0);
+    // the writes and the reads go to different registers
+    phase("mixed", N, 0, REGS / 2, 2, N, REGS / 2, REGS / 2, 1, 0);
+    phase("check", 0, 0, 1, 0, REGS / 2, 0, REGS / 2, 2, 0);
+    // back to back reads of the FIFOR register, one FIFO word each
+    phase("fifo", 0, 0, 1, 0, N, 0, 1, 0, 1);
+    $display("ERRORS %0d", errors);
+    $finish;
+  end
+
+endmodule
+'''
+
+def tbApb(name, regs, width, stride, addrWidth, readMux, ram):
+    """
+    APB testbench: back to back transfers, PSEL stays high between the transfers.
+    The writes then the reads of all the registers, then the reads of the FIFOR register
+    """
+    return tbCommon(regs, width, stride, addrWidth) + tbCsr(name, readMux, ram) + f'''
+  reg              start = 1'b0;
+  reg              fifo = 1'b0;
+  integer          n_xfer = 0;
+  integer          xfer = 0;
+  integer          t_first = -1;
+  integer          t_last = 0;
+  reg              psel = 1'b0;
+  reg              penable = 1'b0;
+  wire             pwrite = ~fifo & (xfer < n_xfer / 2);   // the writes then the reads
+  wire             pready;
+  wire             pslverr;
+  wire    [DW-1:0] prdata;
+  wire    [AW-1:0] paddr = address(fifo ? REGS : xfer % REGS);
+  wire    [DW-1:0] pwdata = pattern(xfer % REGS, 1);
+  wire    [DW-1:0] pexpect = fifo ? xfer : pwdata;
+
+  {name}_csr_apb u_apb (
+    .clk(clk), .reset(reset),
+    .s_apb_paddr(paddr), .s_apb_pprot(3'b0), .s_apb_psel(psel), .s_apb_penable(penable),
+    .s_apb_pwrite(pwrite), .s_apb_pwdata(pwdata), .s_apb_pstrb({{(DW/8){{1'b1}}}}),
+    .s_apb_prdata(prdata), .s_apb_pready(pready), .s_apb_pslverr(pslverr),{tbBridgeSw(readMux)}
+  always @(posedge clk) begin
+    if (start) begin
+      xfer <= 0;
+      psel <= 1'b0;
+      penable <= 1'b0;
+      t_first <= -1;
+    end
+    else if (~psel) begin
+      psel <= xfer < n_xfer;
+    end
+    else if (~penable) begin
+      penable <= 1'b1;
+      if (t_first < 0) t_first <= cycle;
+    end
+    else if (pready) begin
+      if (pslverr || ~pwrite && prdata !== pexpect) begin
+        errors = errors + 1;
+        $display("ERROR: transfer %0d of register %0d: %h, expected %h", xfer, fifo ? REGS : xfer % REGS,
+                 prdata, pexpect);
+      end
+      xfer <= xfer + 1;
+      psel <= xfer + 1 < n_xfer;
+      penable <= 1'b0;
+      t_last <= cycle;
+    end
+  end
+
+  initial begin
+    repeat (4) @(negedge clk);
+    reset = 1'b0;
+    @(negedge clk);
+    n_xfer = 2 * REGS;
+    start = 1'b1;
+    @(negedge clk);
+    start = 1'b0;
+    wait (xfer == n_xfer);
+    @(negedge clk);
+    $display("THROUGHPUT %0s %0d %0d", "write+read", n_xfer, t_last - t_first + 1);
+    // back to back reads of the FIFOR register, one FIFO word each
+    fifo = 1'b1;
+    n_xfer = N;
+    start = 1'b1;
+    @(negedge clk);
+    start = 1'b0;
+    wait (xfer == n_xfer);
+    @(negedge clk);
+    $display("THROUGHPUT %0s %0d %0d", "fifo", n_xfer, t_last - t_first + 1);
+    $display("ERRORS %0d", errors);
+    $finish;
+  end
+
+endmodule
+'''
+
+def simulate(simulator, files, workdir):
+    """ Compile and run the testbench, return the output """
+    if simulator == 'iverilog':
+        subprocess.run(['iverilog', '-g2005', '-o', workdir + '/tb.vvp'] + files, check=True)
+        cmd = ['vvp', '-n', workdir + '/tb.vvp']
+    else:
+        subprocess.run(['verilator', '--binary', '-Wno-fatal', '--top-module', 'tb',
+                        '--Mdir', workdir + '/obj_dir'] + files, check=True, stdout=subprocess.DEVNULL)
+        cmd = [workdir + '/obj_dir/Vtb']
+    return subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simple CSR Generator bus adapter throughput check.')
+    parser.add_argument('-regs', type=int, default=64, help='Number of registers (default: 64)')
+    parser.add_argument('-reg_width', type=int, default=REG_WIDTH, choices=REG_WIDTHS,
+                        help=f'Register width (default: {REG_WIDTH})')
+    parser.add_argument('-read_mux', type=int, default=READ_MUX,
+                        help='read_mux of the spec, 0 for the flat read mux (default: 0)')
+    parser.add_argument('-read_stages', type=int, default=READ_STAGES,
+                        help='read_stages of the spec (default: 0)')
+    parser.add_argument('-sim', type=str, choices=('iverilog', 'verilator'),
+                        help='Simulator (default: the first one found)')
+    parser.add_argument('-keep', type=str, help='Keep the spec, the outputs and the testbenches in this directory')
+    args = parser.parse_args(argv)
+
+    simulator = args.sim or next((sim for sim in ('iverilog', 'verilator') if shutil.which(sim)), None)
+    if simulator == None or not shutil.which(simulator):
+        print('ERROR: iverilog or verilator is needed to run the testbenches', file=sys.stderr)
+        return 1
+
+    workdir = args.keep or tempfile.mkdtemp()
+    os.makedirs(workdir, exist_ok=True)
+    name = 'bus'
+    yml = workdir + f'/{name}.yml'
+    genSpec(yml, args.regs, args.reg_width, args.read_mux, args.read_stages)
+    outdir = workdir + f'/{name}_csr'
+    if generator.main([yml, '-outdir', outdir, '-only', 'rtl', '-bus', 'axil', '-bus', 'apb', '-force', '-jobs', '1']):
+        return 1
+    stride = args.reg_width // 8
+    # the FIFOR register is after the SW RW registers
+    addrWidth = max(1, ((args.regs + 1) * stride - 1).bit_length())
+    ram = ramCount(args.regs, args.read_mux, args.read_stages)
+    latency = 1 + args.read_stages if args.read_mux else 1
+    # APB: 2 cycles per write, the setup phase and the read latency per read
+    expected = {'axil': 1.0, 'apb': 2 / (3 + latency), 'apb fifo': 1 / (1 + latency)}
+    status = 0
+    print(f"{'bus':<6} {'phase':<12} {'transactions':>12} {'cycles':>8} {'per cycle':>10} {'expected':>10}")
+    for (bus, writeTb) in (('axil', tbAxil), ('apb', tbApb)):
+        tb = workdir + f'/tb_{bus}.v'
+        with open(tb, 'w') as FILE:
+            FILE.write(writeTb(name, args.regs, args.reg_width, stride, addrWidth, args.read_mux, ram))
+        files = [tb, outdir + f'/{name}{RTL_SUFFIX}.v', outdir + f'/{name}{RTL_SUFFIX}_{bus}.v']
+        output = simulate(simulator, files, workdir)
+        for line in output.splitlines():
+            if line.startswith('ERROR'):
+                print(f'{bus}: {line}')
+        for (phase, count, cycles) in re.findall(r'^THROUGHPUT (\S+) (\d+) (\d+)', output, re.M):
+            rate = int(count) / int(cycles)
+            target = expected.get(f'{bus} {phase}', expected[bus])
+            print(f'{bus:<6} {phase:<12} {count:>12} {cycles:>8} {rate:10.3f} {target:10.3f}')
+            if rate < target * MARGIN:
+                print(f'ERROR: {bus}: {phase} is below the expected throughput', file=sys.stderr)
+                status = 1
+        errors = re.search(r'^ERRORS (\d+)', output, re.M)
+        if not errors or int(errors.group(1)):
+            print(f'ERROR: {bus}: the read data check failed', file=sys.stderr)
+            status = 1
+    if not args.keep:
+        shutil.rmtree(workdir)
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
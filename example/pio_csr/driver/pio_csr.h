@@ -30,6 +30,7 @@
 // =============================================
 #define PIO__PIO_WRITE
 #define PIO__PIO_WRITE_ADDR                                 0x4
+#define PIO__PIO_WRITE_SHADOW                               0
 
 // Field: DATA, Offset: 0, Size: 32
 #define PIO__PIO_WRITE__DATA__OFT                           0
@@ -38,9 +39,17 @@
         ((data & PIO__PIO_WRITE__DATA__MASK) >> PIO__PIO_WRITE__DATA__OFT)
 #define PIO__PIO_WRITE__DATA__set(DATA) \
         ((DATA << PIO__PIO_WRITE__DATA__OFT) & PIO__PIO_WRITE__DATA__MASK)
+#define PIO__PIO_WRITE__DATA__update(regs, shadow, DATA) \
+        PIO_shadow_update(&(regs)->pio_write, shadow, PIO__PIO_WRITE_SHADOW, PIO__PIO_WRITE__DATA__MASK, PIO__PIO_WRITE__DATA__set(DATA))
+#define PIO__PIO_WRITE__DATA__stage(shadow, DATA) \
+        PIO_shadow_stage(shadow, PIO__PIO_WRITE_SHADOW, PIO__PIO_WRITE__DATA__MASK, PIO__PIO_WRITE__DATA__set(DATA))
 
 #define PIO__PIO_WRITE__set(DATA) (\
         PIO__PIO_WRITE__DATA__set(DATA))
+#define PIO__PIO_WRITE__update(regs, shadow, mask, value) \
+        PIO_shadow_update(&(regs)->pio_write, shadow, PIO__PIO_WRITE_SHADOW, mask, value)
+#define PIO__PIO_WRITE__stage(shadow, mask, value) \
+        PIO_shadow_stage(shadow, PIO__PIO_WRITE_SHADOW, mask, value)
 
 
 // =============================================
@@ -79,3 +88,102 @@
         PIO__PIO_CTRL_STATUS__LEVEL_CAPTURE_EN__set(LEVEL_CAPTURE_EN))
 
 
+// =============================================
+// Register block overlay: (PIO_regs_t *)<address of the CSR module>
+// =============================================
+#include <stdint.h>
+#include <stddef.h>
+
+typedef struct {
+    volatile uint32_t pio_read;                             // 0x0
+    volatile uint32_t pio_write;                            // 0x4
+    volatile uint32_t pio_ctrl_status;                      // 0x8
+} PIO_regs_t;
+
+#ifdef __cplusplus
+#define PIO_STATIC_ASSERT static_assert
+#else
+#define PIO_STATIC_ASSERT _Static_assert
+#endif
+PIO_STATIC_ASSERT(offsetof(PIO_regs_t, pio_read) == PIO__PIO_READ_ADDR, "pio_read offset");
+PIO_STATIC_ASSERT(offsetof(PIO_regs_t, pio_write) == PIO__PIO_WRITE_ADDR, "pio_write offset");
+PIO_STATIC_ASSERT(offsetof(PIO_regs_t, pio_ctrl_status) == PIO__PIO_CTRL_STATUS_ADDR, "pio_ctrl_status offset");
+PIO_STATIC_ASSERT(sizeof(PIO_regs_t) == 0xc, "PIO_regs_t size");
+
+
+// Read or write count contiguous registers from the register at address addr, in one loop
+// (for a burst or a DMA like copy). Beware that a read of a FIFOR register pops the FIFO.
+static inline void PIO_read_regs(const volatile PIO_regs_t *regs, size_t addr, uint32_t *buf, size_t count)
+{
+    const volatile uint32_t *src = (const volatile uint32_t *)regs + addr / 4;
+    size_t i;
+    for (i = 0; i < count; i++)
+        buf[i] = src[i];
+}
+
+static inline void PIO_write_regs(volatile PIO_regs_t *regs, size_t addr, const uint32_t *buf, size_t count)
+{
+    volatile uint32_t *dst = (volatile uint32_t *)regs + addr / 4;
+    size_t i;
+    for (i = 0; i < count; i++)
+        dst[i] = buf[i];
+}
+
+
+// =============================================
+// Shadow of the SW RW registers (no HW written field), define PIO_SHADOW to use it.
+// The read-modify-write of a field is done on the shadow, without reading the register.
+// =============================================
+#ifdef PIO_SHADOW
+#define PIO_SHADOW_COUNT                                    1
+#define PIO_SHADOW_WORDS                                    1
+
+typedef struct {
+    uint32_t value[PIO_SHADOW_COUNT];
+    uint32_t dirty[PIO_SHADOW_WORDS];  // registers changed since the last flush
+} PIO_shadow_t;
+
+// Set the shadow to the reset values of the registers
+static inline void PIO_shadow_init(PIO_shadow_t *shadow)
+{
+    static const uint32_t reset[PIO_SHADOW_COUNT] = {
+        0xdeadbeef
+    };
+    size_t i;
+    for (i = 0; i < PIO_SHADOW_COUNT; i++)
+        shadow->value[i] = reset[i];
+    for (i = 0; i < PIO_SHADOW_WORDS; i++)
+        shadow->dirty[i] = 0;
+}
+
+// Change the bits of mask of the register i in the shadow and write the register
+static inline void PIO_shadow_update(volatile uint32_t *reg, PIO_shadow_t *shadow, size_t i, uint32_t mask, uint32_t value)
+{
+    shadow->value[i] = (shadow->value[i] & ~mask) | (value & mask);
+    *reg = shadow->value[i];
+}
+
+// Change the bits of mask of the register i in the shadow, the register is written by the flush
+static inline void PIO_shadow_stage(PIO_shadow_t *shadow, size_t i, uint32_t mask, uint32_t value)
+{
+    shadow->value[i] = (shadow->value[i] & ~mask) | (value & mask);
+    shadow->dirty[i / 32] |= (uint32_t)1 << (i % 32);
+}
+
+// Write the registers changed in the shadow since the last flush
+static inline void PIO_shadow_flush(volatile PIO_regs_t *regs, PIO_shadow_t *shadow)
+{
+    static const uint32_t addr[PIO_SHADOW_COUNT] = {
+        PIO__PIO_WRITE_ADDR
+    };
+    volatile uint32_t *base = (volatile uint32_t *)regs;
+    size_t w, i;
+    for (w = 0; w < PIO_SHADOW_WORDS; w++) {
+        uint32_t dirty = shadow->dirty[w];
+        shadow->dirty[w] = 0;
+        for (i = w * 32; dirty; i++, dirty >>= 1)
+            if (dirty & 1)
+                base[addr[i] / 4] = shadow->value[i];
+    }
+}
+#endif
@@ -0,0 +1,127 @@
+######################################################
+#
+# Register tables of the pio CSR module
+# Generated by Simple CSR Generator
+# Created: 11/1/2020 18:5
+#
+######################################################
+
+"""
+Registers of the pio CSR module.
+
+REGS:   register name -> (address, count, stride)
+FIELDS: register name -> ((field name, offset, mask, SW type, HW type, reset),)
+        the mask is not shifted, the reserved fields are not listed
+RESET:  register name -> reset value of the register word
+"""
+
+from bisect import bisect_right
+
+NAME                                                        = 'pio'
+REG_WIDTH                                                   = 32
+REG_BYTES                                                   = 4
+ADDR_WIDTH                                                  = 4
+READ_LATENCY                                                = 1
+
+
+# Register: pio_read, Address: 0x0
+PIO_READ_ADDR                                               = 0x0
+PIO_READ__DATA__OFT                                         = 0
+PIO_READ__DATA__MASK                                        = 0xffffffff
+
+# Register: pio_write, Address: 0x4
+PIO_WRITE_ADDR                                              = 0x4
+PIO_WRITE__DATA__OFT                                        = 0
+PIO_WRITE__DATA__MASK                                       = 0xffffffff
+
+# Register: pio_ctrl_status, Address: 0x8
+PIO_CTRL_STATUS_ADDR                                        = 0x8
+PIO_CTRL_STATUS__LEVEL_CAPTURE_EN__OFT                      = 0
+PIO_CTRL_STATUS__LEVEL_CAPTURE_EN__MASK                     = 0x1
+PIO_CTRL_STATUS__LEVEL_CAPTURED__OFT                        = 16
+PIO_CTRL_STATUS__LEVEL_CAPTURED__MASK                       = 0x10000
+PIO_CTRL_STATUS__SAMPLE__OFT                                = 17
+PIO_CTRL_STATUS__SAMPLE__MASK                               = 0x7ffe0000
+
+
+REGS = {
+    'pio_read': (0x0, 1, 0x4),
+    'pio_write': (0x4, 1, 0x4),
+    'pio_ctrl_status': (0x8, 1, 0x4),
+}
+
+FIELDS = {
+    'pio_read': (
+        ('data', 0, 0xffffffff, 'R', 'W', 0x0),
+    ),
+    'pio_write': (
+        ('data', 0, 0xffffffff, 'W', 'R', 0xdeadbeef),
+    ),
+    'pio_ctrl_status': (
+        ('level_capture_en', 0, 0x1, 'W', 'R', 0x1),
+        ('level_captured', 16, 0x1, 'R', 'W', 0x0),
+        ('sample', 17, 0x3fff, 'W', 'W', 0xab),
+    ),
+}
+
+RESET = {
+    'pio_read': 0x0,
+    'pio_write': 0xdeadbeef,
+    'pio_ctrl_status': 0x1560001,
+}
+
+# address ranges (start, end, stride, register name), sorted by address
+_STARTS = (
+    0x0, 0x4, 0x8,
+)
+_RANGES = (
+    (0x0, 0x4, 0x4, 'pio_read'),
+    (0x4, 0x8, 0x4, 'pio_write'),
+    (0x8, 0xc, 0x4, 'pio_ctrl_status'),
+)
+
+
+def unpack(reg, value):
+    """ Split a register word into a dict of its field values """
+    return {name: value >> lsb & mask for (name, lsb, mask, swtype, hwtype, reset) in FIELDS[reg]}
+
+
+def pack(reg, fields, value=None):
+    """
+    Build a register word from its field values
+    Parameters:
+        :param reg: register name
+        :param fields: dict of field name: field value, the value is truncated to the field
+        :param value: the word whose fields are changed, default is the reset value
+    """
+    value = RESET[reg] if value == None else value
+    found = 0
+    for (name, lsb, mask, swtype, hwtype, reset) in FIELDS[reg]:
+        if name in fields:
+            value = value & ~(mask << lsb) | (fields[name] & mask) << lsb
+            found += 1
+    if found != len(fields):
+        names = [name for (name, lsb, mask, swtype, hwtype, reset) in FIELDS[reg]]
+        raise KeyError(f'{reg} has no field {", ".join(set(fields) - set(names))}')
+    return value
+
+
+def decode(addr):
+    """
+    Find the register at a byte address
+    Return:
+        :(register name, index in the register array), None for an unmapped address
+    """
+    i = bisect_right(_STARTS, addr) - 1
+    if i < 0:
+        return None
+    (start, end, stride, name) = _RANGES[i]
+    if addr >= end or (addr - start) % stride:
+        return None
+    return (name, (addr - start) // stride)
+
+
+def unpackAt(addr, value):
+    """ Split the word read at a byte address into a dict of its field values, None if unmapped """
+    reg = decode(addr)
+    return None if reg == None else unpack(reg[0], value)
@@ -0,0 +1,132 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Address allocation of the registers and the named address blocks.
+#   A register, a register array or a block without offset is placed right after
+#   the previous one of the same block. The overlaps are found by sorting the
+#   address intervals of each block, so a map of n registers is checked in O(n log n).
+#
+#########################################################################################
+
+from common import *
+from config import *
+
+class AddressMap(object):
+
+    def __init__(self, stride=REG_WIDTH // 8):
+        """
+        Parameters:
+            :param stride: size of a register in bytes
+        """
+        self.stride = stride
+        self.errors = []
+        self.end    = 0     # highest mapped address + 1
+        # the open blocks: [name, base, next address, size, intervals [(start, end, name),]]
+        self.scopes = [['', 0, 0, None, []]]
+
+    def fullName(self, name) -> str:
+        """ The name prefixed by the names of the enclosing blocks """
+        return '_'.join([scope[0] for scope in self.scopes[1:]] + [name])
+
+    def resolve(self, name, offset) -> int:
+        """ The address of an item of the current block """
+        scope = self.scopes[-1]
+        if offset == None:
+            return scope[2]
+        if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0 or offset % self.stride:
+            self.errors.append(f'{name}: offset {offset} is not a multiple of {self.stride}')
+            return scope[2]
+        return scope[1] + offset
+
+    def add(self, name, start, end):
+        """ Add an address interval to the current block """
+        scope = self.scopes[-1]
+        scope[2] = end
+        scope[4].append((start, end, name))
+        self.end = max(self.end, end)
+
+    def place(self, reg, offset=None, count=None, stride=None, aliases=0) -> tuple:
+        """
+        Place a register or a register array
+        Parameters:
+            :param reg: register name
+            :param offset: offset from the enclosing block, None to place it after the previous register
+            :param count: number of registers of a register array
+            :param stride: address distance of the registers of a register array, a power of two
+                           (default: the register size). The whole range is reserved for the array.
+            :param aliases: number of alias addresses of a register, they are reserved after the register
+        Return:
+            :(full register name, address, count, stride)
+        """
+        name = self.fullName(reg)
+        addr = self.resolve(name, offset)
+        if count == None:
+            count = 1
+        elif not isinstance(count, int) or isinstance(count, bool) or count <= 0:
+            self.errors.append(f'{name}: count {count} is not a positive integer')
+            count = 1
+        if stride == None:
+            stride = self.stride
+        elif (not isinstance(stride, int) or isinstance(stride, bool) or stride < self.stride
+              or stride & (stride - 1)):
+            self.errors.append(f'{name}: stride {stride} is not a power of two of at least {self.stride}')
+            stride = self.stride
+        if count > 1:
+            aliases = 0
+        self.add(name, addr, addr + count * stride + aliases * self.stride)
+        return (name, addr, count, stride)
+
+    def beginBlock(self, block, offset=None, size=None):
+        """
+        Open a named address block, the following registers are placed in it
+        Parameters:
+            :param block: block name
+            :param offset: offset from the enclosing block, None to place it after the previous register
+            :param size: address range reserved for the block in bytes, None to fit its registers
+        """
+        name = self.fullName(block)
+        base = self.resolve(name, offset)
+        if size != None and (not isinstance(size, int) or isinstance(size, bool) or size <= 0):
+            self.errors.append(f'{name}: block size {size} is not a positive integer')
+            size = None
+        self.scopes.append([block, base, base, size, []])
+
+    def endBlock(self):
+        """ Close the current block """
+        (block, base, end, size, intervals) = self.scopes.pop()
+        name = self.fullName(block)
+        self.checkOverlap(intervals)
+        if size != None:
+            if end > base + size:
+                self.errors.append(f'{name}: registers up to {hex(end)} exceed the block size {hex(size)}')
+            end = max(end, base + size)
+        self.add(name, base, end)
+
+    def checkOverlap(self, intervals):
+        """ Report the overlapping intervals of a block """
+        last = None
+        for interval in sorted(intervals):
+            (start, end, name) = interval
+            if start == end:
+                continue
+            if last and start < last[1]:
+                self.errors.append(f'{name}: address {hex(start)} overlaps {last[2]} at {hex(last[0])}')
+            if not last or end > last[1]:
+                last = interval
+
+    def finish(self) -> int:
+        """
+        Check the whole map, raise SpecError if any error is found
+        Return:
+            :the address width
+        """
+        self.checkOverlap(self.scopes[0][4])
+        if self.errors:
+            raise SpecError(self.errors)
+        return max(1, (self.end - 1).bit_length())
@@ -0,0 +1,87 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Incremental build cache. It records a content hash for the yml spec and for the
+#   input of each writer so that unchanged specs and unaffected outputs are skipped.
+#   All the hashes are salted with the generator version, a hash of the generator
+#   sources and the options, so a new generator regenerates all the outputs.
+#
+#########################################################################################
+
+import hashlib
+import json
+import os
+from glob import glob
+
+from common import *
+from config import *
+
+def sourceHash() -> str:
+    """ Hash of the generator sources (src/*.py) """
+    digest = hashlib.sha256()
+    for path in sorted(glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        with open(path, 'rb') as stream:
+            digest.update(os.path.basename(path).encode() + b'\0' + stream.read())
+    return digest.hexdigest()
+
+# Computed once per process, the generator server keeps it for all its requests
+SOURCE_HASH = sourceHash()
+
+class BuildCache(object):
+
+    def __init__(self, path, options):
+        """
+        Parameters:
+            :param path: the path to the cache file
+            :param options: dict of the options affecting the output
+        """
+        self.path = path
+        self.salt = repr((VERSION, SOURCE_HASH, REG_WIDTH, SOURCE_DATE_EPOCH, sorted(options.items())))
+        self.entries = self.load()
+
+    def load(self) -> dict:
+        """ Load the cache file, an unreadable cache is treated as empty """
+        try:
+            with open(self.path, 'r') as stream:
+                return json.load(stream)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """ Save the cache file """
+        writeFile(self.path, json.dumps(self.entries, indent=2, sort_keys=True))
+
+    def hashBytes(self, data) -> str:
+        """ Hash the data together with the salt """
+        return hashlib.sha256(self.salt.encode() + data).hexdigest()
+
+    def hashFile(self, path) -> str:
+        """ Hash the content of a file """
+        with open(path, 'rb') as stream:
+            return self.hashBytes(stream.read())
+
+    def hashInfo(self, info) -> str:
+        """ Hash the info passed to a writer. The info only has list/tuple/str/int so repr is stable """
+        return self.hashBytes(repr(info).encode())
+
+    def hit(self, key, value, output=None) -> bool:
+        """
+        Check if the entry is up to date
+        Parameters:
+            :param key: the entry name
+            :param value: the new hash of the entry
+            :param output: the output file of the entry, it is a miss if the file is gone
+        """
+        if output != None and not os.path.exists(output):
+            return False
+        return self.entries.get(key) == value
+
+    def update(self, key, value):
+        """ Update the entry """
+        self.entries[key] = value
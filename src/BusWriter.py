@@ -0,0 +1,333 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Bus adapters of the CSR module, selected with the -bus option.
+#   Each adapter is a bridge from a standard bus slave port to the SW interface
+#   (i_sw_* / o_sw_*) of the CSR module. It only depends on the address width,
+#   the register width and the read latency of the CSR module.
+#
+#   AXI4-Lite: the AW, W and AR channels are buffered so their ready only depends on
+#   the buffer level, the reads and the writes share the SW interface with a
+#   round robin arbiter, and the read data FIFO has room for all the reads in flight.
+#   One read or write is sent to the CSR module every cycle.
+#   APB: the access is sent to the CSR module in the setup phase, one transfer
+#   every 2 cycles (the minimum of the APB protocol).
+#
+#########################################################################################
+
+from common import *
+from config import *
+from Emitter import *
+
+lines = lambda x: '\n' * x
+
+class BusWriter(Emitter):
+    """ Base class of the bus adapters """
+
+    # Name of the bus, used in the module name and the comments
+    bus = None
+
+    def cacheInfo(self, model):
+        """ The adapter only depends on the widths and the read latency of the CSR module """
+        return (model.addr_width, model.reg_width, model.read_mux, model.read_stages)
+
+    def begin(self, FILE, model):
+        self.addr_width = model.addr_width
+        self.regWidth   = model.reg_width
+        self.readMux    = model.read_mux
+        self.latency    = model.read_latency
+        self.core       = self.name + RTL_SUFFIX
+        self.module     = f'{self.core}_{self.backend}'
+        self.ports      = []
+
+    def end(self, FILE):
+        self.writeHeader(FILE)
+        self.writeModule(FILE)
+
+    def addPort(self, dir, width, name):
+        """
+        Add a verilog IO port
+        parameter:
+            :param dir: 'i' for input, 'o' for output, None for a comment line
+            :param width: the width of the port
+            :param name: the name of the port, or the comment
+        """
+        if dir == None:
+            self.ports.append(INDENT(1) + f'// {name}')
+            return
+        dir = 'input ' if dir == 'i' else 'output'
+        addrRange = f'[{width - 1}:0]' if width > 1 else ''
+        self.ports.append(INDENT(1) + addSpace(dir, 7) + addSpace(addrRange, 10) + name)
+
+    def addCsrPorts(self):
+        """ Add the ports connected to the SW interface of the CSR module """
+        self.addPort(None, 0, f'SW interface of {self.core}, o_sw_* to i_sw_* and i_sw_* to o_sw_*')
+        self.addPort('o', self.addr_width, 'o_sw_address')
+        self.addPort('o', 1, 'o_sw_read')
+        self.addPort('o', 1, 'o_sw_write')
+        self.addPort('o', 1, 'o_sw_select')
+        self.addPort('o', self.regWidth, 'o_sw_wrdata')
+        self.addPort('i', self.regWidth, 'i_sw_rddata')
+        if self.readMux:
+            self.addPort('o', 1, 'o_sw_rdready')
+            self.addPort('i', 1, 'i_sw_rdvalid')
+
+    def writePorts(self, FILE):
+        """ Write the port list, the ',' is not written after a comment or the last port """
+        FILE.write('(\n')
+        last = max(i for (i, port) in enumerate(self.ports) if not port.lstrip().startswith('//'))
+        for (i, port) in enumerate(self.ports):
+            comment = port.lstrip().startswith('//')
+            FILE.write(port + (',' if i < last and not comment else '') + '\n')
+        FILE.write(');\n' + lines(2))
+
+    def writeDeclare(self, FILE, kind, width, name):
+        """ Write a wire or reg declaration """
+        addrRange = f'[{width - 1}:0]' if width > 1 else ''
+        FILE.write(INDENT(1) + addSpace(kind, 7) + addSpace(addrRange, 10) + name + ';\n')
+
+    def writeReadDone(self, FILE, grant):
+        """
+        Write rd_done, high when the read data of the CSR module is on i_sw_rddata
+        parameter:
+            :param grant: the signal sending a read to the CSR module
+        """
+        latency = self.latency
+        if self.readMux:
+            FILE.write(INDENT(1) + '// read data handshake of the CSR module, the read data is always taken\n')
+            FILE.write(INDENT(1) + "assign o_sw_rdready = 1'b1;\n")
+            FILE.write(INDENT(1) + 'assign rd_done = i_sw_rdvalid;\n\n')
+            return
+        FILE.write(INDENT(1) + f'// the read data of the CSR module is {latency} cycle(s) after the read\n')
+        self.writeDeclare(FILE, 'reg', latency, 'rd_issue_q')
+        FILE.write(INDENT(1) + 'always @(posedge clk) begin\n')
+        FILE.write(INDENT(2) + f"if (reset) rd_issue_q <= {latency}'b0;\n")
+        if latency > 1:
+            FILE.write(INDENT(2) + f'else rd_issue_q <= {{rd_issue_q[{latency - 2}:0], {grant}}};\n')
+        else:
+            FILE.write(INDENT(2) + f'else rd_issue_q <= {grant};\n')
+        FILE.write(INDENT(1) + 'end\n')
+        FILE.write(INDENT(1) + f'assign rd_done = rd_issue_q{f"[{latency - 1}]" if latency > 1 else ""};\n\n')
+
+    def writeHeader(self, FILE):
+        FILE.write('///////////////////////////////////////////////////////////////\n')
+        FILE.write('//\n')
+        FILE.write('// Generated by Simple CSR Generator\n')
+        FILE.write('//\n')
+        FILE.write(f'// Name: {self.module}.v\n')
+        FILE.write(f'// Date Created: {MONTH}/{DAY}/{YEAR} - {HOUR}:{MINUTE}\n')
+        FILE.write('//\n')
+        FILE.write('// Description:\n')
+        FILE.write(f'//  {self.bus} bridge to the SW interface of {self.core}\n')
+        FILE.write(f'//  Read latency of {self.core}: {self.latency} cycle(s)\n')
+        FILE.write('//\n')
+        FILE.write('///////////////////////////////////////////////////////////////\n\n\n')
+
+    def writeModule(self, FILE):
+        """ Write the bridge module """
+        pass
+
+class AxiLiteWriter(BusWriter):
+
+    backend = 'axil'
+    suffix  = f'{RTL_SUFFIX}_axil.v'
+    bus     = 'AXI4-Lite'
+
+    def writeFifo(self, FILE):
+        """ Write the FIFO module used by the channel buffers """
+        FILE.write(f'// FIFO of the {self.module} channels, DEPTH >= 2\n')
+        FILE.write(f'module {self.module}_fifo #(parameter WIDTH = 1, parameter DEPTH = 2)\n')
+        FILE.write('(\n')
+        FILE.write(INDENT(1) + 'input                          clk,\n')
+        FILE.write(INDENT(1) + 'input                          reset,\n')
+        FILE.write(INDENT(1) + 'input                          i_push,\n')
+        FILE.write(INDENT(1) + 'input      [WIDTH-1:0]         i_data,\n')
+        FILE.write(INDENT(1) + 'output                         o_full,\n')
+        FILE.write(INDENT(1) + 'input                          i_pop,\n')
+        FILE.write(INDENT(1) + 'output     [WIDTH-1:0]         o_data,\n')
+        FILE.write(INDENT(1) + 'output                         o_empty,\n')
+        FILE.write(INDENT(1) + 'output reg [$clog2(DEPTH+1)-1:0] o_count\n')
+        FILE.write(');\n\n')
+        FILE.write(INDENT(1) + 'reg        [WIDTH-1:0]         mem [0:DEPTH-1];\n')
+        FILE.write(INDENT(1) + 'reg        [$clog2(DEPTH)-1:0] rptr;\n')
+        FILE.write(INDENT(1) + 'reg        [$clog2(DEPTH)-1:0] wptr;\n\n')
+        FILE.write(INDENT(1) + 'assign o_full  = o_count == DEPTH;\n')
+        FILE.write(INDENT(1) + 'assign o_empty = o_count == 0;\n')
+        FILE.write(INDENT(1) + 'assign o_data  = mem[rptr];\n\n')
+        FILE.write(INDENT(1) + 'always @(posedge clk) begin\n')
+        FILE.write(INDENT(2) + 'if (i_push) mem[wptr] <= i_data;\n')
+        FILE.write(INDENT(1) + 'end\n\n')
+        FILE.write(INDENT(1) + 'always @(posedge clk) begin\n')
+        FILE.write(INDENT(2) + 'if (reset) begin\n')
+        FILE.write(INDENT(3) + 'o_count <= 0;\n')
+        FILE.write(INDENT(3) + 'rptr <= 0;\n')
+        FILE.write(INDENT(3) + 'wptr <= 0;\n')
+        FILE.write(INDENT(2) + 'end\n')
+        FILE.write(INDENT(2) + 'else begin\n')
+        FILE.write(INDENT(3) + 'o_count <= o_count + i_push - i_pop;\n')
+        FILE.write(INDENT(3) + 'if (i_push) wptr <= (wptr == DEPTH - 1) ? 0 : wptr + 1;\n')
+        FILE.write(INDENT(3) + 'if (i_pop) rptr <= (rptr == DEPTH - 1) ? 0 : rptr + 1;\n')
+        FILE.write(INDENT(2) + 'end\n')
+        FILE.write(INDENT(1) + 'end\n\n')
+        FILE.write('endmodule\n\n\n')
+
+    def writeChannel(self, FILE, name, width, valid, ready, data, pop):
+        """
+        Write the buffer of an AXI request channel
+        parameter:
+            :param name: the name of the buffer
+            :param width: the width of the data
+            :param valid: the valid of the channel
+            :param ready: the ready of the channel
+            :param data: the data of the channel
+            :param pop: the signal taking the data from the buffer
+        """
+        FILE.write(INDENT(1) + f'{self.module}_fifo #(.WIDTH({width}), .DEPTH(2)) u_{name}_fifo (\n')
+        FILE.write(INDENT(2) + '.clk(clk), .reset(reset),\n')
+        FILE.write(INDENT(2) + f'.i_push({valid} & ~{name}_full), .i_data({data}), .o_full({name}_full),\n')
+        FILE.write(INDENT(2) + f'.i_pop({pop}), .o_data({name}_data), .o_empty({name}_empty), .o_count());\n')
+        FILE.write(INDENT(1) + f'assign {ready} = ~{name}_full;\n\n')
+
+    def writeModule(self, FILE):
+        aw = self.addr_width
+        dw = self.regWidth
+        depth = self.latency + 2        # read data FIFO: the reads in flight and one more for the RREADY delay
+        cw = depth.bit_length()         # width of the FIFO level
+        self.writeFifo(FILE)
+
+        self.addPort('i', 1, 'clk')
+        self.addPort('i', 1, 'reset')
+        self.addPort(None, 0, 'AXI4-Lite slave, WSTRB is ignored (full register writes)')
+        self.addPort('i', aw, 's_axil_awaddr')
+        self.addPort('i', 3, 's_axil_awprot')
+        self.addPort('i', 1, 's_axil_awvalid')
+        self.addPort('o', 1, 's_axil_awready')
+        self.addPort('i', dw, 's_axil_wdata')
+        self.addPort('i', dw // 8, 's_axil_wstrb')
+        self.addPort('i', 1, 's_axil_wvalid')
+        self.addPort('o', 1, 's_axil_wready')
+        self.addPort('o', 2, 's_axil_bresp')
+        self.addPort('o', 1, 's_axil_bvalid')
+        self.addPort('i', 1, 's_axil_bready')
+        self.addPort('i', aw, 's_axil_araddr')
+        self.addPort('i', 3, 's_axil_arprot')
+        self.addPort('i', 1, 's_axil_arvalid')
+        self.addPort('o', 1, 's_axil_arready')
+        self.addPort('o', dw, 's_axil_rdata')
+        self.addPort('o', 2, 's_axil_rresp')
+        self.addPort('o', 1, 's_axil_rvalid')
+        self.addPort('i', 1, 's_axil_rready')
+        self.addCsrPorts()
+        FILE.write(f'module {self.module}\n')
+        self.writePorts(FILE)
+
+        # declaration
+        for (name, width) in (('aw', aw), ('w', dw), ('ar', aw)):
+            self.writeDeclare(FILE, 'wire', 1, f'{name}_full')
+            self.writeDeclare(FILE, 'wire', 1, f'{name}_empty')
+            self.writeDeclare(FILE, 'wire', width, f'{name}_data')
+        self.writeDeclare(FILE, 'wire', 1, 'r_empty')
+        self.writeDeclare(FILE, 'wire', cw, 'r_count')
+        self.writeDeclare(FILE, 'wire', 1, 'rd_done')
+        self.writeDeclare(FILE, 'wire', 1, 'rd_pending')
+        self.writeDeclare(FILE, 'wire', 1, 'wr_pending')
+        self.writeDeclare(FILE, 'wire', 1, 'rd_grant')
+        self.writeDeclare(FILE, 'wire', 1, 'wr_grant')
+        self.writeDeclare(FILE, 'reg', 2, 'b_count')
+        self.writeDeclare(FILE, 'reg', cw, 'rd_inflight')
+        self.writeDeclare(FILE, 'reg', 1, 'rd_prio')
+        FILE.write(lines(2))
+
+        # request channels
+        FILE.write(INDENT(1) + '// request channels, the ready only depends on the buffer level\n')
+        self.writeChannel(FILE, 'aw', aw, 's_axil_awvalid', 's_axil_awready', 's_axil_awaddr', 'wr_grant')
+        self.writeChannel(FILE, 'w', dw, 's_axil_wvalid', 's_axil_wready', 's_axil_wdata', 'wr_grant')
+        self.writeChannel(FILE, 'ar', aw, 's_axil_arvalid', 's_axil_arready', 's_axil_araddr', 'rd_grant')
+
+        # responses
+        FILE.write(INDENT(1) + f'// read data, the FIFO has room for the {self.latency} cycle(s) of read latency\n')
+        FILE.write(INDENT(1) + f'{self.module}_fifo #(.WIDTH({dw}), .DEPTH({depth})) u_r_fifo (\n')
+        FILE.write(INDENT(2) + '.clk(clk), .reset(reset),\n')
+        FILE.write(INDENT(2) + '.i_push(rd_done), .i_data(i_sw_rddata), .o_full(),\n')
+        FILE.write(INDENT(2) + '.i_pop(s_axil_rvalid & s_axil_rready), .o_data(s_axil_rdata), '
+                               '.o_empty(r_empty), .o_count(r_count));\n')
+        FILE.write(INDENT(1) + 'assign s_axil_rvalid = ~r_empty;\n')
+        FILE.write(INDENT(1) + "assign s_axil_rresp  = 2'b00;\n\n")
+        FILE.write(INDENT(1) + '// write response, the write is done when it is sent to the CSR module\n')
+        FILE.write(INDENT(1) + "assign s_axil_bvalid = b_count != 2'd0;\n")
+        FILE.write(INDENT(1) + "assign s_axil_bresp  = 2'b00;\n\n")
+        self.writeReadDone(FILE, 'rd_grant')
+
+        # arbitration
+        FILE.write(INDENT(1) + '// SW interface: one read or write per cycle, the access which had to wait has the priority\n')
+        FILE.write(INDENT(1) + f"assign wr_pending = ~aw_empty & ~w_empty & (b_count != 2'd2);\n")
+        FILE.write(INDENT(1) + f"assign rd_pending = ~ar_empty & ({{1'b0, rd_inflight}} + r_count < {cw + 1}'d{depth});\n")
+        FILE.write(INDENT(1) + 'assign rd_grant = rd_pending & (~wr_pending | rd_prio);\n')
+        FILE.write(INDENT(1) + 'assign wr_grant = wr_pending & ~rd_grant;\n\n')
+        FILE.write(INDENT(1) + 'assign o_sw_select  = rd_grant | wr_grant;\n')
+        FILE.write(INDENT(1) + 'assign o_sw_read    = rd_grant;\n')
+        FILE.write(INDENT(1) + 'assign o_sw_write   = wr_grant;\n')
+        FILE.write(INDENT(1) + 'assign o_sw_address = rd_grant ? ar_data : aw_data;\n')
+        FILE.write(INDENT(1) + 'assign o_sw_wrdata  = w_data;\n\n')
+        FILE.write(INDENT(1) + 'always @(posedge clk) begin\n')
+        FILE.write(INDENT(2) + 'if (reset) begin\n')
+        FILE.write(INDENT(3) + "b_count <= 2'd0;\n")
+        FILE.write(INDENT(3) + f"rd_inflight <= {cw}'d0;\n")
+        FILE.write(INDENT(3) + "rd_prio <= 1'b0;\n")
+        FILE.write(INDENT(2) + 'end\n')
+        FILE.write(INDENT(2) + 'else begin\n')
+        FILE.write(INDENT(3) + 'b_count <= b_count + wr_grant - (s_axil_bvalid & s_axil_bready);\n')
+        FILE.write(INDENT(3) + 'rd_inflight <= rd_inflight + rd_grant - rd_done;\n')
+        FILE.write(INDENT(3) + 'if (rd_pending & wr_pending) rd_prio <= ~rd_grant;\n')
+        FILE.write(INDENT(2) + 'end\n')
+        FILE.write(INDENT(1) + 'end\n\n')
+        FILE.write('endmodule\n')
+
+class ApbWriter(BusWriter):
+
+    backend = 'apb'
+    suffix  = f'{RTL_SUFFIX}_apb.v'
+    bus     = 'APB'
+
+    def writeModule(self, FILE):
+        aw = self.addr_width
+        dw = self.regWidth
+        self.addPort('i', 1, 'clk')
+        self.addPort('i', 1, 'reset')
+        self.addPort(None, 0, 'APB slave, PSTRB is ignored (full register writes)')
+        self.addPort('i', aw, 's_apb_paddr')
+        self.addPort('i', 3, 's_apb_pprot')
+        self.addPort('i', 1, 's_apb_psel')
+        self.addPort('i', 1, 's_apb_penable')
+        self.addPort('i', 1, 's_apb_pwrite')
+        self.addPort('i', dw, 's_apb_pwdata')
+        self.addPort('i', dw // 8, 's_apb_pstrb')
+        self.addPort('o', dw, 's_apb_prdata')
+        self.addPort('o', 1, 's_apb_pready')
+        self.addPort('o', 1, 's_apb_pslverr')
+        self.addCsrPorts()
+        FILE.write(f'module {self.module}\n')
+        self.writePorts(FILE)
+
+        self.writeDeclare(FILE, 'wire', 1, 'setup')
+        self.writeDeclare(FILE, 'wire', 1, 'rd_done')
+        FILE.write(lines(2))
+        FILE.write(INDENT(1) + '// the access is sent to the CSR module in the setup phase, the write\n')
+        FILE.write(INDENT(1) + '// completes in the access phase and the read when its data is back\n')
+        FILE.write(INDENT(1) + 'assign setup = s_apb_psel & ~s_apb_penable;\n\n')
+        FILE.write(INDENT(1) + 'assign o_sw_select  = setup;\n')
+        FILE.write(INDENT(1) + 'assign o_sw_read    = setup & ~s_apb_pwrite;\n')
+        FILE.write(INDENT(1) + 'assign o_sw_write   = setup & s_apb_pwrite;\n')
+        FILE.write(INDENT(1) + 'assign o_sw_address = s_apb_paddr;\n')
+        FILE.write(INDENT(1) + 'assign o_sw_wrdata  = s_apb_pwdata;\n\n')
+        self.writeReadDone(FILE, 'o_sw_read')
+        FILE.write(INDENT(1) + 'assign s_apb_prdata  = i_sw_rddata;\n')
+        FILE.write(INDENT(1) + 'assign s_apb_pready  = s_apb_pwrite | rd_done;\n')
+        FILE.write(INDENT(1) + "assign s_apb_pslverr = 1'b0;\n\n")
+        FILE.write('endmodule\n')
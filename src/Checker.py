@@ -0,0 +1,277 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Validation of a yml spec, used by the -check option. Nothing is written.
+#   The checks use hashed indexes (duplicate keys and names) and sorted indexes
+#   (overlapping fields, and addresses in AddressMap) so a spec is checked in O(n log n).
+#
+#########################################################################################
+
+import yaml
+
+from common import *
+from config import *
+from YmlParser import YmlParser, YamlLoader
+from VerilogWriter import ARRAY_SUFFIX
+
+# Keys of a field, a RSVR field only needs the size
+FIELD_KEYS = ('size', 'reset', 'swtype', 'hwtype', 'note')
+SWTYPES    = ('R', 'W', 'W1C', 'FIFOR', 'FIFOW')
+HWTYPES    = ('R', 'W')
+
+class CheckLoader(YamlLoader):
+    """ yaml loader recording the duplicate keys, which are silently overwritten by the default loader """
+
+    def __init__(self, stream):
+        YamlLoader.__init__(self, stream)
+        self.duplicates = []
+
+    def construct_mapping(self, node, deep=False):
+        keys = set()
+        for (key, _) in node.value:
+            if isinstance(key, yaml.ScalarNode):
+                if key.value in keys:
+                    self.duplicates.append(f'line {key.start_mark.line + 1}: duplicate key {key.value}')
+                keys.add(key.value)
+        return YamlLoader.construct_mapping(self, node, deep)
+
+class Checker(object):
+
+    def __init__(self, yml):
+        """
+        Parameters:
+            :param yml: the yml file
+        """
+        self.yml = yml
+        self.errors = []
+
+    def error(self, msg):
+        self.errors.append(msg)
+
+    def checkAll(self) -> list:
+        """
+        Parse and check the yml file
+        Return:
+            :the list of the error messages, empty if the spec is valid
+        """
+        parser = YmlParser(self.yml)
+        with open(self.yml, 'r') as stream:
+            loader = CheckLoader(stream)
+            try:
+                data = loader.get_single_data()
+            finally:
+                loader.dispose()
+        self.errors += loader.duplicates
+        if not isinstance(data, dict) or not isinstance(data.get('register'), dict) or not data['register']:
+            self.error('missing register mapping')
+            return self.errors
+        parser.regInfoRaw = data['register']
+        parser.config = data.get('config') or {}
+        try:
+            parser.elaborateConfig()
+        except SpecError as e:
+            self.errors += e.errors
+            return self.errors
+        self.model = parser.model
+        # the model can only be elaborated from a well-formed spec
+        if not self.checkRaw(parser.regInfoRaw):
+            return self.errors
+        errors = []
+        try:
+            parser.elaborateAllReg()
+        except SpecError as e:   # address map and register layout errors
+            errors = e.errors
+        self.checkModel(parser.model)
+        # the layout errors are also found by checkRaw and checkModel
+        self.errors += [error for error in errors if error not in self.errors]
+        return self.errors
+
+    def checkRaw(self, regInfoRaw, prefix='') -> bool:
+        """ Check the keys and the types of the yml content, return True if the model can be elaborated """
+        count = len(self.errors)
+        for (reg, regInfo) in regInfoRaw.items():
+            if isinstance(regInfo, dict) and regInfo.get('storage', 'auto') not in STORAGES:
+                self.error(f'{prefix}{reg}: storage {regInfo["storage"]} is not one of {", ".join(STORAGES)}')
+            if isinstance(regInfo, dict) and isinstance(regInfo.get('register'), dict):
+                self.checkRaw(regInfo['register'], f'{prefix}{reg}.')
+                continue
+            fields = [field for field in regInfo if field not in REG_ATTRS] if isinstance(regInfo, dict) else []
+            if not fields:
+                self.error(f'{prefix}{reg}: register has no field')
+                continue
+            if regInfo.get('storage') == 'ram':
+                self.checkRam(f'{prefix}{reg}', regInfo, fields)
+            if 'fifo' in regInfo:
+                self.checkFifo(f'{prefix}{reg}', regInfo, fields)
+            if 'alias' in regInfo:
+                self.checkAlias(f'{prefix}{reg}', regInfo, fields)
+            for field in fields:
+                info = regInfo[field]
+                keys = ('size',) if field == RSVR else FIELD_KEYS
+                if not isinstance(info, dict):
+                    self.error(f'{prefix}{reg}.{field}: missing {", ".join(keys)}')
+                    continue
+                missing = [key for key in keys if key not in info]
+                if missing:
+                    self.error(f'{prefix}{reg}.{field}: missing {", ".join(missing)}')
+                size = info.get('size', 1)
+                width = self.model.reg_width
+                if not isinstance(size, int) or isinstance(size, bool) or not 0 < size <= width:
+                    self.error(f'{prefix}{reg}.{field}: size {size} is not between 1 and {width}')
+                if field != RSVR and not isinstance(info.get('reset', 0), int):
+                    self.error(f'{prefix}{reg}.{field}: reset {info["reset"]} is not an integer')
+                if info.get('hwtype') == FIFO_HWTYPE:
+                    self.error(f'{prefix}{reg}.{field}: hwtype {FIFO_HWTYPE} is reserved for the FIFO status bits')
+        return len(self.errors) == count
+
+    def checkRam(self, reg, regInfo, fields):
+        """ Check a register array with the ram storage """
+        if regInfo.get('count', 1) == 1:
+            self.error(f'{reg}: storage ram needs a register array (count)')
+        if not (self.model.read_mux and self.model.read_stages):
+            self.error(f'{reg}: storage ram needs a pipeline stage of the read mux tree (read_mux, read_stages)')
+        for field in fields:
+            info = regInfo[field]
+            if field == RSVR or not isinstance(info, dict):
+                continue
+            if info.get('swtype') != 'W' or info.get('hwtype') != 'R':
+                self.error(f'{reg}.{field}: storage ram only supports swtype W and hwtype R')
+            if info.get('reset'):
+                self.error(f'{reg}.{field}: storage ram has no reset value')
+
+    def checkFifo(self, reg, regInfo, fields):
+        """ Check the FIFO options of a register """
+        options = regInfo['fifo']
+        if not isinstance(options, dict):
+            self.error(f'{reg}: fifo is not a mapping of {", ".join(FIFO_OPTIONS)}')
+            return
+        for (option, value) in options.items():
+            if option not in FIFO_OPTIONS:
+                self.error(f'{reg}: unknown fifo option {option}')
+            elif option == 'level':
+                if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                    self.error(f'{reg}: fifo level {value} is not a number of bits')
+            elif not isinstance(value, bool):
+                self.error(f'{reg}: fifo {option} {value} is not true or false')
+        swtypes = [regInfo[field].get('swtype') for field in fields if isinstance(regInfo[field], dict)]
+        fifos = [swtype for swtype in swtypes if swtype in ('FIFOR', 'FIFOW')]
+        if len(fifos) != 1:
+            self.error(f'{reg}: fifo options need exactly one FIFOR or FIFOW field')
+        elif options.get('prefetch') is True and fifos[0] != 'FIFOR':
+            self.error(f'{reg}: fifo prefetch needs a FIFOR field')
+        elif options.get('skid') is True and fifos[0] != 'FIFOW':
+            self.error(f'{reg}: fifo skid needs a FIFOW field')
+        if regInfo.get('count', 1) != 1:
+            self.error(f'{reg}: fifo options are not supported on a register array (count)')
+
+    def checkAlias(self, reg, regInfo, fields):
+        """ Check the alias addresses of a register """
+        alias = regInfo['alias']
+        if not isinstance(alias, list):
+            self.error(f'{reg}: alias is not a list of {", ".join(ALIASES)}')
+            return
+        for (i, kind) in enumerate(alias):
+            if kind not in ALIASES:
+                self.error(f'{reg}: unknown alias {kind}')
+            elif kind in alias[:i]:
+                self.error(f'{reg}: duplicate alias {kind}')
+        if regInfo.get('count', 1) != 1:
+            self.error(f'{reg}: alias is not supported on a register array (count)')
+        swtypes = [regInfo[field].get('swtype') for field in fields if isinstance(regInfo[field], dict)]
+        if 'FIFOR' in swtypes or 'FIFOW' in swtypes:
+            self.error(f'{reg}: alias is not supported on a FIFOR or FIFOW register')
+        for kind in ('set', 'tgl'):
+            if kind in alias and 'W' not in swtypes:
+                self.error(f'{reg}: alias {kind} needs a field with swtype W')
+        if 'clr' in alias and 'W' not in swtypes and 'W1C' not in swtypes:
+            self.error(f'{reg}: alias clr needs a field with swtype W or W1C')
+
+    def checkModel(self, model):
+        """ Check the elaborated register model """
+        signals = {}    # Verilog signal -> owner
+        macros = {}     # C macro prefix -> owner
+        for reg in model:
+            self.checkFields(reg)
+            self.addName(macros, reg.name.upper(), reg.name, 'C macro')
+            if reg.count > 1:
+                for signal in self.arraySignalNames(reg):
+                    self.addName(signals, signal, reg.name, 'signal')
+            if reg.ram:
+                for signal in self.ramSignalNames(reg):
+                    self.addName(signals, signal, reg.name, 'signal')
+            for (kind, addr) in reg.aliases:
+                self.addName(signals, f'{reg.name}_{kind}{WEN_SUFFIX}', reg.name, 'signal')
+            for field in reg.fields:
+                if field.name == RSVR:
+                    continue
+                owner = f'{reg.name}.{field.name}'
+                if field.hwtype == FIFO_HWTYPE:
+                    self.addName(macros, f'{reg.name}__{field.name}'.upper(), owner, 'C macro')
+                    continue
+                self.checkField(owner, field)
+                for signal in (() if reg.ram else self.signalNames(reg, field)):
+                    self.addName(signals, signal, owner, 'signal')
+                self.addName(macros, f'{reg.name}__{field.name}'.upper(), owner, 'C macro')
+
+    def checkFields(self, reg):
+        """ Check that the fields fit in the register and do not overlap """
+        fields = sorted(reg.fields, key=lambda field: field.lsb)
+        for (prev, field) in zip(fields, fields[1:]):
+            if field.lsb <= prev.msb:
+                self.error(f'{reg.name}: field {field.name} [{field.msb}:{field.lsb}] overlaps '
+                           f'field {prev.name} [{prev.msb}:{prev.lsb}]')
+        if fields and fields[-1].msb >= self.model.reg_width:
+            self.error(f'{reg.name}: fields use {fields[-1].msb + 1} bits, '
+                       f'more than the register width ({self.model.reg_width})')
+
+    def checkField(self, owner, field):
+        """ Check the access type and the reset value of a field """
+        if field.swtype not in SWTYPES:
+            self.error(f'{owner}: unknown swtype {field.swtype}')
+        elif field.swtype in HWTYPES and field.hwtype not in HWTYPES:
+            self.error(f'{owner}: unknown hwtype {field.hwtype}')
+        elif field.swtype == 'R' and field.hwtype == 'R':
+            self.error(f'{owner}: access type SW R / HW R is not supported')
+        elif field.swtype == 'W1C' and field.hwtype != 'W':
+            self.error(f'{owner}: access type SW W1C / HW {field.hwtype} is not supported')
+        if field.reset < 0 or field.reset >> field.size:
+            self.error(f'{owner}: reset {hex(field.reset)} does not fit in {field.size} bits')
+
+    def addName(self, index, name, owner, kind):
+        """ Add a generated name to the index and report the collision """
+        if name in index:
+            self.error(f'{owner}: {kind} {name} is also generated by {index[name]}')
+        else:
+            index[name] = owner
+
+    def arraySignalNames(self, reg) -> tuple:
+        """ The index decode signals and the generate block created by VerilogWriter for a register array """
+        return tuple(reg.name + ARRAY_SUFFIX + suffix for suffix in ('_offset', '_sel', '_idx', '_i')) + (f'g_{reg.name}',)
+
+    def ramSignalNames(self, reg) -> tuple:
+        """ The signals created by VerilogWriter for a register array stored in a RAM """
+        ram = reg.name + '_ram'
+        return (ram, ram + '_rdata', ram + '_read' + REG_SUFFIX, f'i_hw_{ram}_read', f'i_hw_{ram}_addr',
+                f'o_hw_{ram}_data', f'o_hw_{ram}_data' + REG_SUFFIX)
+
+    def signalNames(self, reg, field) -> tuple:
+        """ The signals created by VerilogWriter for a field """
+        if field.swtype == 'FIFOR':
+            name = f'{reg.name}_{field.name}'
+            return (f'o_hw_{name}_fifo_read', f'i_hw_{name}_fifo_read_data', f'i_hw_{name}_fifo_read_valid',
+                    f'i_hw_{name}_fifo_level', f'{name}_pf_valid', f'{name}_pf_data')
+        if field.swtype == 'FIFOW':
+            name = f'{reg.name}_{field.name}'
+            return (f'o_hw_{name}_fifo_write', f'o_hw_{name}_fifo_write_data', f'i_hw_{name}_fifo_write_ready',
+                    f'i_hw_{name}_fifo_level', f'{name}_skid_valid', f'{name}_skid_data')
+        dir = 'i' if field.hwtype == 'W' else 'o'
+        name = f'{dir}_hw_{reg.name}_{field.name}'
+        if field.swtype in ('W', 'W1C'):
+            return (name, name + REG_SUFFIX, name + REG_SUFFIX + WEN_SUFFIX)
+        return (name, name + REG_SUFFIX)
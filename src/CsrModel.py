@@ -0,0 +1,471 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Cycle based behavioral model of the CSR module written by VerilogWriter, built
+#   from the same register model. Each call of step (or read, write, idle) is one
+#   clock edge: a read returns the register value before the edge, the writes and
+#   the HW inputs take effect at the edge, as in the RTL. The read data is returned
+#   with the request, the RTL returns it read_latency cycles later.
+#
+#   The HW ports have the names and the packing of the RTL ports. The HW written
+#   fields are evaluated lazily: an element (register or register of an array) keeps
+#   the stored value of the last edge it was written, and one more edge with the
+#   current HW inputs gives its value at any later cycle, because the inputs only
+#   change through setInput, which first settles the elements using them. So the
+#   cost of a cycle does not depend on the size of the register map.
+#   The FIFO fields can be connected to queues (fifos): a FIFOR field reads its data,
+#   valid bit and level from its queue, and a FIFOW field appends the data written
+#   to the FIFO to its queue.
+#
+#########################################################################################
+
+from collections import deque
+
+from common import *
+
+class Element(object):
+    """ Stored value of a register or of one register of a register array """
+
+    __slots__ = ('name', 'word', 'stamp', 'hw', 'hold', 'wmask', 'w1cmask', 'reset', 'ram', 'fifos')
+
+    def __init__(self, name, hold, wmask, w1cmask, reset, ram):
+        """
+        Parameters:
+            :param name: register name, <register>[i] for a register array
+            :param hold: the bits kept by an edge without SW write (SW RW / HW RO and W1C)
+            :param wmask: the bits of the SW RW fields
+            :param w1cmask: the bits of the W1C fields
+            :param reset: the reset value of the stored bits
+            :param ram: the element is stored in a RAM (no reset)
+        """
+        self.name    = name
+        self.word    = reset    # stored bits, valid after the edge stamp
+        self.stamp   = 0
+        self.hw      = 0        # HW inputs of the HW written and W1C fields, at their register position
+        self.hold    = hold
+        self.wmask   = wmask
+        self.w1cmask = w1cmask
+        self.reset   = reset
+        self.ram     = ram
+        self.fifos   = []       # FifoRead and FifoWrite fields of the register
+
+    def value(self, now) -> int:
+        """ The stored bits at cycle now. Without write after the last edge, the HW fields have sampled hw """
+        return self.word if self.stamp == now else self.word & self.hold | self.hw
+
+    def settle(self, now):
+        """ Store the value of the cycle now, before a change of the HW inputs """
+        self.word = self.value(now)
+        self.stamp = now
+
+    def write(self, now, kind, data):
+        """
+        Write the register at the edge after the cycle now
+        Parameters:
+            :param kind: 'reg' for the register address, or the alias 'set', 'clr' or 'tgl'
+            :param data: the write data
+        """
+        word = self.value(now)
+        wmask = self.wmask
+        hw = self.hw & ~wmask
+        if kind == 'reg':
+            word = data & wmask | hw | word & self.w1cmask & ~data
+        elif kind == 'set':
+            word = (word | data) & wmask | hw | word & self.w1cmask
+        elif kind == 'clr':
+            word = word & ~data & (wmask | self.w1cmask) | hw
+        else:
+            word = (word ^ data) & wmask | hw | word & self.w1cmask
+        self.word = word
+        self.stamp = now + 1
+
+class FifoRead(object):
+    """ FIFOR field of a register, and its valid and level status fields """
+
+    __slots__ = ('model', 'key', 'index', 'lsb', 'mask', 'prefetch', 'validLsb', 'levelLsb', 'levelMask',
+                 'dataPort', 'validPort', 'levelPort', 'pulsePort', 'resetData', 'pfValid', 'pfData', 'reading')
+
+    def __init__(self, model, reg, field, index):
+        """
+        Parameters:
+            :param model: the CsrModel
+            :param reg: the Register
+            :param field: the FIFOR Field
+            :param index: index of the register in the register array, None for a register
+        """
+        name = f'{reg.name}_{field.name}'
+        self.model     = model
+        self.key       = name if index == None else f'{name}[{index}]'
+        self.index     = index or 0
+        self.lsb       = field.lsb
+        self.mask      = (1 << field.size) - 1
+        self.prefetch  = bool(reg.fifo & FIFO_PREFETCH)
+        self.dataPort  = f'i_hw_{name}_fifo_read_data'
+        self.validPort = f'i_hw_{name}_fifo_read_valid'
+        self.levelPort = f'i_hw_{name}_fifo_level'
+        self.pulsePort = f'o_hw_{name}_fifo_read'
+        (self.validLsb, self.levelLsb, self.levelMask) = statusFields(reg, field, '_valid')
+        self.resetData = field.reset
+        self.reset()
+
+    def source(self) -> tuple:
+        """ The (valid, data, level) of the FIFO, from its queue if it is connected to one """
+        queue = self.model.fifos.get(self.key)
+        if queue != None:
+            return (1 if queue else 0, queue[0] & self.mask if queue else 0, len(queue))
+        inputs = self.model.inputs
+        return (inputs.get(self.validPort, 0) >> self.index & 1,
+                inputs[self.dataPort] >> self.index * self.mask.bit_length() & self.mask,
+                inputs.get(self.levelPort, 0))
+
+    def read(self) -> int:
+        """ The bits of the FIFO field and its status fields in the read data """
+        (valid, data, level) = self.source()
+        if self.prefetch:
+            (valid, data) = (self.pfValid, self.pfData)
+        value = data << self.lsb
+        if self.validLsb != None:
+            value |= valid << self.validLsb
+        if self.levelLsb != None:
+            value |= (level & self.levelMask) << self.levelLsb
+        return value
+
+    def pop(self):
+        """ The FIFO read pulse """
+        model = self.model
+        model.pulses[self.pulsePort] = model.pulses.get(self.pulsePort, 0) + 1
+        queue = model.fifos.get(self.key)
+        if queue:
+            queue.popleft()
+
+    def access(self):
+        """ SW read of the register address """
+        if self.prefetch:
+            self.reading = True
+        else:
+            self.pop()
+
+    def edge(self):
+        """ Prefetch register: loaded from the FIFO when it is empty or read """
+        (valid, data, level) = self.source()
+        if valid and (not self.pfValid or self.reading):
+            self.pop()
+            self.pfValid = 1
+            self.pfData = data
+        elif self.reading:
+            self.pfValid = 0
+        self.reading = False
+
+    def reset(self):
+        (self.pfValid, self.pfData, self.reading) = (0, self.resetData, False)
+
+class FifoWrite(object):
+    """ FIFOW field of a register, and its ready and level status fields """
+
+    __slots__ = ('model', 'key', 'index', 'lsb', 'mask', 'skid', 'readyLsb', 'levelLsb', 'levelMask',
+                 'readyPort', 'levelPort', 'pulsePort', 'outValid', 'outData', 'skidValid', 'skidData',
+                 'writing', 'data')
+
+    def __init__(self, model, reg, field, index):
+        """
+        Parameters:
+            :param model: the CsrModel
+            :param reg: the Register
+            :param field: the FIFOW Field
+            :param index: index of the register in the register array, None for a register
+        """
+        name = f'{reg.name}_{field.name}'
+        self.model     = model
+        self.key       = name if index == None else f'{name}[{index}]'
+        self.index     = index or 0
+        self.lsb       = field.lsb
+        self.mask      = (1 << field.size) - 1
+        self.skid      = bool(reg.fifo & FIFO_SKID)
+        self.readyPort = f'i_hw_{name}_fifo_write_ready'
+        self.levelPort = f'i_hw_{name}_fifo_level'
+        self.pulsePort = f'o_hw_{name}_fifo_write'
+        (self.readyLsb, self.levelLsb, self.levelMask) = statusFields(reg, field, '_ready')
+        self.reset()
+
+    def ready(self) -> int:
+        """ The ready input of the FIFO """
+        return self.model.inputs[self.readyPort] >> self.index & 1
+
+    def read(self) -> int:
+        """ The bits of the status fields in the read data, the FIFO field reads 0 """
+        value = 0
+        if self.readyLsb != None:
+            value |= (1 - self.skidValid if self.skid else self.ready()) << self.readyLsb
+        if self.levelLsb != None:
+            value |= (self.model.inputs.get(self.levelPort, 0) & self.levelMask) << self.levelLsb
+        return value
+
+    def push(self, data):
+        """ The FIFO write pulse """
+        model = self.model
+        model.pulses[self.pulsePort] = model.pulses.get(self.pulsePort, 0) + 1
+        model.fifos[self.key].append(data)
+
+    def access(self, data):
+        """ SW write of the register address """
+        data = data >> self.lsb & self.mask
+        if self.skid:
+            (self.writing, self.data) = (True, data)
+        else:
+            self.push(data)
+
+    def edge(self):
+        """ Skid buffer: the output register is written to the FIFO when it is ready """
+        ready = self.ready()
+        free = not self.outValid or ready
+        (writing, skidValid) = (self.writing, self.skidValid)
+        if self.outValid and ready:
+            self.push(self.outData)
+        if free:
+            self.outValid = skidValid or writing
+            self.outData = self.skidData if skidValid else self.data
+            self.skidValid = skidValid and writing
+        else:
+            self.skidValid = skidValid or writing
+        if writing and (skidValid or not free):
+            self.skidData = self.data
+        self.writing = False
+
+    def reset(self):
+        (self.outValid, self.outData, self.skidValid, self.skidData) = (False, 0, False, 0)
+        (self.writing, self.data) = (False, 0)
+
+def statusFields(reg, field, valid) -> tuple:
+    """
+    The FIFO status fields of a FIFO field
+    Parameters:
+        :param valid: suffix of the valid (FIFOR) or ready (FIFOW) field
+    Return:
+        :(lsb of the valid field, lsb of the level field, mask of the level field), None for a missing field
+    """
+    status = {f.name: f for f in reg.fields if f.hwtype == FIFO_HWTYPE}
+    validField = status.get(field.name + valid)
+    level = status.get(field.name + '_level')
+    return (validField.lsb if validField else None, level.lsb if level else None,
+            (1 << level.size) - 1 if level else 0)
+
+class RamPort(object):
+    """ HW read port of a register array stored in a RAM, the read data is registered """
+
+    __slots__ = ('model', 'elements', 'readPort', 'addrPort', 'dataPort')
+
+    def __init__(self, model, reg, elements):
+        self.model    = model
+        self.elements = elements
+        self.readPort = f'i_hw_{reg.name}_ram_read'
+        self.addrPort = f'i_hw_{reg.name}_ram_addr'
+        self.dataPort = f'o_hw_{reg.name}_ram_data'
+
+    def edge(self):
+        inputs = self.model.inputs
+        if inputs[self.readPort]:
+            addr = inputs[self.addrPort]
+            self.model.ramData[self.dataPort] = self.elements[addr].word if addr < len(self.elements) else 0
+
+class CsrModel(object):
+
+    def __init__(self, model):
+        """
+        Parameters:
+            :param model: the register model (RegModel)
+        """
+        self.addrMask = (1 << model.addr_width) - 1
+        self.flat     = not model.read_mux   # the flat read mux keeps the read data of an unmapped address
+        self.decode   = {}      # address: (Element, 'reg' or alias kind)
+        self.elements = []      # (Register, [Element]) of each register
+        self.inputs   = {}      # HW input port: value, the ports of a register array are packed as in the RTL
+        self.hwPorts  = {}      # HW input port sampled by the registers: [(Element, lsb, size, index)]
+        self.outputs  = {}      # HW output port of the registers: [(Element, lsb, size, index)]
+        self.ramData  = {}      # HW read data port of the RAMs: value
+        self.fifos    = {}      # FIFO queue of the FIFO fields, <register>_<field> or <register>_<field>[i]
+        self.pulses   = {}      # FIFO read/write port: number of pulses
+        self.dynamic  = []      # FIFO and RAM logic evaluated at each edge
+        self.cycle    = 0       # number of clock edges
+        self.rddata   = 0       # read data kept by the flat read mux for an unmapped address
+        for reg in model:
+            self.addRegister(model, reg)
+        self.reset()
+
+    def addRegister(self, model, reg):
+        """ Create the elements of a register and its address decode """
+        size = model.reg_width // 8
+        hold = wmask = w1cmask = reset = 0
+        for field in reg.fields:
+            mask = ((1 << field.size) - 1) << field.lsb
+            if field.name == RSVR or field.hwtype == FIFO_HWTYPE or field.swtype in ('FIFOR', 'FIFOW'):
+                continue
+            reset |= field.reset << field.lsb & mask
+            if field.swtype == 'W':
+                wmask |= mask
+                hold |= mask if field.hwtype == 'R' else 0
+            elif field.swtype == 'W1C':
+                w1cmask |= mask
+                hold |= mask
+        elements = []
+        for i in range(reg.count):
+            name = reg.name if reg.count == 1 else f'{reg.name}[{i}]'
+            element = Element(name, hold, wmask, w1cmask, reset, reg.ram)
+            if reg.ram:
+                element.word = 0
+            elements.append(element)
+            self.decode[reg.addr + i * (reg.stride or size)] = (element, 'reg')
+        for (kind, addr) in reg.aliases:
+            self.decode[addr] = (elements[0], kind)
+        self.elements.append((reg, elements))
+        if reg.ram:
+            port = RamPort(self, reg, elements)
+            self.inputs[port.readPort] = self.inputs[port.addrPort] = 0
+            self.ramData[port.dataPort] = 0
+            self.dynamic.append(port)
+            return
+        index = lambda i: i if reg.count > 1 else None
+        for field in reg.fields:
+            if field.name == RSVR or field.hwtype == FIFO_HWTYPE:
+                continue
+            ports = [(element, field.lsb, field.size, i) for (i, element) in enumerate(elements)]
+            if field.swtype in ('R', 'W') and field.hwtype == 'W' or field.swtype == 'W1C':
+                port = f'i_hw_{reg.name}_{field.name}'
+                self.inputs[port] = 0
+                self.hwPorts[port] = ports
+            elif field.swtype == 'W':
+                self.outputs[f'o_hw_{reg.name}_{field.name}'] = ports
+            elif field.swtype == 'FIFOR':
+                fifos = [FifoRead(self, reg, field, index(i)) for i in range(reg.count)]
+                self.inputs[fifos[0].dataPort] = 0
+                if fifos[0].prefetch or fifos[0].validLsb != None:
+                    self.inputs[fifos[0].validPort] = 0
+                if fifos[0].levelLsb != None:
+                    self.inputs[fifos[0].levelPort] = 0
+            elif field.swtype == 'FIFOW':
+                fifos = [FifoWrite(self, reg, field, index(i)) for i in range(reg.count)]
+                # the FIFOs are always ready by default
+                if fifos[0].skid or fifos[0].readyLsb != None:
+                    self.inputs[fifos[0].readyPort] = (1 << reg.count) - 1
+                if fifos[0].levelLsb != None:
+                    self.inputs[fifos[0].levelPort] = 0
+                for fifo in fifos:
+                    self.fifos[fifo.key] = deque()
+            if field.swtype in ('FIFOR', 'FIFOW'):
+                for (element, fifo) in zip(elements, fifos):
+                    element.fifos.append(fifo)
+                    if fifo.skid if field.swtype == 'FIFOW' else fifo.prefetch:
+                        self.dynamic.append(fifo)
+
+    def reset(self):
+        """ Reset the module, the RAMs have no reset: they start with 0 and keep their content """
+        for (reg, elements) in self.elements:
+            for element in elements:
+                if not element.ram:
+                    (element.word, element.stamp) = (element.reset, self.cycle)
+                for fifo in element.fifos:
+                    fifo.reset()
+
+    def setInput(self, port, value):
+        """
+        Change a HW input, it is sampled at the next edge
+        Parameters:
+            :param port: the input port name of the RTL (i_hw_*)
+            :param value: the port value, the registers of a register array are packed as in the RTL
+        """
+        if port not in self.inputs:
+            raise KeyError(f'no input port {port}')
+        self.inputs[port] = value
+        for (element, lsb, size, index) in self.hwPorts.get(port, ()):
+            element.settle(self.cycle)
+            mask = ((1 << size) - 1) << lsb
+            element.hw = element.hw & ~mask | (value >> index * size << lsb & mask)
+
+    def output(self, port) -> int:
+        """ The value of a HW output port of a register or of a RAM read port (o_hw_*) """
+        if port in self.ramData:
+            return self.ramData[port]
+        value = 0
+        for (element, lsb, size, index) in self.outputs[port]:
+            value |= (element.value(self.cycle) >> lsb & ((1 << size) - 1)) << index * size
+        return value
+
+    def peek(self, addr) -> int:
+        """ The read data of an address, without side effect and without clock edge. None if unmapped """
+        entry = self.decode.get(addr & self.addrMask)
+        if entry == None:
+            return None
+        element = entry[0]
+        value = element.value(self.cycle)
+        for fifo in element.fifos:
+            value |= fifo.read()
+        return value
+
+    def edge(self):
+        """ One clock edge of the FIFO and RAM logic """
+        for logic in self.dynamic:
+            logic.edge()
+        self.cycle += 1
+
+    def read(self, addr) -> int:
+        """ SW read of an address, one cycle. Return the read data """
+        entry = self.decode.get(addr & self.addrMask)
+        if entry == None:
+            value = self.rddata if self.flat else 0
+        else:
+            (element, kind) = entry
+            value = element.value(self.cycle)
+            for fifo in element.fifos:
+                value |= fifo.read()
+                if kind == 'reg' and type(fifo) is FifoRead:
+                    fifo.access()
+            self.rddata = value
+        if self.dynamic:
+            self.edge()
+        else:
+            self.cycle += 1
+        return value
+
+    def write(self, addr, data):
+        """ SW write of an address, one cycle """
+        entry = self.decode.get(addr & self.addrMask)
+        if entry == None:
+            self.idle()
+            return
+        (element, kind) = entry
+        if kind == 'reg':
+            for fifo in element.fifos:
+                if type(fifo) is FifoWrite:
+                    fifo.access(data)
+        if self.dynamic:
+            # the RAM read port reads the RAM before the write
+            for logic in self.dynamic:
+                logic.edge()
+        element.write(self.cycle, kind, data)
+        self.cycle += 1
+
+    def idle(self):
+        """ One cycle without SW access """
+        if self.dynamic:
+            self.edge()
+        else:
+            self.cycle += 1
+
+    def step(self, read=False, write=False, addr=0, wrdata=0):
+        """
+        One cycle of the SW interface
+        Return:
+            :the read data for a read, None otherwise
+        """
+        if read:
+            return self.read(addr)
+        if write:
+            self.write(addr, wrdata)
+        else:
+            self.idle()
+        return None
@@ -12,21 +12,8 @@
 #########################################################################################
 
 from common import *
-
-# Define the index for each register
-REGNAME = 0
-ADDR    = 1
-FLDLIST = 2
-
-# Define the index for each field Array
-# [Name, MSb, LSb, SWTYPE, HWTYPE, Reset Value, Description]
-FNAME   = 0
-MSB     = 1
-LSB     = 2
-SWTYPE  = 3
-HWTYPE  = 4
-RESET   = 5
-NOTE    = 6
+from config import *
+from Emitter import *
 
 SPACE = 60
 
@@ -36,22 +23,30 @@ SET_SUFFIX = '__set'
 GET_SUFFIX = '__get'
 
 space1 = '        '
-mask = lambda offset, size: hex(int(bin(2 ** size - 1), 2) << offset)
+
+# C type of a register wider than 32 bits (__int128 is a GCC/Clang extension)
+C_TYPES = {64: 'uint64_t', 128: 'unsigned __int128'}
 lines = lambda x: '\n' * x
 
-class DriverWriter(object):
+class DriverWriter(Emitter):
+
+    backend = 'driver'
+    suffix  = '_csr.h'
 
-    def __init__(self, regsInfo, name, path):
+    def __init__(self, name, path):
         """
         Parameters:
-            :param regsInfo: the register info array for all register
             :param name: the name of the register module
             :param path: the path of to the document
         """
-        self.regsInfo = regsInfo
-        self.name = name
+        Emitter.__init__(self, name, path)
         self.NAME = name.upper()
-        self.path = path
+
+    def cacheInfo(self, model):
+        """ The driver only depends on the register name, address, the field name and range and the read latency """
+        return [model.reg_width, model.read_mux, model.read_stages] + [(reg.name, reg.addr, reg.count, reg.stride, reg.ram, reg.alias,
+                 [(field.name, field.msb, field.lsb, field.swtype) for field in reg.fields])
+                for reg in model]
 
     def prefix(self, FILE, name):
         """
@@ -60,117 +55,358 @@ class DriverWriter(object):
             :param name: the name of the register module
             :param FILE: The file pointer
         """
-        string = ''
-        string += f'//////////////////////////////////////////////////////\n'
-        string += f'//\n'
-        string += f'// Driver for {name} CSR module\n'
-        string += f'// Generated by Simple CSR Generator\n'
-        string += f'// Created: {MONTH}/{DAY}/{YEAR} {HOUR}:{MINUTE}\n'
-        string += f'//\n'
-        string += f'//////////////////////////////////////////////////////\n'
-        string += lines(2)
-        FILE.write(string)
+        FILE.write(f'//////////////////////////////////////////////////////\n')
+        FILE.write(f'//\n')
+        FILE.write(f'// Driver for {name} CSR module\n')
+        FILE.write(f'// Generated by Simple CSR Generator\n')
+        FILE.write(f'// Created: {MONTH}/{DAY}/{YEAR} {HOUR}:{MINUTE}\n')
+        FILE.write(f'//\n')
+        FILE.write(f'//////////////////////////////////////////////////////\n')
+        FILE.write(lines(2))
 
-    def getFieldStr(self, reg, name):
+    def writeGetField(self, FILE, reg, name):
         """
             write the macro to get this field from register data
         """
         oft  = f'{reg}__{name}{OFT_SUFFIX}'
         mask = f'{reg}__{name}{MSK_SUFFIX}'
-        string  = f'#define {reg}__{name}{GET_SUFFIX}(data) \\\n'
-        string += f'{space1}((data & {mask}) >> {oft})\n'
-        return string
+        FILE.write(f'#define {reg}__{name}{GET_SUFFIX}(data) \\\n')
+        FILE.write(f'{space1}((data & {mask}) >> {oft})\n')
 
-    def setFieldStr(self, reg, name):
+    def writeSetField(self, FILE, reg, name):
         """
             write the macro to set this field for register data
-            return the string of the define statement and the macro name
         """
         oft  = f'{reg}__{name}{OFT_SUFFIX}'
         mask = f'{reg}__{name}{MSK_SUFFIX}'
         macro = f'{reg}__{name}{SET_SUFFIX}({name})'
-        string  = f'#define {macro} \\\n'
-        string += f'{space1}(({name} << {oft}) & {mask})\n'
-        return string
+        FILE.write(f'#define {macro} \\\n')
+        if self.width > 32:
+            # the field value is widened before the shift
+            FILE.write(f'{space1}((({self.type})({name}) << {oft}) & {mask})\n')
+        else:
+            FILE.write(f'{space1}(({name} << {oft}) & {mask})\n')
 
-    def OneFieldStr(self, fieldInfo, reg):
+    def writeOneField(self, FILE, field, reg):
         """
             Write driver for one field.
-            Returns a string of the content to be written
 
             Parameters:
-                :param regInfo: the register info array for 1 register
+                :param field: the Field
+                :param reg: the register macro name
         """
-        name = fieldInfo[FNAME].upper()
-        msb = fieldInfo[MSB]
-        lsb = fieldInfo[LSB]
+        name = field.name.upper()
+        msb = field.msb
+        lsb = field.lsb
         size = msb - lsb + 1
         offset = lsb
         if name == RSVR:
-            return ''
-        string  = f'// Field: {name}, Offset: {offset}, Size: {size}\n'
-        string += addSpace(f'#define {reg}__{name}{OFT_SUFFIX}', SPACE) + f'{offset}\n'
-        string += addSpace(f'#define {reg}__{name}{MSK_SUFFIX}', SPACE) + f'{mask(offset,size)}\n'
-        string += self.getFieldStr(reg, name)
-        string += self.setFieldStr(reg, name)
-        string += lines(1)
-        return string
+            return
+        FILE.write(f'// Field: {name}, Offset: {offset}, Size: {size}\n')
+        FILE.write(addSpace(f'#define {reg}__{name}{OFT_SUFFIX}', SPACE) + f'{offset}\n')
+        FILE.write(addSpace(f'#define {reg}__{name}{MSK_SUFFIX}', SPACE) + f'{self.mask(offset, size)}\n')
+        self.writeGetField(FILE, reg, name)
+        self.writeSetField(FILE, reg, name)
+        if self.hasShadow:
+            self.writeShadowField(FILE, reg, name)
+        FILE.write(lines(1))
+
+    def mask(self, offset, size) -> str:
+        """
+            The mask of a field as a C constant of the register type.
+            C has no literal wider than 64 bits, so a 128 bits mask is built from two halves.
+        """
+        return self.constant(((1 << size) - 1) << offset)
+
+    def constant(self, value) -> str:
+        """ A register value as a C constant of the register type """
+        if self.width == 32:
+            return hex(value)
+        if value >> 64:
+            return f'((({self.type}){hex(value >> 64)}ULL << 64) | {hex(value & (2 ** 64 - 1))}ULL)'
+        return f'{hex(value)}ULL'
+
+    def isShadowed(self, reg) -> bool:
+        """ A register has a shadow if all its fields are SW RW / HW RO, so the SW knows its value """
+        fields = [field for field in reg.fields if field.name != RSVR]
+        return bool(fields) and all(field.swtype == 'W' and field.hwtype == 'R' for field in fields)
 
-    def setRegStr(self, reg, nameList):
+    def writeShadowField(self, FILE, reg, name):
+        """
+            write the macros to update this field in the shadow and write the register (update),
+            or only in the shadow until the next flush (stage)
+        """
+        index = f'{reg}_SHADOW'
+        mask  = f'{reg}__{name}{MSK_SUFFIX}'
+        value = f'{reg}__{name}{SET_SUFFIX}({name})'
+        FILE.write(f'#define {reg}__{name}__update(regs, shadow, {name}) \\\n')
+        FILE.write(f'{space1}{self.NAME}_shadow_update(&(regs)->{self.regName}, shadow, {index}, {mask}, {value})\n')
+        FILE.write(f'#define {reg}__{name}__stage(shadow, {name}) \\\n')
+        FILE.write(f'{space1}{self.NAME}_shadow_stage(shadow, {index}, {mask}, {value})\n')
+
+    def writeShadowReg(self, FILE, reg):
+        """
+            write the macros to update the bits of mask of the register in the shadow and write it,
+            or only in the shadow until the next flush
+        """
+        index = f'{reg}_SHADOW'
+        FILE.write(f'#define {reg}__update(regs, shadow, mask, value) \\\n')
+        FILE.write(f'{space1}{self.NAME}_shadow_update(&(regs)->{self.regName}, shadow, {index}, mask, value)\n')
+        FILE.write(f'#define {reg}__stage(shadow, mask, value) \\\n')
+        FILE.write(f'{space1}{self.NAME}_shadow_stage(shadow, {index}, mask, value)\n')
+
+    def writeSetReg(self, FILE, reg, nameList):
         """
             Write the macro to set register value
         """
-        nameString = ''
-        string1 = ''
-        for name in reversed(nameList):
-            if name != RSVR:
-                nameString += f'{name}, '
-                macro = f'{reg}__{name}{SET_SUFFIX}({name})'
-                string1 += space1 + f'{macro} | \\\n'
-
-        nameString = nameString[:-2]    # get rid of last ', '
-        string0  = f'#define {reg}__set({nameString}) (\\\n'
-        string1 = string1[:-5]
-        string1 += ')\n'
-        return string0 + string1
-
-    def writeOneReg(self, FILE, regInfo):
-        """
-            Write driver for one register.
-        """
-        reg = self.NAME + '__' + regInfo[REGNAME].upper()
-        addr = hex(regInfo[ADDR])
-        nameList = []
-        string  = f'// =============================================\n'
-        string += f'// Register: {regInfo[REGNAME]}, Address: {addr}\n'
-        string += f'// =============================================\n'
-        string += f'#define {reg}\n'
-        string += addSpace(f'#define {reg}_ADDR', SPACE) + f'{addr}\n\n'
-        for fieldInfo in regInfo[FLDLIST]:
-            nameList.append(fieldInfo[FNAME].upper())
-            string += self.OneFieldStr(fieldInfo, reg)
-        string += self.setRegStr(reg, nameList)
-        string += lines(2)
-        FILE.write(string)
-
-
-    def writeAllReg(self, FILE, regsInfo):
-        """
-            Write all the register.
+        nameList = [name for name in reversed(nameList) if name != RSVR]
+        FILE.write(f'#define {reg}__set({", ".join(nameList)}) (\\\n')
+        FILE.write(' | \\\n'.join(space1 + f'{reg}__{name}{SET_SUFFIX}({name})' for name in nameList))
+        FILE.write(')\n')
+
+    def writeBitsHelper(self, FILE, reg, kind, addr):
+        """
+            Write the macro writing 1 to set, clear or toggle the bits of a register in a single write
             Parameters:
-                :param FILE: The file pointer
-                :param regsInfo: the register info array for all the register
+                :param reg: the register macro name
+                :param kind: SET, CLR or TGL
+                :param addr: the address macro written
         """
-        for regInfo in regsInfo:
-            self.writeOneReg(FILE, regInfo)
+        type = self.ctype
+        FILE.write(f'#define {reg}__{kind}_BITS(base, bits) \\\n')
+        FILE.write(f'{space1}(*(volatile {type} *)((base) + {addr}) = (bits))\n')
 
-    def writeDriver(self):
+    def begin(self, FILE, model):
+        """ Write the file header """
+        self.prefix(FILE, self.name)
+        self.width = model.reg_width
+        self.type = f'{self.NAME}_reg_t'
+        self.ctype = self.type if self.width > 32 else 'uint32_t'    # C type of the register accesses
+        self.stdint = self.width > 32     # stdint.h is included
+        self.layout = []    # (address, member name, count, stride, address macro) of the struct overlay
+        self.shadow = []    # (register macro, reset value) of the registers with a shadow
+        if self.width > 32:
+            FILE.write(f'#include <stdint.h>\n\n')
+            FILE.write(f'// Register width: {self.width} bits\n')
+            FILE.write(f'typedef {C_TYPES[self.width]} {self.type};\n')
+            FILE.write(lines(2))
+        if model.read_mux:
+            FILE.write(f'// Cycles from the SW read to the read data (read mux tree)\n')
+            FILE.write(f'#define {self.NAME}_READ_LATENCY {model.read_latency}\n')
+            FILE.write(lines(2))
+
+    def beginRegister(self, FILE, reg):
+        """ Write the register address """
+        self.reg = self.NAME + '__' + reg.name.upper()
+        self.regName = reg.name
+        self.nameList = []
+        addr = hex(reg.addr)
+        if reg.count > 1:
+            # register array: indexed address macro
+            stride = hex(reg.stride)
+            FILE.write(f'// =============================================\n')
+            FILE.write(f'// Register: {reg.name}[{reg.count}], Address: {addr} + i * {stride}\n')
+            if reg.ram:
+                FILE.write(f'// Register file in RAM: not reset\n')
+            FILE.write(f'// =============================================\n')
+            FILE.write(f'#define {self.reg}\n')
+            FILE.write(addSpace(f'#define {self.reg}_ADDR(i)', SPACE) + f'({addr} + (i) * {stride})\n')
+            FILE.write(addSpace(f'#define {self.reg}_COUNT', SPACE) + f'{reg.count}\n')
+            FILE.write(addSpace(f'#define {self.reg}_STRIDE', SPACE) + f'{stride}\n\n')
+            self.hasShadow = False
+            self.layout.append((reg.addr, reg.name, reg.count, reg.stride, f'{self.reg}_ADDR(0)'))
+            return
+        FILE.write(f'// =============================================\n')
+        FILE.write(f'// Register: {reg.name}, Address: {addr}\n')
+        FILE.write(f'// =============================================\n')
+        FILE.write(f'#define {self.reg}\n')
+        FILE.write(addSpace(f'#define {self.reg}_ADDR', SPACE) + f'{addr}\n')
+        self.layout.append((reg.addr, reg.name, 1, 0, f'{self.reg}_ADDR'))
+        for (kind, aliasAddr) in reg.aliases:
+            FILE.write(addSpace(f'#define {self.reg}_{kind.upper()}_ADDR', SPACE) + f'{hex(aliasAddr)}\n')
+            self.layout.append((aliasAddr, f'{reg.name}_{kind}', 1, 0, f'{self.reg}_{kind.upper()}_ADDR'))
+        # index of the register in the shadow
+        self.hasShadow = self.isShadowed(reg)
+        if self.hasShadow:
+            FILE.write(addSpace(f'#define {self.reg}_SHADOW', SPACE) + f'{len(self.shadow)}\n')
+            reset = sum(field.reset << field.lsb for field in reg.fields)
+            self.shadow.append((self.reg, reset & ((1 << self.width) - 1)))
+        FILE.write('\n')
+
+    def field(self, FILE, reg, field):
+        """ Write the macros of one field """
+        self.nameList.append(field.name.upper())
+        self.writeOneField(FILE, field, self.reg)
+
+    def endRegister(self, FILE, reg):
+        """ Write the macro to set the register value and the single write helpers """
+        self.writeSetReg(FILE, self.reg, self.nameList)
+        if self.hasShadow:
+            self.writeShadowReg(FILE, self.reg)
+        swtypes = [field.swtype for field in reg.fields]
+        helpers = [(kind.upper(), f'{self.reg}_{kind.upper()}_ADDR') for (kind, addr) in reg.aliases]
+        # without the clr alias, the W1C bits are cleared by a write to the register if it has no SW RW field
+        if 'W1C' in swtypes and 'W' not in swtypes and not reg.alias & ALIAS_CLR and reg.count == 1:
+            helpers.append(('CLR', f'{self.reg}_ADDR'))
+        if helpers:
+            FILE.write(lines(1))
+            if not self.stdint:
+                FILE.write(f'#include <stdint.h>\n')
+                self.stdint = True
+            FILE.write(f'// Single write helpers, base is the address of the CSR module\n')
+        for (kind, addr) in helpers:
+            self.writeBitsHelper(FILE, self.reg, kind, addr)
+        FILE.write(lines(2))
+
+    def writeOverlay(self, FILE):
         """
-            Write all the content.
+            Write the struct overlaying the register block, with the static checks of the member
+            offsets against the address macros. The members are naturally aligned so the struct
+            is not packed, a packed struct can turn the volatile accesses into byte accesses.
         """
-        fullpath = self.path + '/' + self.name + '_csr.h'
-        FILE = open(fullpath, "w")
-        self.prefix(FILE, self.name)
-        self.writeAllReg(FILE, self.regsInfo)
-        FILE.close()
+        size = self.width // 8
+        type = self.ctype
+        regs = f'{self.NAME}_regs_t'
+        check = f'{self.NAME}_STATIC_ASSERT'
+        FILE.write(f'// =============================================\n')
+        FILE.write(f'// Register block overlay: ({regs} *)<address of the CSR module>\n')
+        FILE.write(f'// =============================================\n')
+        if not self.stdint:
+            FILE.write(f'#include <stdint.h>\n')
+        FILE.write(f'#include <stddef.h>\n\n')
+        FILE.write(f'typedef struct {{\n')
+        end = 0
+        for (addr, name, count, stride, macro) in sorted(self.layout):
+            if addr > end:
+                FILE.write(INDENT(2) + f'volatile {type} reserved_{format(end, "x")}[{(addr - end) // size}];\n')
+            if count == 1:
+                FILE.write(addSpace(INDENT(2) + f'volatile {type} {name};', SPACE) + f'// {hex(addr)}\n')
+            elif stride == size:
+                FILE.write(addSpace(INDENT(2) + f'volatile {type} {name}[{count}];', SPACE) + f'// {hex(addr)}\n')
+            else:
+                # the registers of the array are reg, followed by the gap up to the stride
+                FILE.write(INDENT(2) + f'struct {{\n')
+                FILE.write(INDENT(4) + f'volatile {type} reg;\n')
+                FILE.write(INDENT(4) + f'volatile {type} reserved[{stride // size - 1}];\n')
+                FILE.write(addSpace(INDENT(2) + f'}} {name}[{count}];', SPACE) + f'// {hex(addr)} + i * {hex(stride)}\n')
+            end = addr + count * (stride or size)
+        FILE.write(f'}} {regs};\n\n')
+        FILE.write(f'#ifdef __cplusplus\n')
+        FILE.write(f'#define {check} static_assert\n')
+        FILE.write(f'#else\n')
+        FILE.write(f'#define {check} _Static_assert\n')
+        FILE.write(f'#endif\n')
+        for (addr, name, count, stride, macro) in self.layout:
+            FILE.write(f'{check}(offsetof({regs}, {name}) == {macro}, "{name} offset");\n')
+        FILE.write(f'{check}(sizeof({regs}) == {hex(end)}, "{regs} size");\n')
+        FILE.write(lines(2))
+
+    def writeBulkAccess(self, FILE):
+        """
+            Write the functions reading or writing a range of contiguous registers in one loop
+        """
+        size = self.width // 8
+        type = self.ctype
+        regs = f'{self.NAME}_regs_t'
+        FILE.write(f'// Read or write count contiguous registers from the register at address addr, in one loop\n')
+        FILE.write(f'// (for a burst or a DMA like copy). Beware that a read of a FIFOR register pops the FIFO.\n')
+        FILE.write(f'static inline void {self.NAME}_read_regs(const volatile {regs} *regs, size_t addr, '
+                   f'{type} *buf, size_t count)\n')
+        FILE.write(f'{{\n')
+        FILE.write(INDENT(2) + f'const volatile {type} *src = (const volatile {type} *)regs + addr / {size};\n')
+        FILE.write(INDENT(2) + f'size_t i;\n')
+        FILE.write(INDENT(2) + f'for (i = 0; i < count; i++)\n')
+        FILE.write(INDENT(4) + f'buf[i] = src[i];\n')
+        FILE.write(f'}}\n\n')
+        FILE.write(f'static inline void {self.NAME}_write_regs(volatile {regs} *regs, size_t addr, '
+                   f'const {type} *buf, size_t count)\n')
+        FILE.write(f'{{\n')
+        FILE.write(INDENT(2) + f'volatile {type} *dst = (volatile {type} *)regs + addr / {size};\n')
+        FILE.write(INDENT(2) + f'size_t i;\n')
+        FILE.write(INDENT(2) + f'for (i = 0; i < count; i++)\n')
+        FILE.write(INDENT(4) + f'dst[i] = buf[i];\n')
+        FILE.write(f'}}\n')
 
+    def writeShadow(self, FILE):
+        """
+            Write the shadow of the SW RW registers and its functions, enabled by <MODULE>_SHADOW.
+            The update functions write the register without reading it, the stage functions only
+            change the shadow and mark the register dirty, and the flush writes the dirty registers.
+        """
+        type   = self.ctype
+        size   = self.width // 8
+        shadow = f'{self.NAME}_shadow_t'
+        count  = f'{self.NAME}_SHADOW_COUNT'
+        words  = f'{self.NAME}_SHADOW_WORDS'
+        FILE.write(f'// =============================================\n')
+        FILE.write(f'// Shadow of the SW RW registers (no HW written field), define {self.NAME}_SHADOW to use it.\n')
+        FILE.write(f'// The read-modify-write of a field is done on the shadow, without reading the register.\n')
+        FILE.write(f'// =============================================\n')
+        FILE.write(f'#ifdef {self.NAME}_SHADOW\n')
+        FILE.write(addSpace(f'#define {count}', SPACE) + f'{len(self.shadow)}\n')
+        FILE.write(addSpace(f'#define {words}', SPACE) + f'{(len(self.shadow) + 31) // 32}\n\n')
+        FILE.write(f'typedef struct {{\n')
+        FILE.write(INDENT(2) + f'{type} value[{count}];\n')
+        FILE.write(INDENT(2) + f'uint32_t dirty[{words}];  // registers changed since the last flush\n')
+        FILE.write(f'}} {shadow};\n\n')
+        # init
+        FILE.write(f'// Set the shadow to the reset values of the registers\n')
+        FILE.write(f'static inline void {self.NAME}_shadow_init({shadow} *shadow)\n')
+        FILE.write(f'{{\n')
+        FILE.write(INDENT(2) + f'static const {type} reset[{count}] = {{\n')
+        FILE.write(',\n'.join(INDENT(4) + self.constant(value) for (reg, value) in self.shadow) + '\n')
+        FILE.write(INDENT(2) + f'}};\n')
+        FILE.write(INDENT(2) + f'size_t i;\n')
+        FILE.write(INDENT(2) + f'for (i = 0; i < {count}; i++)\n')
+        FILE.write(INDENT(4) + f'shadow->value[i] = reset[i];\n')
+        FILE.write(INDENT(2) + f'for (i = 0; i < {words}; i++)\n')
+        FILE.write(INDENT(4) + f'shadow->dirty[i] = 0;\n')
+        FILE.write(f'}}\n\n')
+        # update and stage
+        FILE.write(f'// Change the bits of mask of the register i in the shadow and write the register\n')
+        FILE.write(f'static inline void {self.NAME}_shadow_update(volatile {type} *reg, {shadow} *shadow, '
+                   f'size_t i, {type} mask, {type} value)\n')
+        FILE.write(f'{{\n')
+        FILE.write(INDENT(2) + f'shadow->value[i] = (shadow->value[i] & ~mask) | (value & mask);\n')
+        FILE.write(INDENT(2) + f'*reg = shadow->value[i];\n')
+        FILE.write(f'}}\n\n')
+        FILE.write(f'// Change the bits of mask of the register i in the shadow, the register is written by the flush\n')
+        FILE.write(f'static inline void {self.NAME}_shadow_stage({shadow} *shadow, size_t i, {type} mask, {type} value)\n')
+        FILE.write(f'{{\n')
+        FILE.write(INDENT(2) + f'shadow->value[i] = (shadow->value[i] & ~mask) | (value & mask);\n')
+        FILE.write(INDENT(2) + f'shadow->dirty[i / 32] |= (uint32_t)1 << (i % 32);\n')
+        FILE.write(f'}}\n\n')
+        # flush
+        FILE.write(f'// Write the registers changed in the shadow since the last flush\n')
+        FILE.write(f'static inline void {self.NAME}_shadow_flush(volatile {self.NAME}_regs_t *regs, {shadow} *shadow)\n')
+        FILE.write(f'{{\n')
+        FILE.write(INDENT(2) + f'static const uint32_t addr[{count}] = {{\n')
+        FILE.write(',\n'.join(INDENT(4) + f'{reg}_ADDR' for (reg, value) in self.shadow) + '\n')
+        FILE.write(INDENT(2) + f'}};\n')
+        FILE.write(INDENT(2) + f'volatile {type} *base = (volatile {type} *)regs;\n')
+        FILE.write(INDENT(2) + f'size_t w, i;\n')
+        FILE.write(INDENT(2) + f'for (w = 0; w < {words}; w++) {{\n')
+        FILE.write(INDENT(4) + f'uint32_t dirty = shadow->dirty[w];\n')
+        FILE.write(INDENT(4) + f'shadow->dirty[w] = 0;\n')
+        FILE.write(INDENT(4) + f'for (i = w * 32; dirty; i++, dirty >>= 1)\n')
+        FILE.write(INDENT(6) + f'if (dirty & 1)\n')
+        FILE.write(INDENT(8) + f'base[addr[i] / {size}] = shadow->value[i];\n')
+        FILE.write(INDENT(2) + f'}}\n')
+        FILE.write(f'}}\n')
+        FILE.write(f'#endif\n')
+
+    def end(self, FILE):
+        """ Write the register block overlay, the bulk access functions and the shadow of the registers """
+        self.writeOverlay(FILE)
+        self.writeBulkAccess(FILE)
+        if self.shadow:
+            FILE.write(lines(2))
+            self.writeShadow(FILE)
+
+    def writeDriver(self, model):
+        """
+            Write all the content.
+            Parameters:
+                :param model: the register model (RegModel)
+        """
+        emitAll(model, [self])
@@ -0,0 +1,112 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Base class of the output writers (backends) and the function walking the
+#   register model. The model is walked once and each register and field event
+#   is sent to all the enabled writers.
+#
+#########################################################################################
+
+import io
+import os
+
+from common import *
+
+class Emitter(object):
+
+    # Name of the backend, used by the -only option and as the default output sub directory
+    backend = None
+    # Suffix of the output file name
+    suffix  = None
+
+    def __init__(self, name, path):
+        """
+        Parameters:
+            :param name: the name of the register module
+            :param path: the path of to the output file
+        """
+        self.name = name
+        self.path = path
+
+    def fullpath(self) -> str:
+        """ Return the path of the output file """
+        return self.path + '/' + self.name + self.suffix
+
+    def cacheInfo(self, model):
+        """
+        Return the part of the model this writer depends on.
+        It is hashed by the build cache to decide if the output needs to be written.
+        """
+        return (model.addr_width, model.registers)
+
+    def begin(self, FILE, model):
+        """
+        Called before the first register
+        Parameters:
+            :param FILE: The file pointer
+            :param model: the register model (RegModel)
+        """
+        pass
+
+    def beginRegister(self, FILE, reg):
+        """ Called for each register (Register), before its fields """
+        pass
+
+    def field(self, FILE, reg, field):
+        """ Called for each field (Field) of the register """
+        pass
+
+    def endRegister(self, FILE, reg):
+        """ Called for each register, after its fields """
+        pass
+
+    def end(self, FILE):
+        """ Called after the last register """
+        pass
+
+def emitAll(model, emitters, registers=None):
+    """
+    Walk the register model once and send the events to all the writers,
+    then write the output file of each writer.
+    Parameters:
+        :param model: the register model (RegModel)
+        :param emitters: list of Emitter
+        :param registers: iterable of the registers, default is the registers of the model.
+                          With a generator (YmlParser.streamAllReg), the outputs are
+                          written straight to temp files so the memory stays bounded.
+    """
+    stream = registers != None
+    if stream:
+        outputs = [(emitter,) + openTemp(emitter.fullpath()) for emitter in emitters]
+    else:
+        outputs = [(emitter, io.StringIO(), None) for emitter in emitters]
+        registers = model
+    try:
+        for (emitter, FILE, tmp) in outputs:
+            emitter.begin(FILE, model)
+        for reg in registers:
+            for (emitter, FILE, tmp) in outputs:
+                emitter.beginRegister(FILE, reg)
+            for field in reg.fields:
+                for (emitter, FILE, tmp) in outputs:
+                    emitter.field(FILE, reg, field)
+            for (emitter, FILE, tmp) in outputs:
+                emitter.endRegister(FILE, reg)
+        for (emitter, FILE, tmp) in outputs:
+            emitter.end(FILE)
+            if stream:
+                FILE.close()
+                commitTemp(tmp, emitter.fullpath())
+            else:
+                writeFile(emitter.fullpath(), FILE.getvalue())
+    finally:
+        for (emitter, FILE, tmp) in outputs:
+            if stream and os.path.exists(tmp):
+                FILE.close()
+                os.remove(tmp)
@@ -12,54 +12,42 @@
 #########################################################################################
 
 from common import *
+from config import *
+from Emitter import *
 
-# Define the index for each register
-REGNAME = 0
-ADDR    = 1
-FLDLIST = 2
+class HtmlWriter(Emitter):
 
-# Define the index for each field Array
-# [Name, MSb, LSb, SWTYPE, HWTYPE, Reset Value, Description]
-FNAME   = 0
-MSB     = 1
-LSB     = 2
-SWTYPE  = 3
-HWTYPE  = 4
-RESET   = 5
-NOTE    = 6
+    backend = 'doc'
+    suffix  = '_csr.html'
 
-class HtmlWriter(object):
+    def cacheInfo(self, model):
+        """ The HTML document only depends on the register list, the register width and the read latency """
+        return (model.registers, model.reg_width, model.read_mux, model.read_stages)
 
-    def __init__(self, regsInfo, name, path):
-        """
-        Parameters:
-            :param regsInfo: the register info array for all register
-            :param name: the name of the register module
-            :param path: the path of to the document
-        """
-        self.regsInfo = regsInfo
-        self.name = name
-        self.path = path
-
-    def htmlPrefix(self, FILE, name):
+    def htmlPrefix(self, FILE, name, latency=None, width=REG_WIDTH):
         """
         Write the header par of the HTML file
         Parameters:
             :param name: the name of the register module
             :param FILE: The file pointer
-        """
-        string  = '<!DOCTYPE html>\n'
-        string += '<html lang="">\n'
-        string += INDENT(1) + '<head>\n'
-        string += INDENT(2) + f'<title>Register module for {name}</title>\n'
-        string += INDENT(1) + '</head>\n\n'
-        string += INDENT(1) + '<body>\n'
-        string += INDENT(2) + '<p>\n'
-        string += INDENT(2) + f'CSR Document for {name}<br />\n'
-        string += INDENT(2) + 'Generated by Simple CSR Generator<br />\n'
-        string += INDENT(2) + f'Created: {MONTH}/{DAY}/{YEAR} {HOUR}:{MINUTE}<br />\n'
-        string += INDENT(2) + '</p>\n\n'
-        FILE.write(string)
+            :param latency: the read latency of the read mux tree, None for the flat read mux
+            :param width: the register width
+        """
+        FILE.write('<!DOCTYPE html>\n')
+        FILE.write('<html lang="">\n')
+        FILE.write(INDENT(1) + '<head>\n')
+        FILE.write(INDENT(2) + f'<title>Register module for {name}</title>\n')
+        FILE.write(INDENT(1) + '</head>\n\n')
+        FILE.write(INDENT(1) + '<body>\n')
+        FILE.write(INDENT(2) + '<p>\n')
+        FILE.write(INDENT(2) + f'CSR Document for {name}<br />\n')
+        FILE.write(INDENT(2) + 'Generated by Simple CSR Generator<br />\n')
+        FILE.write(INDENT(2) + f'Created: {MONTH}/{DAY}/{YEAR} {HOUR}:{MINUTE}<br />\n')
+        if width != REG_WIDTH:
+            FILE.write(INDENT(2) + f'Register width: {width} bits<br />\n')
+        if latency:
+            FILE.write(INDENT(2) + f'Read latency: {latency} cycle(s), with the read valid/ready handshake<br />\n')
+        FILE.write(INDENT(2) + '</p>\n\n')
 
     def htmlsuffix(self, FILE):
         """
@@ -68,86 +56,78 @@ class HtmlWriter(object):
             :param name: the name of the register module
             :param FILE: The file pointer
         """
-        string  = INDENT(1) + '</head>\n'
-        string += '</html>\n'
-        FILE.write(string)
+        FILE.write(INDENT(1) + '</head>\n')
+        FILE.write('</html>\n')
 
-    def tableHeader(self, name, addr):
+    def tableHeader(self, FILE, name, addr):
         """
         Write the header for a table
         Parameters:
             :param name: the name of the register
         """
-        string  = INDENT(2) + f'<h4>{name}: {addr}</h4>\n'
-        string += INDENT(2) + '<table border="4">\n'
-        string += INDENT(2) + '<tr>\n'
-        string += INDENT(3) + '<td>Field</td>\n'
-        string += INDENT(3) + '<td>Range</td>\n'
-        string += INDENT(3) + '<td>Reset Value</td>\n'
-        string += INDENT(3) + '<td>SW Access Type</td>\n'
-        string += INDENT(3) + '<td>HW Access Type</td>\n'
-        string += INDENT(3) + '<td>Description</td>\n'
-        string += INDENT(2) + '</tr>\n'
-        return string
+        FILE.write(INDENT(2) + f'<h4>{name}: {addr}</h4>\n')
+        FILE.write(INDENT(2) + '<table border="4">\n')
+        FILE.write(INDENT(2) + '<tr>\n')
+        FILE.write(INDENT(3) + '<td>Field</td>\n')
+        FILE.write(INDENT(3) + '<td>Range</td>\n')
+        FILE.write(INDENT(3) + '<td>Reset Value</td>\n')
+        FILE.write(INDENT(3) + '<td>SW Access Type</td>\n')
+        FILE.write(INDENT(3) + '<td>HW Access Type</td>\n')
+        FILE.write(INDENT(3) + '<td>Description</td>\n')
+        FILE.write(INDENT(2) + '</tr>\n')
 
-    def OneFieldStr(self, fieldInfo) -> str:
+    def writeOneField(self, FILE, field):
         """
             Write HTML for one field.
-            Returns a string of the content to be written
-
-            Parameters:
-                :param regInfo: the register info array for 1 register
-        """
-        string  = INDENT(2) + '<tr>\n'
-        string += INDENT(3) + f'<td>{fieldInfo[FNAME]}</td>\n'
-        string += INDENT(3) + f'<td>{fieldInfo[MSB]} - {fieldInfo[LSB]}</td>\n'
-        string += INDENT(3) + f'<td>{hex(fieldInfo[RESET])}</td>\n'
-        string += INDENT(3) + f'<td>{fieldInfo[SWTYPE]}</td>\n'
-        string += INDENT(3) + f'<td>{fieldInfo[HWTYPE]}</td>\n'
-        string += INDENT(3) + f'<td>{fieldInfo[NOTE]}</td>\n'
-        string += INDENT(2) + '</tr>\n'
-        return string
-
-    def OneRegStr(self, regInfo):
-        """
-            Write HTML for one register.
-            Returns a string of the content to be written
 
             Parameters:
-                :param regInfo: the register info array for 1 register
-        """
-        string = self.tableHeader(regInfo[REGNAME], hex(regInfo[ADDR]))
-        for fieldInfo in regInfo[FLDLIST]:
-            string += self.OneFieldStr(fieldInfo)
-        string += INDENT(2) + '</table>\n\n' # table tail
-        return string
-
-    def writeAllReg(self, FILE, regsInfo):
-        """
-            Write all the register.
-            Parameters:
-                :param FILE: The file pointer
-                :param regsInfo: the register info array for all the register
-        """
-        for regInfo in regsInfo:
-            FILE.write(self.OneRegStr(regInfo))
+                :param field: the Field
+        """
+        FILE.write(INDENT(2) + '<tr>\n')
+        FILE.write(INDENT(3) + f'<td>{field.name}</td>\n')
+        FILE.write(INDENT(3) + f'<td>{field.msb} - {field.lsb}</td>\n')
+        FILE.write(INDENT(3) + f'<td>{hex(field.reset)}</td>\n')
+        FILE.write(INDENT(3) + f'<td>{field.swtype}</td>\n')
+        FILE.write(INDENT(3) + f'<td>{field.hwtype}</td>\n')
+        FILE.write(INDENT(3) + f'<td>{field.note}</td>\n')
+        FILE.write(INDENT(2) + '</tr>\n')
+
+    def begin(self, FILE, model):
+        """ Write the document header """
+        self.htmlPrefix(FILE, self.name, model.read_latency if model.read_mux else None, model.reg_width)
+
+    def beginRegister(self, FILE, reg):
+        """ Write the register table header """
+        if reg.count > 1:
+            self.tableHeader(FILE, f'{reg.name}[{reg.count}]', f'{hex(reg.addr)} + i * {hex(reg.stride)}')
+        elif reg.alias:
+            aliases = ', '.join(f'{kind}: {hex(addr)}' for (kind, addr) in reg.aliases)
+            self.tableHeader(FILE, reg.name, f'{hex(reg.addr)} (alias {aliases})')
+        else:
+            self.tableHeader(FILE, reg.name, hex(reg.addr))
+
+    def field(self, FILE, reg, field):
+        """ Write one row of the register table """
+        self.writeOneField(FILE, field)
+
+    def endRegister(self, FILE, reg):
+        """ Write the register table tail """
+        FILE.write(INDENT(2) + '</table>\n') # table tail
+        if reg.ram:
+            FILE.write(INDENT(2) + '<p>Register file in RAM: the registers are not reset (the reset value is not used). '
+                                   f'The HW reads the registers through the i_hw_{reg.name}_ram_read / '
+                                   f'i_hw_{reg.name}_ram_addr / o_hw_{reg.name}_ram_data port, '
+                                   'with one cycle of latency.</p>\n')
+        FILE.write('\n')
+
+    def end(self, FILE):
+        """ Write the document tail """
+        self.htmlsuffix(FILE)
 
-    def writeHtml(self):
+    def writeHtml(self, model):
         """
             Write all the content.
+            Parameters:
+                :param model: the register model (RegModel)
         """
-        fullpath = self.path + '/' + self.name + '_csr.html'
-        FILE = open(fullpath, "w")
-        self.htmlPrefix(FILE, self.name)
-        self.writeAllReg(FILE, self.regsInfo)
-        self.htmlsuffix(FILE)
-        FILE.close()
-
-
-if __name__ == "__main__":
-    regsInfo = [['pio_read', 0, ['data', 31, 0, 'R', 'W', 0, 'pio read data']], ['pio_write', 4, ['data', 31, 0, 'W', 'R', 0, 'pio write data']], ['pio_ctrl_status', 8, ['edge_capture_en', 0, 0, 'W', 'R', 0, 'enable edge capturing'], ['RSVR', 1, 1, 'NA', 'NA', 0, 'Reserved Field'], ['edge_captured', 2, 2, 'R', 'W', 0, 'captured edge activity (if any)'], ['RSVR', 31, 3, 'NA', 'NA', 0, 'Reserved Field']]]
-    path = '.'
-    name = 'pio'
-
-    hwriter = HtmlWriter(regsInfo, name, path)
-    hwriter.writeHtml()
+        emitAll(model, [self])
@@ -0,0 +1,128 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Per stage instrumentation (wall time, CPU time, tracemalloc peak) used by the
+#   -profile option. The records are plain dicts so they can be returned by the
+#   worker processes, and can be written as a Chrome trace-event file.
+#   tracemalloc slows down the stages, so the memory peak is only measured on
+#   request (-memory) and the times are then labeled as taken with the tracing on.
+#
+#########################################################################################
+
+import cProfile
+import json
+import marshal
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+class Profiler(object):
+
+    def __init__(self, spec, enabled=False, cprofile=False, memory=False):
+        """
+        Parameters:
+            :param spec: the spec being profiled
+            :param enabled: False to make all the stages no-op
+            :param cprofile: also run cProfile and keep the stats of the slowest stage
+            :param memory: also measure the tracemalloc peak, the times include the tracing overhead
+        """
+        self.spec = spec
+        self.enabled = enabled
+        self.cprofile = cprofile
+        self.memory = memory
+        self.records = []   # [{spec, stage, ts, wall, cpu, peak, pid},], peak is None without memory
+        self.hottest = None # (wall, stage, cProfile stats)
+
+    @contextmanager
+    def stage(self, name, outer=False):
+        """
+        Measure a stage
+        Parameters:
+            :param name: the name of the stage
+            :param outer: True for a stage containing other stages (e.g. the total).
+                          It is not run with cProfile as only one profiler can be active.
+        """
+        if not self.enabled:
+            yield
+            return
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        first = len(self.records)
+        profile = cProfile.Profile() if self.cprofile and not outer else None
+        ts = time.time()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            record = {
+                'spec': self.spec,
+                'stage': name,
+                'ts': ts,
+                'wall': time.perf_counter() - wall,
+                'cpu': time.process_time() - cpu,
+                'peak': tracemalloc.get_traced_memory()[1] if self.memory else None,
+                'pid': os.getpid(),
+            }
+            # the inner stages reset the peak
+            for inner in self.records[first:] if self.memory else ():
+                record['peak'] = max(record['peak'], inner['peak'])
+            self.records.append(record)
+            if profile and (self.hottest == None or record['wall'] > self.hottest[0]):
+                profile.create_stats()
+                self.hottest = (record['wall'], f'{self.spec}:{name}', profile.stats)
+
+def summary(records) -> str:
+    """ Return the summary table of the records, with the total of each stage """
+    table = [f"{'spec':<30} {'stage':<10} {'wall(ms)':>10} {'cpu(ms)':>10} {'peak(MB)':>10}"]
+    total = {}
+    for record in records:
+        peak = '-' if record['peak'] == None else f"{record['peak'] / 2**20:.2f}"
+        table.append(f"{record['spec'][-30:]:<30} {record['stage']:<10} {record['wall'] * 1e3:10.2f} "
+                     f"{record['cpu'] * 1e3:10.2f} {peak:>10}")
+        (wall, cpu) = total.get(record['stage'], (0, 0))
+        total[record['stage']] = (wall + record['wall'], cpu + record['cpu'])
+    table.append('-' * 74)
+    for (stage, (wall, cpu)) in total.items():
+        table.append(f"{'TOTAL':<30} {stage:<10} {wall * 1e3:10.2f} {cpu * 1e3:10.2f}")
+    if any(record['peak'] != None for record in records):
+        table.append('wall and cpu are measured with the tracemalloc tracing on, run without -memory for the times')
+    return '\n'.join(table) + '\n'
+
+def writeChromeTrace(records, path):
+    """
+    Write the records in the Chrome trace-event format (chrome://tracing, Perfetto)
+    Parameters:
+        :param records: the records of all the specs
+        :param path: the trace file
+    """
+    events = [{
+        'name': record['stage'],
+        'cat': record['spec'],
+        'ph': 'X',
+        'ts': record['ts'] * 1e6,
+        'dur': record['wall'] * 1e6,
+        'pid': record['pid'],
+        'tid': 0,
+        'args': {'spec': record['spec'], 'cpu_ms': record['cpu'] * 1e3, 'peak_bytes': record['peak']},
+    } for record in records]
+    with open(path, 'w') as FILE:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, FILE)
+
+def writeCProfile(stats, path):
+    """ Write the cProfile stats in the pstats file format (python -m pstats <path>) """
+    with open(path, 'wb') as FILE:
+        marshal.dump(stats, FILE)
@@ -0,0 +1,207 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   This script takes the result from YmlParser and write a python module for the
+#   test and bring-up tools. The module only has plain constants and tables
+#   (address, offset and mask of each register and field) and the functions to
+#   pack and unpack the register words, so it is imported without the generator.
+#
+#########################################################################################
+
+from common import *
+from config import *
+from Emitter import *
+
+SPACE = 60
+
+lines = lambda x: '\n' * x
+
+class PythonWriter(Emitter):
+
+    backend = 'python'
+    suffix  = '_csr.py'
+
+    def __init__(self, name, path):
+        """
+        Parameters:
+            :param name: the name of the register module
+            :param path: the path of to the python module
+        """
+        Emitter.__init__(self, name, path)
+        self.NAME = name.upper()
+
+    def cacheInfo(self, model):
+        """ The module depends on the register address and the field range, access types and reset value """
+        return [model.reg_width, model.addr_width, model.read_latency] + [
+                (reg.name, reg.addr, reg.count, reg.stride, reg.alias,
+                 [(field.name, field.msb, field.lsb, field.swtype, field.hwtype, field.reset) for field in reg.fields])
+                for reg in model]
+
+    def prefix(self, FILE, name):
+        """
+        Write the header of the python module
+        Parameters:
+            :param name: the name of the register module
+            :param FILE: The file pointer
+        """
+        FILE.write(f'#' * 54 + '\n')
+        FILE.write(f'#\n')
+        FILE.write(f'# Register tables of the {name} CSR module\n')
+        FILE.write(f'# Generated by Simple CSR Generator\n')
+        FILE.write(f'# Created: {MONTH}/{DAY}/{YEAR} {HOUR}:{MINUTE}\n')
+        FILE.write(f'#\n')
+        FILE.write(f'#' * 54 + '\n')
+        FILE.write(lines(1))
+
+    def begin(self, FILE, model):
+        """ Write the file header and the module parameters """
+        self.prefix(FILE, self.name)
+        FILE.write(f'"""\n')
+        FILE.write(f'Registers of the {self.name} CSR module.\n\n')
+        FILE.write(f'REGS:   register name -> (address, count, stride)\n')
+        FILE.write(f'FIELDS: register name -> ((field name, offset, mask, SW type, HW type, reset),)\n')
+        FILE.write(f'        the mask is not shifted, the reserved fields are not listed\n')
+        FILE.write(f'RESET:  register name -> reset value of the register word\n')
+        FILE.write(f'"""\n\n')
+        FILE.write(f'from bisect import bisect_right\n\n')
+        FILE.write(addSpace(f'NAME', SPACE) + f'= {self.name!r}\n')
+        FILE.write(addSpace(f'REG_WIDTH', SPACE) + f'= {model.reg_width}\n')
+        FILE.write(addSpace(f'REG_BYTES', SPACE) + f'= {model.reg_width // 8}\n')
+        FILE.write(addSpace(f'ADDR_WIDTH', SPACE) + f'= {model.addr_width}\n')
+        FILE.write(addSpace(f'READ_LATENCY', SPACE) + f'= {model.read_latency}\n')
+        FILE.write(lines(2))
+        self.size   = model.reg_width // 8
+        self.regs   = []    # (name, address, count, stride) of each register
+        self.fields = []    # (register name, ((field name, offset, mask, swtype, hwtype, reset),)) of each register
+        self.resets = []    # (register name, reset value) of each register
+        self.ranges = []    # (address, end address, stride, register name) of each register and alias address
+
+    def beginRegister(self, FILE, reg):
+        """ Write the register address """
+        self.reg = reg.name.upper()
+        self.regFields = []
+        self.reset = 0
+        addr = hex(reg.addr)
+        FILE.write(f'# Register: {reg.name}' + (f'[{reg.count}]' if reg.count > 1 else '') + f', Address: {addr}\n')
+        FILE.write(addSpace(f'{self.reg}_ADDR', SPACE) + f'= {addr}\n')
+        self.regs.append((reg.name, reg.addr, reg.count, reg.stride if reg.count > 1 else self.size))
+        if reg.count > 1:
+            FILE.write(addSpace(f'{self.reg}_COUNT', SPACE) + f'= {reg.count}\n')
+            FILE.write(addSpace(f'{self.reg}_STRIDE', SPACE) + f'= {hex(reg.stride)}\n')
+            self.ranges.append((reg.addr, reg.addr + reg.count * reg.stride, reg.stride, reg.name))
+            return
+        self.ranges.append((reg.addr, reg.addr + self.size, self.size, reg.name))
+        for (kind, aliasAddr) in reg.aliases:
+            FILE.write(addSpace(f'{self.reg}_{kind.upper()}_ADDR', SPACE) + f'= {hex(aliasAddr)}\n')
+            self.ranges.append((aliasAddr, aliasAddr + self.size, self.size, reg.name))
+
+    def field(self, FILE, reg, field):
+        """ Write the offset and the mask of one field """
+        self.reset |= field.reset << field.lsb
+        name = field.name.upper()
+        if name == RSVR:
+            return
+        mask = (1 << field.size) - 1
+        FILE.write(addSpace(f'{self.reg}__{name}__OFT', SPACE) + f'= {field.lsb}\n')
+        FILE.write(addSpace(f'{self.reg}__{name}__MASK', SPACE) + f'= {hex(mask << field.lsb)}\n')
+        self.regFields.append((field.name, field.lsb, mask, field.swtype, field.hwtype, field.reset))
+
+    def endRegister(self, FILE, reg):
+        """ Keep the field table of the register """
+        self.fields.append((reg.name, tuple(self.regFields)))
+        self.resets.append((reg.name, self.reset & ((1 << self.size * 8) - 1)))
+        FILE.write(lines(1))
+
+    def writeTables(self, FILE):
+        """ Write the register, field and reset value tables and the address lookup table """
+        FILE.write(lines(1))
+        FILE.write(f'REGS = {{\n')
+        for (name, addr, count, stride) in self.regs:
+            FILE.write(INDENT(2) + f'{name!r}: ({hex(addr)}, {count}, {hex(stride)}),\n')
+        FILE.write(f'}}\n\n')
+        FILE.write(f'FIELDS = {{\n')
+        for (name, fields) in self.fields:
+            FILE.write(INDENT(2) + f'{name!r}: (\n')
+            for (field, lsb, mask, swtype, hwtype, reset) in fields:
+                FILE.write(INDENT(4) + f'({field!r}, {lsb}, {hex(mask)}, {swtype!r}, {hwtype!r}, {hex(reset)}),\n')
+            FILE.write(INDENT(2) + f'),\n')
+        FILE.write(f'}}\n\n')
+        FILE.write(f'RESET = {{\n')
+        for (name, reset) in self.resets:
+            FILE.write(INDENT(2) + f'{name!r}: {hex(reset)},\n')
+        FILE.write(f'}}\n\n')
+        # sorted address ranges for the bisect in decode, the alias addresses decode to their register
+        ranges = sorted(self.ranges)
+        FILE.write(f'# address ranges (start, end, stride, register name), sorted by address\n')
+        FILE.write(f'_STARTS = (\n')
+        for i in range(0, len(ranges), 8):
+            FILE.write(INDENT(2) + ' '.join(f'{hex(addr)},' for (addr, end, stride, name) in ranges[i:i + 8]) + '\n')
+        FILE.write(f')\n')
+        FILE.write(f'_RANGES = (\n')
+        for (addr, end, stride, name) in ranges:
+            FILE.write(INDENT(2) + f'({hex(addr)}, {hex(end)}, {hex(stride)}, {name!r}),\n')
+        FILE.write(f')\n')
+        FILE.write(lines(2))
+
+    def writeFunctions(self, FILE):
+        """ Write the pack, unpack and decode functions """
+        FILE.write(f'def unpack(reg, value):\n')
+        FILE.write(f'    """ Split a register word into a dict of its field values """\n')
+        FILE.write(f'    return {{name: value >> lsb & mask for (name, lsb, mask, swtype, hwtype, reset) in FIELDS[reg]}}\n')
+        FILE.write(lines(2))
+        FILE.write(f'def pack(reg, fields, value=None):\n')
+        FILE.write(f'    """\n')
+        FILE.write(f'    Build a register word from its field values\n')
+        FILE.write(f'    Parameters:\n')
+        FILE.write(f'        :param reg: register name\n')
+        FILE.write(f'        :param fields: dict of field name: field value, the value is truncated to the field\n')
+        FILE.write(f'        :param value: the word whose fields are changed, default is the reset value\n')
+        FILE.write(f'    """\n')
+        FILE.write(f'    value = RESET[reg] if value == None else value\n')
+        FILE.write(f'    found = 0\n')
+        FILE.write(f'    for (name, lsb, mask, swtype, hwtype, reset) in FIELDS[reg]:\n')
+        FILE.write(f'        if name in fields:\n')
+        FILE.write(f'            value = value & ~(mask << lsb) | (fields[name] & mask) << lsb\n')
+        FILE.write(f'            found += 1\n')
+        FILE.write(f'    if found != len(fields):\n')
+        FILE.write(f'        names = [name for (name, lsb, mask, swtype, hwtype, reset) in FIELDS[reg]]\n')
+        FILE.write(f'        raise KeyError(f\'{{reg}} has no field {{", ".join(set(fields) - set(names))}}\')\n')
+        FILE.write(f'    return value\n')
+        FILE.write(lines(2))
+        FILE.write(f'def decode(addr):\n')
+        FILE.write(f'    """\n')
+        FILE.write(f'    Find the register at a byte address\n')
+        FILE.write(f'    Return:\n')
+        FILE.write(f'        :(register name, index in the register array), None for an unmapped address\n')
+        FILE.write(f'    """\n')
+        FILE.write(f'    i = bisect_right(_STARTS, addr) - 1\n')
+        FILE.write(f'    if i < 0:\n')
+        FILE.write(f'        return None\n')
+        FILE.write(f'    (start, end, stride, name) = _RANGES[i]\n')
+        FILE.write(f'    if addr >= end or (addr - start) % stride:\n')
+        FILE.write(f'        return None\n')
+        FILE.write(f'    return (name, (addr - start) // stride)\n')
+        FILE.write(lines(2))
+        FILE.write(f'def unpackAt(addr, value):\n')
+        FILE.write(f'    """ Split the word read at a byte address into a dict of its field values, None if unmapped """\n')
+        FILE.write(f'    reg = decode(addr)\n')
+        FILE.write(f'    return None if reg == None else unpack(reg[0], value)\n')
+
+    def end(self, FILE):
+        """ Write the tables and the functions """
+        self.writeTables(FILE)
+        self.writeFunctions(FILE)
+
+    def writePython(self, model):
+        """
+            Write all the content.
+            Parameters:
+                :param model: the register model (RegModel)
+        """
+        emitAll(model, [self])
@@ -0,0 +1,222 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   The register model created by YmlParser and consumed by all the writers.
+#   Registers and fields are __slots__ objects with interned strings. The numeric
+#   values (address, array count and stride, msb, lsb, reset) are stored in array
+#   columns of the model, the objects only keep their index into the columns.
+#   A register array is a single Register with a count, it is expanded by the writers.
+#   It can be stored in a RAM instead of flops (ram flag). The FIFO options of a
+#   FIFOR/FIFOW register and its set/clear/toggle alias addresses are flags (fifo, alias).
+#   toData/fromData convert the model to plain data (lists, str, int) for the model cache.
+#
+#########################################################################################
+
+from array import array
+from sys import intern
+
+from common import *
+from config import *
+
+class Field(object):
+
+    __slots__ = ('model', 'index', 'name', 'swtype', 'hwtype', 'note')
+
+    def __init__(self, model, index, name, swtype, hwtype, note):
+        """
+        Parameters:
+            :param model: the RegModel holding the numeric columns
+            :param index: index of the field in the columns
+            :param name: field name
+            :param swtype: SW access type
+            :param hwtype: HW access type
+            :param note: description of the field
+        """
+        self.model  = model
+        self.index  = index
+        self.name   = intern(name)
+        self.swtype = intern(swtype)
+        self.hwtype = intern(hwtype)
+        self.note   = note
+
+    msb   = property(lambda self: self.model.msb[self.index])
+    lsb   = property(lambda self: self.model.lsb[self.index])
+    reset = property(lambda self: self.model.reset[self.index])
+
+    @property
+    def size(self) -> int:
+        """ Size of the field in bits """
+        return self.model.msb[self.index] - self.model.lsb[self.index] + 1
+
+    def __repr__(self):
+        return repr((self.name, self.msb, self.lsb, self.swtype, self.hwtype, self.reset, self.note))
+
+class Register(object):
+
+    __slots__ = ('model', 'index', 'name', 'fields')
+
+    def __init__(self, model, index, name):
+        """
+        Parameters:
+            :param model: the RegModel holding the numeric columns
+            :param index: index of the register in the columns
+            :param name: register name
+        """
+        self.model  = model
+        self.index  = index
+        self.name   = intern(name)
+        self.fields = []
+
+    addr   = property(lambda self: self.model.addr[self.index])
+    count  = property(lambda self: self.model.count[self.index])
+    stride = property(lambda self: self.model.stride[self.index])
+    ram    = property(lambda self: self.model.ram[self.index])
+    fifo   = property(lambda self: self.model.fifo[self.index])
+    alias  = property(lambda self: self.model.alias[self.index])
+
+    @property
+    def aliases(self) -> list:
+        """ The alias addresses of the register [(kind, address),], right after the register address """
+        size = self.model.reg_width // 8
+        kinds = [kind for (i, kind) in enumerate(ALIASES) if self.alias >> i & 1]
+        return [(kind, self.addr + (i + 1) * size) for (i, kind) in enumerate(kinds)]
+
+    def __repr__(self):
+        return repr((self.name, self.addr, self.count, self.stride, self.ram, self.alias, self.fields))
+
+class RegModel(object):
+
+    # Numeric columns of the registers and of the fields
+    REG_COLUMNS   = ('addr', 'count', 'stride', 'ram', 'fifo', 'alias')
+    FIELD_COLUMNS = ('msb', 'lsb', 'reset')
+    # Version of the toData format, a model cache of another format is not loaded
+    DATA_FORMAT   = 1
+
+    __slots__ = ('registers', 'addr_width', 'reg_width', 'read_mux', 'read_stages',
+                 'addr', 'count', 'stride', 'ram', 'fifo', 'alias', 'msb', 'lsb', 'reset')
+
+    def __init__(self):
+        self.addr_width  = 0
+        self.reg_width   = REG_WIDTH    # register width in bits
+        self.read_mux    = 0    # registers per read mux of the tree, 0 for a flat read mux
+        self.read_stages = 0    # pipeline stages of the read mux tree
+        self.clear()
+
+    @property
+    def read_latency(self) -> int:
+        """ Number of cycles from the SW read to the read data """
+        return 1 + self.read_stages if self.read_mux else 1
+
+    def clear(self):
+        """ Remove all the registers, used by the streaming parser between two registers """
+        self.registers  = []
+        # numeric columns
+        self.addr   = array('Q')    # register address
+        self.count  = array('L')    # number of registers of a register array, 1 otherwise
+        self.stride = array('L')    # address distance of the registers of a register array
+        self.ram    = array('B')    # 1 if the register array is stored in a RAM
+        self.fifo   = array('B')    # FIFO access options (FIFO_PREFETCH, FIFO_SKID)
+        self.alias  = array('B')    # alias addresses of the register (aliasFlags)
+        self.msb    = array('H')    # field msb
+        self.lsb    = array('H')    # field lsb
+        self.reset  = array('Q')    # field reset value
+
+    def __iter__(self):
+        return iter(self.registers)
+
+    def __len__(self):
+        return len(self.registers)
+
+    def addRegister(self, name, addr, count=1, stride=0) -> Register:
+        """
+        Add a register to the model
+        Parameters:
+            :param name: register name
+            :param addr: register address, address of the first register of an array
+            :param count: number of registers of a register array
+            :param stride: address distance of the registers of a register array
+        """
+        reg = Register(self, len(self.addr), name)
+        self.addr.append(addr)
+        self.count.append(count)
+        self.stride.append(stride)
+        self.ram.append(0)
+        self.fifo.append(0)
+        self.alias.append(0)
+        self.registers.append(reg)
+        return reg
+
+    def addField(self, reg, name, msb, lsb, swtype, hwtype, reset, note) -> Field:
+        """
+        Add a field to a register
+        Parameters:
+            :param reg: the Register
+            :param name: field name
+            :param msb: msb of the field
+            :param lsb: lsb of the field
+            :param swtype: SW access type
+            :param hwtype: HW access type
+            :param reset: reset value
+            :param note: description of the field
+        """
+        field = Field(self, len(self.msb), name, swtype, hwtype, note)
+        self.msb.append(msb)
+        self.lsb.append(lsb)
+        try:
+            self.reset.append(reset)
+        except OverflowError:
+            # reset value wider than 64 bits, fall back to a list
+            self.reset = list(self.reset)
+            self.reset.append(reset)
+        reg.fields.append(field)
+        return field
+
+    def toData(self) -> dict:
+        """ The model as plain data (dict, list, str, int), it can be saved as JSON """
+        return {'format': self.DATA_FORMAT,
+                'config': [self.addr_width, self.reg_width, self.read_mux, self.read_stages],
+                'columns': {name: list(getattr(self, name)) for name in self.REG_COLUMNS + self.FIELD_COLUMNS},
+                'registers': [[reg.name, [[field.name, field.swtype, field.hwtype, field.note] for field in reg.fields]]
+                              for reg in self.registers]}
+
+    @staticmethod
+    def fromData(data) -> 'RegModel':
+        """
+        Rebuild a model from toData. Raise ValueError if the data is not a valid model
+        Parameters:
+            :param data: the plain data of the model
+        """
+        try:
+            if data['format'] != RegModel.DATA_FORMAT:
+                raise ValueError(f'model format {data["format"]} is not {RegModel.DATA_FORMAT}')
+            model = RegModel()
+            (model.addr_width, model.reg_width, model.read_mux, model.read_stages) = data['config']
+            columns = data['columns']
+            for name in RegModel.REG_COLUMNS + RegModel.FIELD_COLUMNS:
+                column = getattr(model, name)
+                if name == 'reset' and any(value >> 64 for value in columns[name]):
+                    column = []     # reset value wider than 64 bits, as in addField
+                column.extend(columns[name])
+                setattr(model, name, column)
+            (registers, fields) = (data['registers'], 0)
+            for (name, regFields) in registers:
+                reg = Register(model, len(model.registers), name)
+                for (fieldName, swtype, hwtype, note) in regFields:
+                    reg.fields.append(Field(model, fields, fieldName, swtype, hwtype, note))
+                    fields += 1
+                model.registers.append(reg)
+        except (KeyError, TypeError, OverflowError) as e:
+            raise ValueError(f'invalid model data: {e!r}')
+        if any(len(getattr(model, name)) != len(registers) for name in RegModel.REG_COLUMNS) or \
+           any(len(getattr(model, name)) != fields for name in RegModel.FIELD_COLUMNS):
+            raise ValueError('invalid model data: the columns do not match the registers and fields')
+        if not all(isinstance(value, int) for value in (model.addr_width, model.reg_width, model.read_mux,
+                                                         model.read_stages)):
+            raise ValueError('invalid model data: the config is not integers')
+        return model
@@ -9,250 +9,900 @@
 # Description:
 #   This script takes the result from YmlParser and write the verilog module
 #
+#   The module is made of several sections (ports, declaration, read logic, ...)
+#   and each field contributes to several of them, so each section is buffered
+#   while the registers are walked and the sections are written out at the end.
+#   A section is kept in memory until it gets large and is then moved to a temp file.
+#
+#   A register array is not expanded: its ports and registers are packed arrays
+#   written by a generate loop, and the sw access decodes the index from the address.
+#   A register array stored in a RAM has a SW read/write port and a HW read port.
+#
+#   With the read_mux config, the read data is a tree of small muxes instead of one
+#   case over the whole address map: a leaf mux decodes the low address bits of
+#   read_mux registers and is selected by the high address bits, and each level above
+#   ORs read_mux outputs. The first read_stages levels are registered and the read
+#   data has a valid/ready handshake. The tree is built while the registers are
+#   walked, only the open node of each level is kept.
+#
 #########################################################################################
 
 
+import io
+import shutil
+import tempfile
+
 from common import *
+from config import *
+from Emitter import *
 
 lines = lambda x: '\n' * x
 
-class VerilogWriter(object):
+# Size of a section kept in memory before it is moved to a temp file
+SPOOL_SIZE = 1 << 20
 
-    def __init__(self, verilogInfo, name, path):
-        """
-        Parameters:
-            :param verilogInfo: the register info tuple
-            :param name: the name of the register module
-            :param path: the path of to the document
-        """
-        self.name       = name
-        self.path       = path
-        (self.portList,
-         self.logics,
-         self.regs,
-         self.sw_rd_dec,
-         self.sw_wr_dec,
-         self.rd_assign_logic,
-         self.wr_seq_logic,
-         self.fifo_logic,
-         self.addr_width
-        ) = verilogInfo
+# All the sections of the module
+SECTIONS = ('ports', 'regDecl', 'logicDecl', 'hwRead', 'rdDec', 'wenDefault',
+            'wrDec', 'reset', 'seqWrite', 'fifoRead', 'fifoWrite',
+            'arrayLogic', 'arrayRdDec', 'arrayWrDec', 'rdLeaf', 'rdTree', 'rdPipe')
+
+# Suffix of the signals of a register array
+ARRAY_SUFFIX = '_array'
+
+
+class VerilogWriter(Emitter):
+
+    backend = 'rtl'
+    suffix  = f'{RTL_SUFFIX}.v'
+
+    def cacheInfo(self, model):
+        """ The verilog module does not use the field description """
+        return (model.addr_width, model.reg_width, model.read_mux, model.read_stages,
+                [(reg.name, reg.addr, reg.count, reg.stride, reg.ram, reg.fifo, reg.alias, [(field.name, field.msb, field.lsb, field.swtype, field.hwtype, field.reset)
+                                       for field in reg.fields])
+                 for reg in model])
 
     def writeSplitter(self, FILE, indent, line, sign='=', width=30):
         """ """
-        string  = INDENT(indent) + '//'+ sign * width + '\n'
-        string += INDENT(indent) + line
-        string += INDENT(indent) + '//' + sign * width + '\n'
-        FILE.write(string)
+        FILE.write(INDENT(indent) + '//'+ sign * width + '\n')
+        FILE.write(INDENT(indent) + line)
+        FILE.write(INDENT(indent) + '//' + sign * width + '\n')
+
+    def addPort(self, dir, width, name):
+        """
+        Add a verilog IO port
+        parameter:
+            :param dir: 'i' for input, 'o' for output
+            :param width: the width of the port
+            :param name: the name of the port
+        """
+        dir = 'input ' if dir == 'i' else 'output'
+        addrRange = f'[{width - 1}:0]' if width > 1 else ''
+        # the ',' is written before the next port so the last port has none
+        self.ports.write(self.portSep + INDENT(1) + addSpace(dir, 7) + addSpace(addrRange, 10) + name)
+        self.portSep = ',\n'
+
+    def addDeclare(self, section, name, width):
+        """
+        Add a verilog signal declaration
+        parameter:
+            :param section: the declaration section (self.regDecl or self.logicDecl)
+            :param name: the name of the signal
+            :param width: the width of the signal
+        """
+        addrRange = f'[{width - 1}:0]' if width > 1 else ''
+        section.write(INDENT(1) + addSpace('reg', 7) + addSpace(addrRange, 10) + name + ';\n')
+
+    def addWire(self, section, name, width, value):
+        """
+        Add a verilog wire with its assignment
+        parameter:
+            :param section: the section
+            :param name: the name of the wire
+            :param width: the width of the wire
+            :param value: the assigned expression
+        """
+        addrRange = f'[{width - 1}:0]' if width > 1 else ''
+        section.write(INDENT(1) + addSpace('wire', 7) + addSpace(addrRange, 10) + f'{name} = {value};\n')
+
+    def begin(self, FILE, model):
+        """ Create the sections and add the common signals """
+        self.addr_width = model.addr_width
+        self.regWidth   = model.reg_width
+        self.ports      = io.StringIO()
+        self.portSep    = ''
+        self.regDecl    = io.StringIO()   # register definition
+        self.logicDecl  = io.StringIO()   # reg type variable definition
+        self.hwRead     = io.StringIO()   # HW read assignment
+        self.rdDec      = io.StringIO()   # read decode case items
+        self.wenDefault = io.StringIO()   # default value of the write enable
+        self.wrDec      = io.StringIO()   # write decode case items
+        self.reset      = io.StringIO()   # reset value of the registers
+        self.seqWrite   = io.StringIO()   # sequential write logic
+        self.fifoRead   = io.StringIO()   # FIFO read logic
+        self.fifoWrite  = io.StringIO()   # FIFO write logic
+        self.arrayLogic = io.StringIO()   # index decode and generate loop of the register arrays
+        self.arrayRdDec = io.StringIO()   # read decode of the register arrays
+        self.arrayWrDec = io.StringIO()   # write decode of the register arrays
+        self.rdLeaf     = io.StringIO()   # case items of the open leaf of the read mux tree
+        self.rdTree     = io.StringIO()   # muxes of the read mux tree
+        self.rdPipe     = io.StringIO()   # pipeline registers of the read mux tree
+
+        # read mux tree
+        self.readMux    = model.read_mux
+        self.readStages = model.read_stages
+        self.leafShift  = (self.readMux * self.regWidth // 8).bit_length() - 1  # address bits decoded by a leaf
+        self.rdLeafId   = None  # high address bits of the open leaf
+        self.rdLevels   = [[]]  # outputs of each level waiting for their parent mux
+        self.rdNodes    = []    # number of muxes of each level
+        self.rdEnable   = 'rd_req' if self.readMux else 'i_sw_select & i_sw_read'
 
+        self.addPort('i', 1, 'clk')
+        self.addPort('i', 1, 'reset')
+        self.addPort('i', self.addr_width, 'i_sw_address')
+        self.addPort('i', 1, 'i_sw_read')
+        self.addPort('i', 1, 'i_sw_write')
+        self.addPort('i', 1, 'i_sw_select')
+        self.addPort('i', self.regWidth, 'i_sw_wrdata')
+        self.addPort('o', self.regWidth, 'o_sw_rddata')
+        self.addDeclare(self.regDecl, 'o_sw_rddata' + REG_SUFFIX, self.regWidth)
+        if not self.readMux:
+            self.addDeclare(self.logicDecl, 'o_sw_rddata_next', self.regWidth)
+            return
+        self.addPort('i', 1, 'i_sw_rdready')
+        self.addPort('o', 1, 'o_sw_rdready')
+        self.addPort('o', 1, 'o_sw_rdvalid')
+        self.addDeclare(self.regDecl, 'o_sw_rdvalid' + REG_SUFFIX, 1)
+        if self.readStages:
+            self.addDeclare(self.regDecl, 'rd_req' + REG_SUFFIX, self.readStages)
+
+    def beginRegister(self, FILE, reg):
+        """ Start collecting the read data and the write enable of the register """
+        self.rdFields = []  # read data of each field, from lsb to msb
+        self.wenFields = [] # register of the sw write fields
+        self.arrayBody = [] # body of the generate loop of a register array
+        self.ramMask = 0    # bits of the fields of a register array stored in a RAM
+        self.fifoStatus = {} # read data of the FIFO status fields
+
+    def field(self, FILE, reg, field):
+        """
+        Add the signals and the logic of one field
+        Possible SW and HW combination supported
+        HW W, SW W
+        HW R, SW W
+        HW W, SW R
+        HW W, SW W1C
+        FIFOR, FIFOW
+        """
+        if reg.count > 1:
+            self.arrayField(reg, field)
+            return
+        addr   = format(reg.addr, 'x')
+        msb    = field.msb
+        lsb    = field.lsb
+        size   = msb - lsb + 1
+        swtype = field.swtype
+        hwtype = field.hwtype
+        if field.name == RSVR:
+            self.rdFields.append(f"{size}'b0")
+            return
+        # FIFO status, set by the FIFO field below it
+        if hwtype == FIFO_HWTYPE:
+            self.rdFields.append(self.fifoStatus[field.name])
+            return
+
+        # Register read/write
+        if swtype == 'W' or swtype == 'R':
+            dir = 'i' if hwtype == 'W' else 'o' # direction is based on hw type
+            name = f'{dir}_hw_{reg.name}_{field.name}'    # IO name
+            name_q = name + REG_SUFFIX          # Register name
+            self.addPort(dir, size, name)
+            self.addDeclare(self.regDecl, name_q, size)
+            self.rdFields.append(name_q)
+            if swtype == 'W':
+                self.addDeclare(self.logicDecl, name_q + WEN_SUFFIX, 1)
+                self.wenDefault.write(INDENT(4) + name_q + WEN_SUFFIX + ' = 1\'b0;\n')
+                self.wenFields.append(name_q)
+            if swtype == 'W' or hwtype == 'W':
+                self.reset.write(INDENT(3) + f'{name_q} <= {size}\'h{format(field.reset, "x")};\n')
+                self.seqWrite.write(INDENT(3) + f"// Register: {reg.name} | Field: {name}\n")
+                if swtype == 'W' and hwtype == 'W':
+                    self.seqWrite.write(INDENT(3) + f'if ({name_q}{WEN_SUFFIX}) {name_q} <= i_sw_wrdata[{msb}:{lsb}];\n')
+                    self.writeAlias(reg, name_q, msb, lsb)
+                    self.seqWrite.write(INDENT(3) + f'else {name_q} <= {name};\n\n')
+                elif swtype == 'W': # sw write only
+                    self.seqWrite.write(INDENT(3) + f'if ({name_q}{WEN_SUFFIX}) {name_q} <= i_sw_wrdata[{msb}:{lsb}];\n')
+                    self.writeAlias(reg, name_q, msb, lsb)
+                    self.seqWrite.write(lines(1))
+                else: # hw write only
+                    self.seqWrite.write(INDENT(3) + f'{name_q} <= {name};\n\n')
+            if hwtype == 'R':
+                self.hwRead.write(INDENT(1) + f'assign {name} = {name_q};\n')
+
+        # Write 1 to clear: the HW sets the bits, the SW clears them
+        if swtype == 'W1C':
+            name = f'i_hw_{reg.name}_{field.name}'
+            name_q = name + REG_SUFFIX
+            clear = name_q + WEN_SUFFIX
+            if reg.alias & ALIAS_CLR:
+                clear = f'({clear} | {self.aliasWen(reg, "clr")})'
+            self.addPort('i', size, name)
+            self.addDeclare(self.regDecl, name_q, size)
+            self.addDeclare(self.logicDecl, name_q + WEN_SUFFIX, 1)
+            self.wenDefault.write(INDENT(4) + name_q + WEN_SUFFIX + ' = 1\'b0;\n')
+            self.wenFields.append(name_q)
+            self.rdFields.append(name_q)
+            self.reset.write(INDENT(3) + f'{name_q} <= {size}\'h{format(field.reset, "x")};\n')
+            self.seqWrite.write(INDENT(3) + f"// Register: {reg.name} | Field: {name} | write 1 to clear\n")
+            self.seqWrite.write(INDENT(3) + f'{name_q} <= {name} | {name_q} & '
+                                            f'~({{{size}{{{clear}}}}} & i_sw_wrdata[{msb}:{lsb}]);\n\n')
+
+        # FIFO read/write
+        if swtype == 'FIFOR':
+            self.fifoReadField(reg, field, addr)
+        if swtype == 'FIFOW':
+            self.fifoWriteField(reg, field, addr)
+
+    def aliasWen(self, reg, kind) -> str:
+        """ The write enable of an alias address of the register """
+        return f'{reg.name}_{kind}{WEN_SUFFIX}'
+
+    def writeAlias(self, reg, name_q, msb, lsb):
+        """ Write the set, clear and toggle of a SW RW field by the alias addresses of the register """
+        data = f'i_sw_wrdata[{msb}:{lsb}]'
+        value = {'set': f'{name_q} | {data}', 'clr': f'{name_q} & ~{data}', 'tgl': f'{name_q} ^ {data}'}
+        for (kind, addr) in reg.aliases:
+            self.seqWrite.write(INDENT(3) + f'else if ({self.aliasWen(reg, kind)}) {name_q} <= {value[kind]};\n')
+
+    def fifoStatusPorts(self, reg, field, valid):
+        """
+        Add the FIFO ports used by the FIFO status fields embedded in the read word
+        parameter:
+            :param valid: the port of the valid (FIFOR) or ready (FIFOW) bit of the FIFO
+        Return:
+            :the status field names of the register
+        """
+        status = [f.name for f in reg.fields if f.hwtype == FIFO_HWTYPE]
+        options = reg.fifo & (FIFO_PREFETCH | FIFO_SKID)
+        if options or len(status) > len([f for f in status if f.endswith('_level')]):
+            self.addPort('i', 1, valid)
+        for f in reg.fields:
+            if f.name == f'{field.name}_level' and f.hwtype == FIFO_HWTYPE:
+                level = f'i_hw_{reg.name}_{field.name}_fifo_level'
+                self.addPort('i', f.size, level)
+                self.fifoStatus[f.name] = level
+        return status
+
+    def fifoReadField(self, reg, field, addr):
+        """
+        Add a FIFOR field. With the prefetch option, the read data is a register loaded
+        from the FIFO when it is empty or read, so the FIFO data is not in the read path
+        and the FIFO can be read every cycle.
+        """
+        name   = f'{reg.name}_{field.name}'
+        size   = field.size
+        ctrl_signal = f'o_hw_{name}_fifo_read'
+        data_signal = f'i_hw_{name}_fifo_read_data'
+        valid  = f'i_hw_{name}_fifo_read_valid'
+        read   = f"{self.rdEnable} & (i_sw_address == {self.addr_width}'h{addr})"
+        self.addPort('o', 1, ctrl_signal)
+        self.addPort('i', size, data_signal)
+        self.fifoStatusPorts(reg, field, valid)
+        if not reg.fifo & FIFO_PREFETCH:
+            self.rdFields.append(data_signal)
+            self.fifoStatus[f'{field.name}_valid'] = valid
+            self.fifoRead.write(INDENT(1) + f'assign {ctrl_signal} = {read};\n')
+            return
+        pfValid = name + '_pf_valid'
+        pfData  = name + '_pf_data'
+        self.addDeclare(self.regDecl, pfValid, 1)
+        self.addDeclare(self.regDecl, pfData, size)
+        self.rdFields.append(pfData)
+        self.fifoStatus[f'{field.name}_valid'] = pfValid
+        self.fifoRead.write(INDENT(1) + f'assign {ctrl_signal} = {valid} & (~{pfValid} | {read});\n')
+        self.reset.write(INDENT(3) + f"{pfValid} <= 1'b0;\n")
+        self.reset.write(INDENT(3) + f"{pfData} <= {size}'h{format(field.reset, 'x')};\n")
+        self.seqWrite.write(INDENT(3) + f"// Register: {reg.name} | Field: {field.name} | FIFO prefetch\n")
+        self.seqWrite.write(INDENT(3) + f"if ({ctrl_signal}) {pfValid} <= 1'b1;\n")
+        self.seqWrite.write(INDENT(3) + f"else if ({read}) {pfValid} <= 1'b0;\n")
+        self.seqWrite.write(INDENT(3) + f'if ({ctrl_signal}) {pfData} <= {data_signal};\n\n')
+
+    def fifoWriteField(self, reg, field, addr):
+        """
+        Add a FIFOW field. With the skid option, the FIFO is written from a register with
+        a valid/ready handshake, and a SW write arriving while the FIFO is not ready
+        waits in the skid register, so the FIFO ready is not in the write path.
+        """
+        name   = f'{reg.name}_{field.name}'
+        size   = field.size
+        msb    = field.msb
+        lsb    = field.lsb
+        ctrl_signal = f'o_hw_{name}_fifo_write'
+        data_signal = f'o_hw_{name}_fifo_write_data'
+        ready  = f'i_hw_{name}_fifo_write_ready'
+        write  = f"i_sw_select & i_sw_write & (i_sw_address == {self.addr_width}'h{addr})"
+        self.addPort('o', 1, ctrl_signal)
+        self.addPort('o', size, data_signal)
+        self.fifoStatusPorts(reg, field, ready)
+        self.rdFields.append(f"{size}'h0")
+        if not reg.fifo & FIFO_SKID:
+            self.fifoStatus[f'{field.name}_ready'] = ready
+            self.fifoWrite.write(INDENT(1) + f'assign {ctrl_signal} = {write};\n')
+            self.fifoWrite.write(INDENT(1) + f'assign {data_signal} = i_sw_wrdata[{msb}:{lsb}];\n')
+            return
+        outValid  = ctrl_signal + REG_SUFFIX
+        outData   = data_signal + REG_SUFFIX
+        skidValid = name + '_skid_valid'
+        skidData  = name + '_skid_data'
+        outFree   = f'~{outValid} | {ready}'
+        self.addDeclare(self.regDecl, outValid, 1)
+        self.addDeclare(self.regDecl, outData, size)
+        self.addDeclare(self.regDecl, skidValid, 1)
+        self.addDeclare(self.regDecl, skidData, size)
+        self.fifoStatus[f'{field.name}_ready'] = f'~{skidValid}'
+        self.fifoWrite.write(INDENT(1) + f'assign {ctrl_signal} = {outValid};\n')
+        self.fifoWrite.write(INDENT(1) + f'assign {data_signal} = {outData};\n')
+        self.reset.write(INDENT(3) + f"{outValid} <= 1'b0;\n")
+        self.reset.write(INDENT(3) + f"{skidValid} <= 1'b0;\n")
+        self.seqWrite.write(INDENT(3) + f"// Register: {reg.name} | Field: {field.name} | FIFO skid buffer\n")
+        self.seqWrite.write(INDENT(3) + f'if ({outFree}) begin\n')
+        self.seqWrite.write(INDENT(4) + f'{outValid} <= {skidValid} | {write};\n')
+        self.seqWrite.write(INDENT(4) + f'{outData} <= {skidValid} ? {skidData} : i_sw_wrdata[{msb}:{lsb}];\n')
+        self.seqWrite.write(INDENT(4) + f'{skidValid} <= {skidValid} & {write};\n')
+        self.seqWrite.write(INDENT(3) + 'end\n')
+        self.seqWrite.write(INDENT(3) + f'else begin\n')
+        self.seqWrite.write(INDENT(4) + f'{skidValid} <= {skidValid} | {write};\n')
+        self.seqWrite.write(INDENT(3) + 'end\n')
+        self.seqWrite.write(INDENT(3) + f'if ({write} & ({skidValid} | ~({outFree}))) '
+                                        f'{skidData} <= i_sw_wrdata[{msb}:{lsb}];\n\n')
+
+    def arrayField(self, reg, field):
+        """
+        Add the signals and the logic of one field of a register array.
+        Element g of the packed ports and registers is [g*size +: size].
+        """
+        size   = field.size
+        swtype = field.swtype
+        hwtype = field.hwtype
+        count  = reg.count
+        genvar = reg.name + ARRAY_SUFFIX + '_i'
+        sel    = reg.name + ARRAY_SUFFIX + '_sel'
+        idx    = reg.name + ARRAY_SUFFIX + '_idx'
+        slice  = lambda name, i: f'{name}[{i}]' if size == 1 else f'{name}[{i}*{size} +: {size}]'
+        body   = self.arrayBody
+        if reg.ram:
+            if field.name != RSVR:
+                self.ramMask |= ((1 << size) - 1) << field.lsb
+            return
+        if field.name == RSVR:
+            self.rdFields.append(f"{size}'b0")
+            return
+
+        # Register read/write
+        if swtype == 'W' or swtype == 'R':
+            dir = 'i' if hwtype == 'W' else 'o'
+            name = f'{dir}_hw_{reg.name}_{field.name}'
+            name_q = name + REG_SUFFIX
+            self.addPort(dir, count * size, name)
+            self.addDeclare(self.regDecl, name_q, count * size)
+            self.rdFields.append(slice(name_q, idx))
+            if swtype == 'W':
+                self.addDeclare(self.logicDecl, name_q + WEN_SUFFIX, count)
+                self.wenDefault.write(INDENT(4) + f"{name_q}{WEN_SUFFIX} = {count}'b0;\n")
+                self.wenFields.append(name_q)
+            if swtype == 'W' or hwtype == 'W':
+                body.append(f"// Register: {reg.name} | Field: {name}")
+                body.append('always @(posedge clk) begin')
+                body.append(INDENT(1) + f"if (reset) {slice(name_q, genvar)} <= {size}'h{format(field.reset, 'x')};")
+                if swtype == 'W':
+                    body.append(INDENT(1) + f'else if ({name_q}{WEN_SUFFIX}[{genvar}]) '
+                                            f'{slice(name_q, genvar)} <= i_sw_wrdata[{field.msb}:{field.lsb}];')
+                if hwtype == 'W':
+                    body.append(INDENT(1) + f'else {slice(name_q, genvar)} <= {slice(name, genvar)};')
+                body.append('end')
+            if hwtype == 'R':
+                body.append(f'assign {slice(name, genvar)} = {slice(name_q, genvar)};')
+
+        # Write 1 to clear
+        if swtype == 'W1C':
+            name = f'i_hw_{reg.name}_{field.name}'
+            name_q = name + REG_SUFFIX
+            self.addPort('i', count * size, name)
+            self.addDeclare(self.regDecl, name_q, count * size)
+            self.rdFields.append(slice(name_q, idx))
+            self.addDeclare(self.logicDecl, name_q + WEN_SUFFIX, count)
+            self.wenDefault.write(INDENT(4) + f"{name_q}{WEN_SUFFIX} = {count}'b0;\n")
+            self.wenFields.append(name_q)
+            body.append(f"// Register: {reg.name} | Field: {name} | write 1 to clear")
+            body.append('always @(posedge clk) begin')
+            body.append(INDENT(1) + f"if (reset) {slice(name_q, genvar)} <= {size}'h{format(field.reset, 'x')};")
+            body.append(INDENT(1) + f'else {slice(name_q, genvar)} <= {slice(name, genvar)} | {slice(name_q, genvar)} & '
+                                    f'~({{{size}{{{name_q}{WEN_SUFFIX}[{genvar}]}}}} & i_sw_wrdata[{field.msb}:{field.lsb}]);')
+            body.append('end')
+
+        # FIFO read/write
+        if swtype == 'FIFOR':
+            ctrl_signal = f'o_hw_{reg.name}_{field.name}_fifo_read'
+            data_signal = f'i_hw_{reg.name}_{field.name}_fifo_read_data'
+            self.addPort('o', count, ctrl_signal)
+            self.addPort('i', count * size, data_signal)
+            self.rdFields.append(slice(data_signal, idx))
+            body.append(f'assign {ctrl_signal}[{genvar}] = {self.rdEnable} & {sel} & ({idx} == {genvar});')
+        if swtype == 'FIFOW':
+            ctrl_signal = f'o_hw_{reg.name}_{field.name}_fifo_write'
+            data_signal = f'o_hw_{reg.name}_{field.name}_fifo_write_data'
+            self.addPort('o', count, ctrl_signal)
+            self.addPort('o', count * size, data_signal)
+            self.rdFields.append(f"{size}'h0")
+            body.append(f'assign {ctrl_signal}[{genvar}] = i_sw_select & i_sw_write & {sel} & ({idx} == {genvar});')
+            body.append(f'assign {slice(data_signal, genvar)} = i_sw_wrdata[{field.msb}:{field.lsb}];')
+
+    def addRam(self, reg, sel, idx, width):
+        """
+        Add a register array stored in a RAM. The RAM has no reset, and the HW reads
+        the registers through its own read port (1 cycle latency). A RAM is only used
+        with the read mux tree, its read data takes the place of the first pipeline stage.
+        parameter:
+            :param sel: the select signal of the array
+            :param idx: the index signal of the array
+            :param width: the width of the index
+        """
+        ram    = reg.name + '_ram'
+        rdata  = ram + '_rdata'
+        read_q = ram + '_read' + REG_SUFFIX
+        hwRead = f'i_hw_{ram}_read'
+        hwAddr = f'i_hw_{ram}_addr'
+        hwData = f'o_hw_{ram}_data'
+        self.addPort('i', 1, hwRead)
+        self.addPort('i', width, hwAddr)
+        self.addPort('o', self.regWidth, hwData)
+        self.addDeclare(self.regDecl, rdata, self.regWidth)
+        self.addDeclare(self.regDecl, read_q, 1)
+        self.addDeclare(self.regDecl, hwData + REG_SUFFIX, self.regWidth)
+        self.arrayLogic.write(INDENT(1) + f'// Register file in RAM: no reset, the SW read data is in the first stage of the read mux tree\n')
+        self.arrayLogic.write(INDENT(1) + addSpace('reg', 7) + addSpace(f'[{self.regWidth - 1}:0]', 10) +
+                              f'{ram} [0:{reg.count - 1}];\n\n')
+        # SW read/write port
+        self.arrayLogic.write(INDENT(1) + 'always @(posedge clk) begin\n')
+        self.arrayLogic.write(INDENT(2) + f'if (i_sw_select & i_sw_write & {sel}) {ram}[{idx}] <= '
+                                          f"i_sw_wrdata & {self.regWidth}'h{format(self.ramMask, 'x')};\n")
+        self.arrayLogic.write(INDENT(2) + f'if ({self.rdEnable} & {sel}) {rdata} <= {ram}[{idx}];\n')
+        self.arrayLogic.write(INDENT(1) + 'end\n\n')
+        self.arrayLogic.write(INDENT(1) + 'always @(posedge clk) begin\n')
+        self.arrayLogic.write(INDENT(2) + f"if (reset) {read_q} <= 1'b0;\n")
+        self.arrayLogic.write(INDENT(2) + f'else if (rd_adv) {read_q} <= {self.rdEnable} & {sel};\n')
+        self.arrayLogic.write(INDENT(1) + 'end\n\n')
+        # HW read port
+        self.arrayLogic.write(INDENT(1) + 'always @(posedge clk) begin\n')
+        self.arrayLogic.write(INDENT(2) + f'if ({hwRead}) {hwData}{REG_SUFFIX} <= {ram}[{hwAddr}];\n')
+        self.arrayLogic.write(INDENT(1) + 'end\n')
+        self.arrayLogic.write(INDENT(1) + f'assign {hwData} = {hwData}{REG_SUFFIX};\n\n')
+        # SW read data
+        name = self.newReadNode(1)
+        self.addWire(self.rdTree, name, self.regWidth, f'{{{self.regWidth}{{{read_q}}}}} & {rdata}')
+        self.rdTree.write(lines(1))
+        self.addReadChild(1, name)
+
+    def writeReadData(self, section, line):
+        """
+        Write the read data concatenation of the register
+        parameter:
+            :param section: the read decode section
+            :param line: the beginning of the line, up to the '{' of the concatenation
+        """
+        # Need to reverse it in the assignment
+        self.writeJoin(section, line, reversed(self.rdFields), ', ', '};\n', line.find('{') + 1)
+
+    def writeJoin(self, section, line, items, sep, end, align):
+        """
+        Write a list of items separated by sep, the line is broken when it gets too long
+        parameter:
+            :param section: the section
+            :param line: the beginning of the line
+            :param items: the items
+            :param sep: the separator of the items
+            :param end: the end of the line
+            :param align: the column of the items of the next lines
+        """
+        wrap  = '\n' + ' ' * align
+        size  = len(line)   # length of the whole line so far
+        first = ''
+        section.write(line)
+        for item in items:
+            # breaks the line if it's too long
+            if (size + len(first) > LINE_LIMIT - len(item)):
+                first += wrap
+            section.write(first + item)
+            size += len(first) + len(item)
+            first = sep
+        section.write(end)
+
+    def newReadNode(self, level) -> str:
+        """ The name of a new mux of the read mux tree """
+        if len(self.rdNodes) < level:
+            self.rdNodes.append(0)
+        self.rdNodes[level - 1] += 1
+        return f'rd_l{level}_{self.rdNodes[level - 1] - 1}'
+
+    def addReadNode(self, level, name):
+        """ Add the output of a mux to the read mux tree, the first read_stages levels are registered """
+        if level <= self.readStages:
+            self.addDeclare(self.regDecl, name + REG_SUFFIX, self.regWidth)
+            self.rdPipe.write(INDENT(3) + f'{name}{REG_SUFFIX} <= {name};\n')
+            name += REG_SUFFIX
+        self.addReadChild(level, name)
+
+    def addReadChild(self, level, name):
+        """ Add an input to the open mux of the next level, the mux is written when it is full """
+        if len(self.rdLevels) < level:
+            self.rdLevels.append([])
+        self.rdLevels[level - 1].append(name)
+        if len(self.rdLevels[level - 1]) == self.readMux:
+            self.writeReadNode(level + 1)
+
+    def writeReadNode(self, level):
+        """ Write the mux of a level above the leaves, it ORs the outputs of the level below """
+        children = self.rdLevels[level - 2]
+        self.rdLevels[level - 2] = []
+        name = self.newReadNode(level)
+        line = INDENT(1) + addSpace('wire', 7) + addSpace(f'[{self.regWidth - 1}:0]', 10) + f'{name} = '
+        self.writeJoin(self.rdTree, line, children, ' | ', ';\n', len(line))
+        self.addReadNode(level, name)
+
+    def addReadLeaf(self, regAddr):
+        """ Add the read data of a register address to its leaf mux, selected by the high address bits """
+        aw = self.addr_width
+        leafId = regAddr >> self.leafShift
+        if leafId != self.rdLeafId:
+            self.closeReadLeaf()
+            self.rdLeafId = leafId
+            self.rdLeafName = self.newReadNode(1)
+        width = min(aw, self.leafShift)
+        addr = format(regAddr & ((1 << width) - 1), 'x')
+        indent = 4 if aw > self.leafShift else 3
+        self.writeReadData(self.rdLeaf, INDENT(indent) + f"{width}'h{addr}:{INDENT(1)}{self.rdLeafName} = {{")
+
+    def closeReadLeaf(self):
+        """ Write the open leaf mux """
+        if self.rdLeafId == None:
+            return
+        aw    = self.addr_width
+        shift = self.leafShift
+        name  = self.rdLeafName
+        base  = self.rdLeafId << shift
+        self.rdTree.write(INDENT(1) + f"// read mux leaf: {aw}'h{format(base, 'x')} - "
+                                      f"{aw}'h{format(base + (1 << shift) - 1, 'x')}\n")
+        self.addDeclare(self.rdTree, name, self.regWidth)
+        self.rdTree.write(INDENT(1) + 'always @(*) begin\n')
+        self.rdTree.write(INDENT(2) + f"{name} = {self.regWidth}'h0;\n")
+        if aw > shift:
+            self.rdTree.write(INDENT(2) + f"if (i_sw_address[{aw - 1}:{shift}] == "
+                                          f"{aw - shift}'h{format(self.rdLeafId, 'x')}) begin\n")
+            self.rdTree.write(INDENT(3) + f'case(i_sw_address[{shift - 1}:0])\n')
+        else:
+            self.rdTree.write(INDENT(2) + 'case(i_sw_address)\n')
+        self.writeSection(self.rdTree, self.rdLeaf)
+        self.rdLeaf.seek(0)
+        self.rdLeaf.truncate()
+        if aw > shift:
+            self.rdTree.write(INDENT(3) + 'endcase\n')
+            self.rdTree.write(INDENT(2) + 'end\n')
+        else:
+            self.rdTree.write(INDENT(2) + 'endcase\n')
+        self.rdTree.write(INDENT(1) + 'end\n\n')
+        self.rdLeafId = None
+        self.addReadNode(1, name)
+
+    def closeReadTree(self) -> str:
+        """
+        Write the open muxes of all the levels, and a single input mux for
+        each pipeline stage above the root
+        Return:
+            :the read data of the root of the tree
+        """
+        self.closeReadLeaf()
+        i = 0
+        while i < len(self.rdLevels) - 1 or len(self.rdLevels[i]) > 1:
+            if self.rdLevels[i]:
+                self.writeReadNode(i + 2)
+            i += 1
+        if not self.rdLevels[-1]:
+            return f"{self.regWidth}'h0"
+        while len(self.rdLevels) < self.readStages:
+            self.writeReadNode(len(self.rdLevels) + 1)
+        return self.rdLevels[-1][0]
+
+    def endRegister(self, FILE, reg):
+        """ Add the read decode and the write decode of the register """
+        if reg.count > 1:
+            self.endArray(reg)
+            self.spill()
+            return
+        addr = format(reg.addr, 'x')
+        aliases = reg.aliases
+
+        # read decode, the alias addresses read the register
+        if self.readMux:
+            for regAddr in [reg.addr] + [aliasAddr for (kind, aliasAddr) in aliases]:
+                self.addReadLeaf(regAddr)
+        else:
+            label = ', '.join(f"{self.addr_width}'h{format(regAddr, 'x')}"
+                              for regAddr in [reg.addr] + [aliasAddr for (kind, aliasAddr) in aliases])
+            self.writeReadData(self.rdDec, INDENT(3) + f'{label}:{INDENT(1)}o_sw_rddata_next = {{')
+
+        # write decode, needed for the writable fields (and kept for the other registers)
+        if reg.addr or self.wenFields:
+            self.wrDec.write(INDENT(3) + f'{self.addr_width}\'h{addr}: begin\n')
+            for field in self.wenFields:
+                self.wrDec.write(INDENT(4) + field + WEN_SUFFIX + ' = i_sw_write & i_sw_select;\n')
+            self.wrDec.write(INDENT(3) + 'end\n')
+        for (kind, aliasAddr) in aliases:
+            wen = self.aliasWen(reg, kind)
+            self.addDeclare(self.logicDecl, wen, 1)
+            self.wenDefault.write(INDENT(4) + wen + ' = 1\'b0;\n')
+            self.wrDec.write(INDENT(3) + f"{self.addr_width}'h{format(aliasAddr, 'x')}: begin\n")
+            self.wrDec.write(INDENT(4) + wen + ' = i_sw_write & i_sw_select;\n')
+            self.wrDec.write(INDENT(3) + 'end\n')
+
+        self.spill()
+
+    def endArray(self, reg):
+        """ Add the index decode, the generate loop, the read decode and the write decode of a register array """
+        aw     = self.addr_width
+        count  = reg.count
+        shift  = reg.stride.bit_length() - 1    # the stride is a power of two
+        width  = max(1, (count - 1).bit_length())
+        offset = reg.name + ARRAY_SUFFIX + '_offset'
+        sel    = reg.name + ARRAY_SUFFIX + '_sel'
+        idx    = reg.name + ARRAY_SUFFIX + '_idx'
+        genvar = reg.name + ARRAY_SUFFIX + '_i'
+
+        # index decode: the offset wraps around below the base address
+        self.arrayLogic.write(INDENT(1) + f"// Register array: {reg.name}[{count}], address: "
+                                          f"{aw}'h{format(reg.addr, 'x')} + i * {aw}'h{format(reg.stride, 'x')}\n")
+        self.addWire(self.arrayLogic, offset, aw, f"i_sw_address - {aw}'h{format(reg.addr, 'x')}")
+        self.addWire(self.arrayLogic, sel, 1, f"({offset} <= {aw}'h{format(count * reg.stride - 1, 'x')}) & "
+                                              f"({offset}[{shift - 1}:0] == {shift}'b0)")
+        self.addWire(self.arrayLogic, idx, width, f'{offset}[{width + shift - 1}:{shift}]')
+        self.arrayLogic.write(lines(1))
+        if reg.ram:
+            self.addRam(reg, sel, idx, width)
+            return
+
+        # generate loop
+        if self.arrayBody:
+            self.arrayLogic.write(INDENT(1) + f'genvar {genvar};\n')
+            self.arrayLogic.write(INDENT(1) + 'generate\n')
+            self.arrayLogic.write(INDENT(2) + f'for ({genvar} = 0; {genvar} < {count}; {genvar} = {genvar} + 1) '
+                                              f'begin : g_{reg.name}\n')
+            for line in self.arrayBody:
+                self.arrayLogic.write(INDENT(3) + line + '\n')
+            self.arrayLogic.write(INDENT(2) + 'end\n')
+            self.arrayLogic.write(INDENT(1) + 'endgenerate\n\n')
+
+        # read decode, a register array is a leaf of the read mux tree
+        if self.readMux:
+            self.closeReadLeaf()
+            name = self.newReadNode(1)
+            self.rdTree.write(INDENT(1) + f'// read mux leaf: register array {reg.name}\n')
+            self.addDeclare(self.rdTree, name, self.regWidth)
+            self.rdTree.write(INDENT(1) + 'always @(*) begin\n')
+            self.rdTree.write(INDENT(2) + f"{name} = {self.regWidth}'h0;\n")
+            self.writeReadData(self.rdTree, INDENT(2) + f'if ({sel}) {name} = {{')
+            self.rdTree.write(INDENT(1) + 'end\n\n')
+            self.addReadNode(1, name)
+        else:
+            self.writeReadData(self.arrayRdDec, INDENT(2) + f'if ({sel}) o_sw_rddata_next = {{')
+
+        # write decode
+        if self.wenFields:
+            self.arrayWrDec.write(INDENT(2) + f'if ({sel}) begin\n')
+            for field in self.wenFields:
+                self.arrayWrDec.write(INDENT(3) + f'{field}{WEN_SUFFIX}[{idx}] = i_sw_write & i_sw_select;\n')
+            self.arrayWrDec.write(INDENT(2) + 'end\n')
+
+    def spill(self):
+        """ Move the large sections to a temp file """
+        for name in SECTIONS:
+            section = getattr(self, name)
+            if isinstance(section, io.StringIO) and section.tell() > SPOOL_SIZE:
+                spilled = tempfile.TemporaryFile('w+')
+                spilled.write(section.getvalue())
+                setattr(self, name, spilled)
+
+    def writeSection(self, FILE, section):
+        """ Copy a section to the file """
+        section.seek(0)
+        shutil.copyfileobj(section, FILE)
 
     def writePort(self, FILE):
         """
         Write the verilog IO ports
         parameter:
-            :param portList: the IO port list
             :param FILE: File Stream
         """
-        string = '(\n'
-        for port in self.portList:
-            (dir, width, name) = port
-            dir = 'input ' if dir == 'i' else 'output'
-            addrRange = f'[{width - 1}:0]' if width > 1 else ''
-            string += INDENT(1) + addSpace(dir, 7) + addSpace(addrRange, 10) + name + ',\n'
-        string = string[:-2] + '\n' '' # get rid of the last ','
-        string += ');\n' + lines(2)
-        FILE.write(string)
+        FILE.write('(\n')
+        self.writeSection(FILE, self.ports)
+        FILE.write('\n);\n' + lines(2))
 
     def writeDeclare(self, FILE):
         """
         Write the verilog signal declaration
         parameter:
-            :param portList: the IO port list
             :param FILE: File Stream
         """
-        string = INDENT(1) + '// register definition\n'
-        for reg in self.regs:
-            (name, width) = reg
-            addrRange = f'[{width - 1}:0]' if width > 1 else ''
-            string += INDENT(1) + addSpace('reg', 7) + addSpace(addrRange, 10) + name + ';\n'
-        string += '\n'
-        string += INDENT(1) + '// reg type variable definition\n'
-        for logic in self.logics:
-            (name, width) = logic
-            addrRange = f'[{width - 1}:0]' if width > 1 else ''
-            string += INDENT(1) + addSpace('reg', 7) + addSpace(addrRange, 10) + name + ';\n'
-        string += lines(2)
-        FILE.write(string)
+        FILE.write(INDENT(1) + '// register definition\n')
+        self.writeSection(FILE, self.regDecl)
+        FILE.write('\n')
+        FILE.write(INDENT(1) + '// reg type variable definition\n')
+        self.writeSection(FILE, self.logicDecl)
+        if self.readMux:
+            FILE.write('\n')
+            FILE.write(INDENT(1) + '// read handshake: the read pipeline advances when the read data is taken\n')
+            self.addWire(FILE, 'rd_adv', 1, f'~o_sw_rdvalid{REG_SUFFIX} | i_sw_rdready')
+            self.addWire(FILE, 'rd_req', 1, 'i_sw_select & i_sw_read & rd_adv')
+        FILE.write(lines(2))
 
     def writeHWRead(self, FILE):
         """
         Assign the hw output with the internal register
         """
         self.writeSplitter(FILE, 1, '// HW Read output\n')
-        string  = lines(1)
-        string += INDENT(1) + f'assign o_sw_rddata = o_sw_rddata{REG_SUFFIX};\n'
-        for name in self.rd_assign_logic:
-            if name.find('o_hw') != -1:
-                string += INDENT(1) + f'assign {name} = {name}{REG_SUFFIX};\n'
-        string += lines(2)
-        FILE.write(string)
+        FILE.write(lines(1))
+        FILE.write(INDENT(1) + f'assign o_sw_rddata = o_sw_rddata{REG_SUFFIX};\n')
+        if self.readMux:
+            FILE.write(INDENT(1) + f'assign o_sw_rdvalid = o_sw_rdvalid{REG_SUFFIX};\n')
+            FILE.write(INDENT(1) + 'assign o_sw_rdready = rd_adv;\n')
+        self.writeSection(FILE, self.hwRead)
+        FILE.write(lines(2))
 
     def writeFIFO(self, FILE):
         """
         Assign the FIFO related signal
         """
         self.writeSplitter(FILE, 1, '// FIFO control\n')
-        fifo_read = lines(1) + INDENT(1) + '// FIFO Read logic\n'
-        fifo_write = lines(1)  + INDENT(1) + '// FIFO Write logic\n'
-
-        # (addr, ctrl_signal, data_signal, type)
-        for item in self.fifo_logic:
-            (addr, ctrl_signal, data_signal, msb, lsb, type) = item
-            if type == 'FIFOR':
-                fifo_read += INDENT(1) + f'assign {ctrl_signal} = i_sw_select & i_sw_read & '
-                fifo_read += f"(i_sw_address == {self.addr_width}'h{format(addr, 'x')});\n"
-            if type == 'FIFOW':
-                fifo_write += INDENT(1) + f'assign {ctrl_signal} = i_sw_select & i_sw_write & '
-                fifo_write += f"(i_sw_address == {self.addr_width}'h{format(addr, 'x')});\n"
-                fifo_write += INDENT(1) + f'assign {data_signal} = i_sw_wrdata[{msb}:{lsb}];\n'
+        FILE.write(lines(1) + INDENT(1) + '// FIFO Read logic\n')
+        self.writeSection(FILE, self.fifoRead)
+        FILE.write(lines(1)  + INDENT(1) + '// FIFO Write logic\n')
+        self.writeSection(FILE, self.fifoWrite)
+        # end part
+        FILE.write(lines(2))
+
+    def writeArray(self, FILE):
+        """
+        Write the index decode and the generate loop of the register arrays
+        """
+        self.writeSplitter(FILE, 1, '// Register arrays\n')
+        FILE.write(lines(1))
+        self.writeSection(FILE, self.arrayLogic)
+        FILE.write(lines(1))
+
+    def writeReadTree(self, FILE):
+        """ Write the read logic with the read mux tree """
+        root = self.rdRoot
+        stages = self.readStages
+        self.writeSplitter(FILE, 1, '// Software Read Logic\n')
+        FILE.write(lines(1))
+        FILE.write(INDENT(1) + f'// read mux tree: {self.readMux} registers per mux, {stages} pipeline stage(s), '
+                               f'read latency: {1 + stages} cycle(s)\n')
+        self.writeSection(FILE, self.rdTree)
+
+        # pipeline registers, they only advance when the read data is taken
+        FILE.write(INDENT(1) + 'always @(posedge clk) begin\n')
+        FILE.write(INDENT(2) + 'if (rd_adv) begin\n')
+        self.writeSection(FILE, self.rdPipe)
+        FILE.write(INDENT(3) + f'o_sw_rddata{REG_SUFFIX} <= {root};\n')
+        FILE.write(INDENT(2) + 'end\n')
+        FILE.write(INDENT(1) + 'end' + lines(2))
+
+        # read valid
+        req_q = 'rd_req' + REG_SUFFIX
+        FILE.write(INDENT(1) + 'always @(posedge clk) begin\n')
+        FILE.write(INDENT(2) + 'if (reset) begin\n')
+        if stages:
+            FILE.write(INDENT(3) + f"{req_q} <= {stages}'b0;\n")
+        FILE.write(INDENT(3) + f"o_sw_rdvalid{REG_SUFFIX} <= 1'b0;\n")
+        FILE.write(INDENT(2) + 'end\n')
+        FILE.write(INDENT(2) + 'else if (rd_adv) begin\n')
+        if stages > 1:
+            FILE.write(INDENT(3) + f'{req_q} <= {{{req_q}[{stages - 2}:0], rd_req}};\n')
+        elif stages:
+            FILE.write(INDENT(3) + f'{req_q} <= rd_req;\n')
+        last = f'{req_q}[{stages - 1}]' if stages > 1 else req_q if stages else 'rd_req'
+        FILE.write(INDENT(3) + f'o_sw_rdvalid{REG_SUFFIX} <= {last};\n')
+        FILE.write(INDENT(2) + 'end\n')
+        FILE.write(INDENT(1) + 'end' + lines(2))
+
         # end part
-        fifo_write += lines(2)
-        FILE.write(fifo_read)
-        FILE.write(fifo_write)
+        FILE.write(lines(2))
 
     def writeReadLogic(self, FILE):
         """ Write the read logic """
+        if self.readMux:
+            self.writeReadTree(FILE)
+            return
         # Sequential part
         self.writeSplitter(FILE, 1, '// Software Read Logic\n')
-        string  = lines(1)
-        string += INDENT(1) + 'always @(posedge clk) begin\n'
-        string += INDENT(2) + f'if (i_sw_read) o_sw_rddata{REG_SUFFIX} <= o_sw_rddata_next;\n'
-        string += INDENT(1) + 'end' + lines(2)
+        FILE.write(lines(1))
+        FILE.write(INDENT(1) + 'always @(posedge clk) begin\n')
+        FILE.write(INDENT(2) + f'if (i_sw_read) o_sw_rddata{REG_SUFFIX} <= o_sw_rddata_next;\n')
+        FILE.write(INDENT(1) + 'end' + lines(2))
 
         # Combinational part
-        string += INDENT(1) + '// read decode logic\n'
-        string += INDENT(1) + 'always @(*) begin\n'
-        string += INDENT(2) + f'o_sw_rddata_next = o_sw_rddata;\n'
-        string += INDENT(2) + 'case(i_sw_address)\n'
-
-        # readlogic => [[addr, field0, field1],
-        for info in self.sw_rd_dec:
-            addr  = format(info[1], 'x')
-            line  = INDENT(3) + f'{self.addr_width}\'h{addr}:{INDENT(1)}o_sw_rddata_next = {{'
-            for field in reversed(info[2:]): # Need to reverse it in the assignment
-                # breaks the line if it's too long
-                if (len(line) > LINE_LIMIT - len(field)):
-                    line += '\n ' + ' ' * line.find('{')
-                line += f'{field}, '
-            string += line[:-2] + '};\n' # get rid of the last ','
-        string += INDENT(3) + f'default:{INDENT(1)}o_sw_rddata_next = o_sw_rddata;\n'
-        string += INDENT(2) + 'endcase\n'
-        string += INDENT(1) + 'end' + lines(2)
+        FILE.write(INDENT(1) + '// read decode logic\n')
+        FILE.write(INDENT(1) + 'always @(*) begin\n')
+        FILE.write(INDENT(2) + f'o_sw_rddata_next = o_sw_rddata;\n')
+        FILE.write(INDENT(2) + 'case(i_sw_address)\n')
+        self.writeSection(FILE, self.rdDec)
+        FILE.write(INDENT(3) + f'default:{INDENT(1)}o_sw_rddata_next = o_sw_rddata;\n')
+        FILE.write(INDENT(2) + 'endcase\n')
+        self.writeSection(FILE, self.arrayRdDec)
+        FILE.write(INDENT(1) + 'end' + lines(2))
 
         # end part
-        string += lines(2)
-        FILE.write(string)
+        FILE.write(lines(2))
 
     def writeWriteLogic(self, FILE):
         """
         Write the write logic
-        Possible SW and HW combination supported
-        HW W, SW W
-        HW R, SW W
         """
         #=====================
         # sw decode logic
         #=====================
-        decDefault = '' # default assignment
-        decCase = ''    # stuff inside case statement
-        # [[addr, [field0, field1, ...]]] the field is sw write only field
-        for info in self.sw_wr_dec:
-            addr = info[1]
-            caseContent = ''
-            for field in info[2:]:
-                signal = field + WEN_SUFFIX
-                decDefault += INDENT(4) + signal + ' = 1\'b0;\n'
-                caseContent += INDENT(4) + signal + ' = i_sw_write & i_sw_select;\n'
-            if info[1]:
-                decCase += INDENT(3) + str(self.addr_width) + '\'h' + str(format(addr, 'x')) + ': begin\n'
-                decCase += caseContent
-                decCase += INDENT(3) + 'end\n'
         self.writeSplitter(FILE, 1, '// Software/Hardware Write Logic\n')
-        decode  = lines(1)
-        decode += INDENT(1) + '// software write decode Logic\n'
-        decode += INDENT(1) + 'always @(*) begin\n'
-        decode += decDefault
-        decode += INDENT(2) + 'case(i_sw_address)\n'
-        decode += decCase
-        decode += INDENT(3) + 'default: begin\n'
-        decode += decDefault
-        decode += INDENT(3) + 'end\n'
-        decode += INDENT(2) + 'endcase\n'
-        decode += INDENT(1) + 'end\n'
-        decode += lines(1)
+        FILE.write(lines(1))
+        FILE.write(INDENT(1) + '// software write decode Logic\n')
+        FILE.write(INDENT(1) + 'always @(*) begin\n')
+        self.writeSection(FILE, self.wenDefault)
+        FILE.write(INDENT(2) + 'case(i_sw_address)\n')
+        self.writeSection(FILE, self.wrDec)
+        FILE.write(INDENT(3) + 'default: begin\n')
+        self.writeSection(FILE, self.wenDefault)
+        FILE.write(INDENT(3) + 'end\n')
+        FILE.write(INDENT(2) + 'endcase\n')
+        self.writeSection(FILE, self.arrayWrDec)
+        FILE.write(INDENT(1) + 'end\n')
+        FILE.write(lines(1))
 
         #=============================
         # sequential write logic
         #=============================
-
-        reset = ''
-        write = ''
-        for info in self.wr_seq_logic: # [[regName, field, reset, sw_write?, hw_write?, msb, lsb]]
-            (reg, field, resetVal, swr, hwr, msb, lsb) = info
-            field_reg = field + REG_SUFFIX
-            width = msb - lsb + 1
-            resetVal = str(width) + '\'h' + str(format(resetVal, 'x'))
-            reset += INDENT(3) + f'{field_reg} <= {resetVal};\n'
-            write += INDENT(3) + f"// Register: {reg} | Field: {field}\n"
-            if hwr and swr:
-                write += INDENT(3) + f'if ({field_reg}{WEN_SUFFIX}) {field_reg} <= i_sw_wrdata[{msb}:{lsb}];\n'
-                write += INDENT(3) + f'else {field_reg} <= {field};\n\n'
-            elif swr: # sw write only
-                write += INDENT(3) + f'if ({field_reg}{WEN_SUFFIX}) {field_reg} <= i_sw_wrdata[{msb}:{lsb}];\n\n'
-            else: # hw write only
-                write += INDENT(3) + f'{field_reg} <= {field};\n\n'
-
-        sequential  = lines(1)
-        sequential += INDENT(1) + '// write sequential Logic\n'
-        sequential += INDENT(1) + '// Software/Hardware Write Logic\n'
-        sequential += INDENT(1) + 'always @(posedge clk) begin\n'
-        sequential += INDENT(2) + 'if (reset) begin\n'
-        sequential += reset
-        sequential += INDENT(2) + 'end\n'
-        sequential += INDENT(2) + 'else begin\n'
-        sequential += write
-        sequential += INDENT(2) + 'end\n'
-        sequential += INDENT(1) + 'end\n'
-        sequential += lines(1)
-
-        # end part
-        #string += lines(2)
-        FILE.write(decode)
-        FILE.write(sequential)
+        FILE.write(lines(1))
+        FILE.write(INDENT(1) + '// write sequential Logic\n')
+        FILE.write(INDENT(1) + '// Software/Hardware Write Logic\n')
+        FILE.write(INDENT(1) + 'always @(posedge clk) begin\n')
+        FILE.write(INDENT(2) + 'if (reset) begin\n')
+        self.writeSection(FILE, self.reset)
+        FILE.write(INDENT(2) + 'end\n')
+        FILE.write(INDENT(2) + 'else begin\n')
+        self.writeSection(FILE, self.seqWrite)
+        FILE.write(INDENT(2) + 'end\n')
+        FILE.write(INDENT(1) + 'end\n')
+        FILE.write(lines(1))
 
     def writeHeader(self, FILE):
         """
             :param FILE: File Stream
         """
-        header  = '///////////////////////////////////////////////////////////////\n'
-        header += '//\n'
-        header += '// Generated by Simple CSR Generator\n'
-        header += '//\n'
-        header += f'// Name: {self.name}{RTL_SUFFIX}.v\n'
-        header += f'// Date Created: {MONTH}/{DAY}/{YEAR} - {HOUR}:{MINUTE}\n'
-        header += '//\n'
-        header += '// Description:\n'
-        header += f'//  CSR module for {self.name}\n'
-        header += '//\n'
-        header += '///////////////////////////////////////////////////////////////\n\n\n'
-        FILE.write(header)
-
-    def writeVerilog(self):
-        """
-        Write the verilog File
-        """
-        fullpath = self.path + '/' + self.name + f'{RTL_SUFFIX}.v'
-        FILE = open(fullpath, "w")
+        FILE.write('///////////////////////////////////////////////////////////////\n')
+        FILE.write('//\n')
+        FILE.write('// Generated by Simple CSR Generator\n')
+        FILE.write('//\n')
+        FILE.write(f'// Name: {self.name}{RTL_SUFFIX}.v\n')
+        FILE.write(f'// Date Created: {MONTH}/{DAY}/{YEAR} - {HOUR}:{MINUTE}\n')
+        FILE.write('//\n')
+        FILE.write('// Description:\n')
+        FILE.write(f'//  CSR module for {self.name}\n')
+        if self.readMux:
+            FILE.write(f'//  Read latency: {1 + self.readStages} cycle(s), with the o_sw_rdvalid/i_sw_rdready handshake\n')
+        FILE.write('//\n')
+        FILE.write('///////////////////////////////////////////////////////////////\n\n\n')
+
+    def end(self, FILE):
+        """ Write the module """
+        # the open muxes add pipeline registers to the declarations
+        if self.readMux:
+            self.rdRoot = self.closeReadTree()
         # Header
         self.writeHeader(FILE)
         # Module and IO port
@@ -260,15 +910,19 @@ class VerilogWriter(object):
         self.writePort(FILE)
         self.writeDeclare(FILE)
         self.writeHWRead(FILE)
+        if self.arrayLogic.tell():
+            self.writeArray(FILE)
         self.writeReadLogic(FILE)
         self.writeWriteLogic(FILE)
         self.writeFIFO(FILE)
         FILE.write('endmodule\n')
+        for section in SECTIONS:
+            getattr(self, section).close()
 
-
-if __name__ == "__main__":
-    regsInfo = [['pio_read', 0, ['data', 31, 0, 'R', 'W', 0, 'pio read data']], ['pio_write', 4, ['data', 31, 0, 'W', 'R', 0, 'pio write data']], ['pio_ctrl_status', 8, ['edge_capture_en', 0, 0, 'W', 'R', 0, 'enable edge capturing'], ['RSVR', 1, 1, 'NA', 'NA', 0, 'Reserved Field'], ['edge_captured', 2, 2, 'R', 'W', 0, 'captured edge activity (if any)'], ['RSVR', 31, 3, 'NA', 'NA', 0, 'Reserved Field']]]
-    path = '.'
-    name = 'pio'
-    vwriter = VerilogWriter(regsInfo, name, path)
-    vwriter.writeVerilog()
+    def writeVerilog(self, model):
+        """
+        Write the verilog File
+        Parameters:
+            :param model: the register model (RegModel)
+        """
+        emitAll(model, [self])
@@ -13,16 +13,25 @@
 #
 #########################################################################################
 
+import json
 import yaml
-from math import log2, ceil
 
 from common import *
 from config import *
+from RegModel import RegModel
+from AddressMap import AddressMap
 
-getRegName = lambda x: x + REG_SUFFIX
+# Use the libyaml loader if PyYAML is built with it, it is much faster
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
 class YmlParser(object):
 
+    # In-memory model cache {path: (key, model)}, enabled by the generator server
+    memoryCache = None
+
+    # Keys of the 'config' section and their default value
+    CONFIG = {'reg_width': REG_WIDTH, 'read_mux': READ_MUX, 'read_stages': READ_STAGES}
+
     def __init__(self, yml):
         """
         Parse the yml file
@@ -30,22 +39,82 @@ class YmlParser(object):
             :param name: the name of the register module
         """
         self.yml = yml
-        # Overall register info, used by HTML Writer
-        self.regsInfo = []
-        # Detailed register info, used by Verilog Write
-        self.portList = []  # IO port       => [(direction, width, name),]
-        self.logics = []    # Logic signal  => [(name, width),]
-        self.regs = []      # Reg signal    => [(name, width),]
-        self.sw_rd_dec = [] # read decode   => [[reg, addr, field0, field1],]
-        self.sw_wr_dec = [] # Write decode  =>  [[reg, addr, field0, field1],]
-        self.rd_assign_logic = [] # read [name, ...]
-        self.wr_seq_logic = []  # write  [(reg, field, reset, sw_write?, hw_write?, msb, lsb),]
-        self.fifo_logic = []    # Logic signal for FIFO  => [(addr, ctrl_signal, data_signal, msb, lsb, type), ...]
+        # The register model, used by all the writers
+        self.model = RegModel()
+        # The 'config' section of the yml file
+        self.config = {}
+        # The errors of the register layout, raised with the address map errors
+        self.errors = []
 
     def openYml(self):
         """ Open the yml file """
-        stream = open(self.yml, 'r')
-        self.regInfoRaw = yaml.load(stream, Loader=yaml.FullLoader)['register']
+        with open(self.yml, 'r') as stream:
+            data = yaml.load(stream, Loader=YamlLoader)
+        self.regInfoRaw = data['register']
+        self.config = data.get('config') or {}
+
+    def elaborateConfig(self):
+        """ Check the 'config' section and set the options of the register model """
+        errors = []
+        if not isinstance(self.config, dict):
+            raise SpecError(['config is not a mapping'])
+        errors += [f'config: unknown key {key}' for key in self.config if key not in self.CONFIG]
+        config = dict(self.CONFIG)
+        for (key, value) in self.config.items():
+            if key in config and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+                errors.append(f'config: {key} {value} is not an integer >= 0')
+            elif key in config:
+                config[key] = value
+        if config['reg_width'] not in REG_WIDTHS:
+            errors.append(f'config: reg_width {config["reg_width"]} is not one of {", ".join(map(str, REG_WIDTHS))}')
+        if config['read_mux'] & (config['read_mux'] - 1):
+            errors.append(f'config: read_mux {config["read_mux"]} is not a power of two')
+        if config['read_stages'] and not config['read_mux']:
+            errors.append('config: read_stages needs the read mux tree (read_mux)')
+        if errors:
+            raise SpecError(errors)
+        self.model.reg_width = config['reg_width']
+        self.model.read_mux = config['read_mux']
+        self.model.read_stages = config['read_stages']
+
+    def loadModel(self, path, key) -> bool:
+        """
+        Load the parsed register model from the model cache
+        Parameters:
+            :param path: the path to the model cache file
+            :param key: the hash of the yml file (and generator version/options)
+        Return:
+            :True if the cache is valid and the model is loaded. An unreadable or invalid cache is a miss
+        """
+        if self.memoryCache != None and path in self.memoryCache:
+            (cacheKey, model) = self.memoryCache[path]
+        else:
+            # the cache is plain JSON data, loading it never runs code from the output directory
+            try:
+                with open(path, 'r') as stream:
+                    data = json.load(stream)
+                if not isinstance(data, dict) or data.get('key') != key:
+                    return False
+                (cacheKey, model) = (key, RegModel.fromData(data['model']))
+            except (OSError, ValueError, KeyError):
+                return False
+        if cacheKey != key:
+            return False
+        self.model = model
+        if self.memoryCache != None:
+            self.memoryCache[path] = (key, model)
+        return True
+
+    def saveModel(self, path, key):
+        """
+        Save the parsed register model into the model cache
+        Parameters:
+            :param path: the path to the model cache file
+            :param key: the hash of the yml file (and generator version/options)
+        """
+        writeFile(path, json.dumps({'key': key, 'model': self.model.toData()}, separators=(',', ':')))
+        if self.memoryCache != None:
+            self.memoryCache[path] = (key, self.model)
 
     def getAllReg(self, regInfoRaw) -> list:
         """ Get all the registers defined in the yaml file """
@@ -53,137 +122,293 @@ class YmlParser(object):
 
     def getAllField(self, reg, regInfoRaw) -> list:
         """ Get all the fields defined in a register """
-        self.fields = list(regInfoRaw[reg].keys())
+        self.fields = [field for field in regInfoRaw[reg].keys() if field not in REG_ATTRS]
         return self.fields
 
-    def parseField(self, reg, addr, start, field, info, idx, last=False):
+    def isBlock(self, regInfo) -> bool:
+        """ A named address block is an entry with a 'register' mapping """
+        return isinstance(regInfo, dict) and isinstance(regInfo.get('register'), dict)
+
+    def parseField(self, reg, start, field, info, fill=None):
         """
-        Parse one Field
+        Parse one Field and add it to the register
         Parameter:
-            :param: reg: register name
-            :param: addr: register address
+            :param: reg: the Register
             :param: start bit of the field
             :param: field: field name
             :param: info: field information
-            :param: index of the register
+            :param: fill: size of the reserved field filling the left-over bits
         Return:
             :size of the field
         """
         if field != RSVR:
             size   = info['size']
-            reset  = info['reset']
-            swtype = info['swtype']
-            hwtype = info['hwtype']
-            note   = info['note']
             msb = start + int(size) - 1
             lsb = start
-            fieldLine = [field, msb, lsb,  swtype , hwtype, reset, note]
-            # Register read/write
-            if swtype == 'W' or swtype == 'R':
-                dir = 'i' if hwtype == 'W' else 'o' # direction is based on hw type
-                name = f'{dir}_hw_{reg}_{field}'    # IO name
-                name_q = getRegName(name)           # Register name
-                self.portList.append((dir, size, name))
-                self.regs.append((name_q, size))
-                self.sw_rd_dec[idx].append(name_q)
-                if swtype == 'W':
-                    self.logics.append((name_q + WEN_SUFFIX, 1))
-                    self.sw_wr_dec[idx].append(name_q)
-                if swtype == 'W' or hwtype == 'W':
-                    self.wr_seq_logic.append((reg, name, reset, swtype == 'W',
-                                              hwtype == 'W', msb, lsb))
-                if hwtype == 'R':
-                    self.rd_assign_logic.append(name)
-
-            # FIFO read/write
-            if swtype == 'FIFOR' or swtype == 'FIFOW':
-                if swtype == 'FIFOR':
-                    dir = 'i'
-                    op  = 'read'
-                if swtype == 'FIFOW':
-                    dir = 'o'
-                    op  = 'write'
-                ctrl_signal = f'o_hw_{reg}_{field}_fifo_{op}'
-                data_signal = f'{dir}_hw_{reg}_{field}_fifo_{op}_data'
-                self.portList.append(('o', 1, ctrl_signal))
-                self.portList.append((dir, size, data_signal))
-                self.fifo_logic.append((addr, ctrl_signal, data_signal, msb, lsb, swtype))
-                if swtype == 'FIFOR':
-                    self.sw_rd_dec[idx].append(data_signal)
-                if swtype == 'FIFOW':
-                    self.sw_rd_dec[idx].append(f"{size}'h0")
+            self.model.addField(reg, field, msb, lsb, info['swtype'], info['hwtype'],
+                                info['reset'], info['note'])
         else:
-            size = REG_WIDTH - start if last else info['size']
-            self.sw_rd_dec[idx].append(f"{size}'b0")
-            fieldLine = [RSVR, start + size -1, start,  'NA' , 'NA', 0x0 , RSVR_NOTE]
-        return (size, fieldLine)
+            size = fill if fill else info['size']
+            self.model.addField(reg, RSVR, start + size -1, start, 'NA', 'NA', 0x0, RSVR_NOTE)
+        return size
 
-    def parseOneReg(self, reg, addr, regInfoRaw, idx):
+    def parseOneReg(self, reg, addr, regInfoRaw, name=None, count=1, stride=0, storage='auto'):
         """
-            Parser one register and extract all the information about this register
-            For detailed register info, see __init__ function
+            Parser one register and add it to the register model
+            Parameter:
+                :param: name: the register name if it is not the yml key (register in a block)
+                :param: count: number of registers of a register array
+                :param: stride: address distance of the registers of a register array
+                :param: storage: storage of a register array: auto, flop or ram
         """
         fields = self.getAllField(reg, regInfoRaw)
         regInfo = regInfoRaw[reg]
+        regObj = self.model.addRegister(name or reg, addr, count, stride)
         nextStart = 0
-        regResult = []
         for field in fields:
-            fieldInfo = regInfo[field]
-            (size, fieldLine) = self.parseField(reg, addr, nextStart, field, fieldInfo, idx)
-            regResult.append(fieldLine)
-            nextStart += size;
+            nextStart += self.parseField(regObj, nextStart, field, regInfo[field])
+        # the FIFO status fields are at the top of the register
+        status = self.parseFifo(regObj, regInfo.get('fifo'))
+        top = self.model.reg_width - sum(size for (field, size, note) in status)
+        if nextStart > top:
+            width = self.model.reg_width
+            self.errors.append(f'{regObj.name}: fields use {nextStart} bits, more than the register width ({width})'
+                               + (f' with {width - top} FIFO status bits' if status else ''))
+            status = []
         # deal with left-over bits
-        if nextStart < REG_WIDTH:
-            (size, fieldLine) = self.parseField(reg, addr, nextStart, RSVR, fieldInfo, idx, True)
-            regResult.append(fieldLine)
+        if nextStart < top:
+            self.parseField(regObj, nextStart, RSVR, None, top - nextStart)
+        for (field, size, note) in status:
+            self.model.addField(regObj, field, top + size - 1, top, 'R', FIFO_HWTYPE, 0, note)
+            top += size
+        self.model.ram[regObj.index] = self.useRam(regObj, storage)
+        if count == 1:
+            self.model.alias[regObj.index] = aliasFlags(regInfo.get('alias'))
 
-        self.regsInfo.append((reg, addr, regResult))
+    def parseFifo(self, reg, options) -> list:
+        """
+        Set the FIFO access options (fifo) of a register with one FIFOR or FIFOW field.
+        The invalid options are reported by the Checker and ignored here.
+        Return:
+            :the FIFO status fields embedded in the read word [(name, size, note),], from lsb to msb
+        """
+        fifo = [field for field in reg.fields if field.swtype in ('FIFOR', 'FIFOW')]
+        if not isinstance(options, dict) or len(fifo) != 1 or reg.count > 1:
+            return []
+        field = fifo[0]
+        read = field.swtype == 'FIFOR'
+        if read and options.get('prefetch') == True:
+            self.model.fifo[reg.index] = FIFO_PREFETCH
+        elif not read and options.get('skid') == True:
+            self.model.fifo[reg.index] = FIFO_SKID
+        status = []
+        level = options.get('level')
+        if isinstance(level, int) and not isinstance(level, bool) and level > 0:
+            status.append((f'{field.name}_level', level, f'Number of words in the {field.name} FIFO'))
+        if options.get('valid') == True and read:
+            status.append((f'{field.name}_valid', 1, f'{field.name} holds a word read from the FIFO'))
+        elif options.get('valid') == True:
+            status.append((f'{field.name}_ready', 1, f'{field.name} can be written, the FIFO is not full'))
+        return status
 
-    def prepend(self):
+    def useRam(self, reg, storage) -> bool:
         """
-        Prepend signals
+        Decide if a register array is stored in a RAM. Only the SW RW / HW RO fields
+        can be stored in a RAM, and a RAM has no reset so 'auto' also needs a zero
+        reset value and a size of at least RAM_THRESHOLD bits.
+        The RAM read data is registered, it needs a pipeline stage of the read mux tree:
+        'auto' uses flops without it and 'ram' is an error.
         """
-        self.portList.append(('i', 1, 'clk'))
-        self.portList.append(('i', 1, 'reset'))
-        self.portList.append(('i',self.addr_width,'i_sw_address')) # TODO
-        self.portList.append(('i',1,'i_sw_read'))
-        self.portList.append(('i',1,'i_sw_write'))
-        self.portList.append(('i',1,'i_sw_select'))
-        self.portList.append(('i',REG_WIDTH,'i_sw_wrdata'))
-        self.portList.append(('o',REG_WIDTH,'o_sw_rddata'))
-        self.logics.append(('o_sw_rddata_next', REG_WIDTH))
-        self.regs.append(('o_sw_rddata' + REG_SUFFIX, REG_WIDTH))
+        if reg.count == 1 or storage not in ('auto', 'ram'):
+            return False
+        if not (self.model.read_mux and self.model.read_stages):
+            if storage == 'ram':
+                self.errors.append(f'{reg.name}: storage ram needs a pipeline stage of the read mux tree '
+                                   f'(read_mux, read_stages)')
+            return False
+        fields = [field for field in reg.fields if field.name != RSVR]
+        if not all(field.swtype == 'W' and field.hwtype == 'R' for field in fields):
+            return False
+        if storage == 'ram':
+            return True
+        return not any(field.reset for field in fields) and reg.count * self.model.reg_width >= RAM_THRESHOLD
 
     def parserAllReg(self):
         """Parse all the registers """
 
         self.openYml()
-        regs = self.getAllReg(self.regInfoRaw)
-        self.addr_width = ceil(log2(len(regs) * 4))
-        self.prepend()
-        addr = 0x0
-        idx = 0
-        for reg in regs:
-            self.sw_rd_dec.append([reg, addr])
-            self.sw_wr_dec.append([reg, addr])
-            self.parseOneReg(reg, addr, self.regInfoRaw, idx)
-            addr += 0x4
-            idx += 1
-
-    def htmlwriter(self):
-        """Return information for htmlwriter"""
-        return self.regsInfo
-
-    def verilogwriter(self):
-        """Return information for verilogwriter"""
-        return (
-            self.portList,
-            self.logics,
-            self.regs,
-            self.sw_rd_dec,
-            self.sw_wr_dec,
-            self.rd_assign_logic,
-            self.wr_seq_logic,
-            self.fifo_logic,
-            self.addr_width
-        )
+        self.elaborateAllReg()
+
+    def layoutAllReg(self, addrMap, regInfoRaw, storage='auto'):
+        """
+        Place the registers of a yml mapping in the address map, the blocks are expanded
+        Parameter:
+            :param: storage: the default storage of the register arrays, set by the enclosing block
+        Return a generator of (regInfoRaw, yml key, register name, address, count, stride, storage)
+        of each register
+        """
+        for (reg, regInfo) in regInfoRaw.items():
+            if self.isBlock(regInfo):
+                addrMap.beginBlock(reg, regInfo.get('offset'), regInfo.get('size'))
+                yield from self.layoutAllReg(addrMap, regInfo['register'], regInfo.get('storage', storage))
+                addrMap.endBlock()
+            else:
+                regInfo = regInfo if isinstance(regInfo, dict) else {}
+                aliases = bin(aliasFlags(regInfo.get('alias'))).count('1')
+                place = addrMap.place(reg, regInfo.get('offset'), regInfo.get('count'), regInfo.get('stride'), aliases)
+                yield (regInfoRaw, reg) + place + (regInfo.get('storage', storage),)
+
+    def elaborateAllReg(self):
+        """Elaborate all the registers of the loaded yml file into the register model """
+        self.elaborateConfig()
+        addrMap = AddressMap(self.model.reg_width // 8)
+        for (regInfoRaw, reg, name, addr, count, stride, storage) in self.layoutAllReg(addrMap, self.regInfoRaw):
+            self.parseOneReg(reg, addr, regInfoRaw, name, count, stride, storage)
+        # the address width covers the highest mapped address
+        try:
+            self.model.addr_width = addrMap.finish()
+        except SpecError as e:
+            self.errors += e.errors
+        if self.errors:
+            raise SpecError(self.errors)
+
+    #==================================================
+    # Streaming parser
+    #==================================================
+
+    def openRegister(self, stream):
+        """
+        Create a yaml loader and move it to the content of the 'register' mapping.
+        Only the yaml events are used so nothing is built in memory.
+        """
+        loader = YamlLoader(stream)
+        loader.get_event()  # stream start
+        loader.get_event()  # document start
+        loader.get_event()  # top level mapping start
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = loader.get_event()
+            if isinstance(key, yaml.ScalarEvent) and key.value == 'register':
+                loader.get_event()  # register mapping start
+                return loader
+            self.skipNode(loader)
+        raise KeyError('register')
+
+    def skipNode(self, loader):
+        """ Skip the events of the next node """
+        depth = 0
+        while True:
+            event = loader.get_event()
+            if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                depth += 1
+            elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                depth -= 1
+            if depth == 0:
+                return
+
+    def composeNode(self, loader):
+        """
+        Compose the next node from the yaml events (the Composer for one register).
+        Anchors and aliases are not supported in the streaming mode.
+        """
+        event = loader.get_event()
+        if isinstance(event, yaml.AliasEvent):
+            raise yaml.YAMLError(f'alias is not supported in the streaming mode {event.start_mark}')
+        if isinstance(event, yaml.ScalarEvent):
+            tag = event.tag
+            if tag == None or tag == '!':
+                tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+            return yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark, style=event.style)
+        if isinstance(event, yaml.SequenceStartEvent):
+            tag = event.tag
+            if tag == None or tag == '!':
+                tag = loader.resolve(yaml.SequenceNode, None, event.implicit)
+            node = yaml.SequenceNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+            while not loader.check_event(yaml.SequenceEndEvent):
+                node.value.append(self.composeNode(loader))
+        else:
+            tag = event.tag
+            if tag == None or tag == '!':
+                tag = loader.resolve(yaml.MappingNode, None, event.implicit)
+            node = yaml.MappingNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+            while not loader.check_event(yaml.MappingEndEvent):
+                key = self.composeNode(loader)
+                node.value.append((key, self.composeNode(loader)))
+        node.end_mark = loader.get_event().end_mark
+        return node
+
+    def scanNode(self, loader) -> dict:
+        """
+        Compose only the attributes and the blocks of a register entry from the yaml
+        events, the fields are skipped. The result is laid out like the yml content.
+        """
+        if not loader.check_event(yaml.MappingStartEvent):
+            self.skipNode(loader)
+            return None
+        loader.get_event()  # mapping start
+        info = {}
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = loader.get_event().value
+            if key == 'register' and loader.check_event(yaml.MappingStartEvent):
+                loader.get_event()
+                info[key] = {}
+                while not loader.check_event(yaml.MappingEndEvent):
+                    reg = loader.get_event().value
+                    info[key][reg] = self.scanNode(loader)
+                loader.get_event()
+            elif (key in REG_ATTRS or key in BLOCK_ATTRS) and loader.check_event(yaml.ScalarEvent, yaml.SequenceStartEvent):
+                info[key] = loader.construct_document(self.composeNode(loader))
+            else:
+                self.skipNode(loader)
+        loader.get_event()  # mapping end
+        return info
+
+    def streamAllReg(self):
+        """
+        Parse the registers one at a time.
+        The address width needs all the registers, so the registers are placed first
+        with the yaml events. Return a generator of the Register, each register
+        is only valid until the next one is parsed.
+        """
+        addrMap = AddressMap(self.model.reg_width // 8)
+        with open(self.yml, 'r') as stream:
+            loader = YamlLoader(stream)
+            loader.get_event()  # stream start
+            loader.get_event()  # document start
+            loader.get_event()  # top level mapping start
+            while not loader.check_event(yaml.MappingEndEvent):
+                key = loader.get_event().value
+                if key == 'config':
+                    self.config = loader.construct_document(self.composeNode(loader)) or {}
+                    continue
+                if key != 'register':
+                    self.skipNode(loader)
+                    continue
+                loader.get_event()  # register mapping start
+                while not loader.check_event(yaml.MappingEndEvent):
+                    reg = loader.get_event().value
+                    for _ in self.layoutAllReg(addrMap, {reg: self.scanNode(loader)}):
+                        pass
+                loader.get_event()  # register mapping end
+            loader.dispose()
+        self.elaborateConfig()
+        # the register width is in a config section written after the registers
+        if addrMap.stride != self.model.reg_width // 8:
+            return self.streamAllReg()
+        self.model.addr_width = addrMap.finish()
+        return self.iterAllReg()
+
+    def iterAllReg(self):
+        """ Generator of the registers for streamAllReg """
+        addrMap = AddressMap(self.model.reg_width // 8)
+        with open(self.yml, 'r') as stream:
+            loader = self.openRegister(stream)
+            while not loader.check_event(yaml.MappingEndEvent):
+                reg = loader.get_event().value
+                entry = {reg: loader.construct_document(self.composeNode(loader))}
+                for (regInfoRaw, key, name, addr, count, stride, storage) in self.layoutAllReg(addrMap, entry):
+                    self.model.clear()
+                    self.parseOneReg(key, addr, regInfoRaw, name, count, stride, storage)
+                    if self.errors:
+                        raise SpecError(self.errors)
+                    yield self.model.registers[0]
+            loader.dispose()
@@ -0,0 +1,69 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Thin client of the generator server. It has the same command line as the
+#   generator and sends it to the server over a Unix socket (one JSON line per
+#   request). It only uses the standard library so it starts fast. If no server
+#   is running, the generator is run locally.
+#
+#########################################################################################
+
+import json
+import os
+import socket
+import sys
+
+# Default socket of the generator server, can be changed with SIMPLE_CSR_SOCKET
+SOCKET = os.environ.get('SIMPLE_CSR_SOCKET', f'/tmp/simple-csr-{os.getuid()}.sock')
+
+def request(message, path=SOCKET):
+    """
+    Send one request to the server and return the response
+    Parameters:
+        :param message: the request dict
+        :param path: the server socket
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(message).encode() + b'\n')
+        with sock.makefile('rb') as stream:
+            line = stream.readline()
+    if not line:
+        raise ConnectionError('no response from the server')
+    return json.loads(line)
+
+def runLocal(argv):
+    """ Run the generator in this process """
+    sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+    from main import main
+    return main(argv)
+
+def main(argv=None):
+    """
+    Run the command line on the server and return its exit status
+    """
+    argv = sys.argv[1:] if argv == None else argv
+    message = {
+        'argv': argv,
+        'prog': os.path.basename(sys.argv[0]),
+        'cwd': os.getcwd(),
+        'env': {'SOURCE_DATE_EPOCH': os.environ.get('SOURCE_DATE_EPOCH')},
+    }
+    try:
+        response = request(message)
+    except (OSError, ValueError):
+        return runLocal(argv)
+    if 'fallback' in response:
+        return runLocal(argv)
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    return response['status']
+
+if __name__ == '__main__':
+    sys.exit(main())
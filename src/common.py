@@ -14,27 +14,73 @@
 ############################
 # Created
 ############################
-from datetime import datetime
-YEAR = datetime.now().year
-MONTH = datetime.now().month
-DAY = datetime.now().day
-HOUR = datetime.now().hour
-MINUTE = datetime.now().minute
+# The date can be pinned with the SOURCE_DATE_EPOCH environment variable
+# (https://reproducible-builds.org/specs/source-date-epoch/) to get deterministic output
+import filecmp
+import os
+import tempfile
+from datetime import datetime, timezone
+SOURCE_DATE_EPOCH = os.environ.get('SOURCE_DATE_EPOCH')
+if SOURCE_DATE_EPOCH:
+    NOW = datetime.fromtimestamp(int(SOURCE_DATE_EPOCH), timezone.utc)
+else:
+    NOW = datetime.now()
+YEAR = NOW.year
+MONTH = NOW.month
+DAY = NOW.day
+HOUR = NOW.hour
+MINUTE = NOW.minute
 
 ############################
 # Global Define
 ############################
 
+# Generator version, part of the build cache key
+VERSION     = '1.4'
+
 # Other global define
 RSVR        = 'RSVR'
 RSVR_NOTE   = 'Reserved Field'
 
+# Register attributes, they can not be used as field names
+REG_ATTRS   = ('offset', 'count', 'stride', 'storage', 'fifo', 'alias')
+# Named address block attributes, a block is an entry with a 'register' mapping
+BLOCK_ATTRS = ('offset', 'size', 'register', 'storage')
+# Storage of a register array: flops, RAM, or chosen by the generator
+STORAGES    = ('auto', 'flop', 'ram')
+# Supported register widths (config: reg_width)
+REG_WIDTHS  = (32, 64, 128)
+# Options of the FIFO access of a FIFOR/FIFOW register (fifo)
+FIFO_OPTIONS  = ('prefetch', 'skid', 'valid', 'level')
+FIFO_PREFETCH = 1       # prefetch register of a FIFOR field
+FIFO_SKID     = 2       # skid buffer of a FIFOW field
+# HW type of the FIFO status fields (valid/ready and level) embedded in the read word
+FIFO_HWTYPE   = 'FIFO'
+# Alias addresses of a register (alias): write 1 to set, clear or toggle the bits.
+# The aliases follow the register address in this order.
+ALIASES     = ('set', 'clr', 'tgl')
+ALIAS_CLR   = 2         # flag of the clear alias
+
 RTL_SUFFIX = '_csr'
 REG_SUFFIX = '_q'
 WEN_SUFFIX = '_wen'
 
 LINE_LIMIT = 100
 
+############################
+# Global Class
+############################
+class SpecError(Exception):
+
+    def __init__(self, errors):
+        """
+        Error in the yml spec
+        Parameters:
+            :param errors: list of the error messages of the spec
+        """
+        Exception.__init__(self, '\n'.join(errors))
+        self.errors = errors
+
 ############################
 # Global Function
 ############################
@@ -54,5 +100,65 @@ def addSpace(string, maxlen = 10, end=True):
     else:
         return ' ' * (maxlen - lens) + string if lens < maxlen else INDENT(1) + string
 
+def aliasFlags(alias) -> int:
+    """ The alias flags of a register (bit i for ALIASES[i]), the invalid aliases are reported by the Checker """
+    if not isinstance(alias, list):
+        return 0
+    return sum(1 << i for (i, kind) in enumerate(ALIASES) if kind in alias)
 
+def writeFile(path, content):
+    """
+    Write the content to the file only if it is different from the file on disk,
+    so the mtime of an unchanged output is kept. The file is written to a temp
+    file in the same directory and renamed so it is never seen half written.
+    parameter:
+        :param path: the file path
+        :param content: the string (or bytes) content
+    Return:
+        :True if the file is written
+    """
+    mode = 'b' if isinstance(content, bytes) else ''
+    try:
+        with open(path, 'r' + mode) as stream:
+            if stream.read() == content:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    (FILE, tmp) = openTemp(path, 'w' + mode)
+    with FILE:
+        FILE.write(content)
+    return commitTemp(tmp, path, False)
+
+def openTemp(path, mode='w'):
+    """
+    Open a temp file in the directory of path, to write a large output
+    straight to disk. The temp file is moved to path by commitTemp.
+    Return:
+        :(file object, temp file path)
+    """
+    (fd, tmp) = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp_')
+    return (os.fdopen(fd, mode), tmp)
+
+def commitTemp(tmp, path, compare=True):
+    """
+    Rename the (closed) temp file to path, or remove it if path has the same content.
+    Return:
+        :True if the file is written
+    """
+    try:
+        if compare and os.path.exists(path) and filecmp.cmp(tmp, path, shallow=False):
+            os.remove(tmp)
+            return False
+        os.chmod(tmp, 0o666 & ~getUmask())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return True
 
+def getUmask():
+    """ Get the process umask, mkstemp creates the file as 0600 """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
@@ -14,9 +14,20 @@
 # CSR related variable
 # ==============================================
 
-# register width
+# register width, can be changed per spec in the 'config' section of the yml file
 REG_WIDTH   = 32
 
+# minimum size in bits (count * REG_WIDTH) of a register array stored in a RAM
+# with the default 'auto' storage
+RAM_THRESHOLD = 1024
+
+# read data path, can be changed per spec in the 'config' section of the yml file
+#   READ_MUX: number of register addresses decoded by each read mux of the tree,
+#             0 for a single flat read mux
+#   READ_STAGES: number of pipeline stages of the read mux tree
+READ_MUX    = 0
+READ_STAGES = 0
+
 # ==============================================
 # Yaml File related variable
 # ==============================================
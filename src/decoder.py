@@ -0,0 +1,340 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Decoder of the register dumps captured during the debug. A dump is a sequence
+#   of snapshots (samples) of the register block, each sample is the words read
+#   from a start address, in address order. The dump is memory mapped and each
+#   field of all the samples of a chunk is extracted at once with a numpy shift
+#   and mask, using the msb/lsb columns of the register model. The fields are
+#   written as the columns of a CSV file, as a structured .npy array, or as one
+#   .npy array per column in a directory.
+#
+#   A binary dump has the raw words (little endian by default). A hex dump has
+#   one token of reg_width / 4 hex digits per word, separated by white spaces
+#   (one word per line like $writememh, or one sample per line).
+#
+#########################################################################################
+
+import argparse
+import os
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # reported by main, the decoder needs numpy
+
+from common import *
+from YmlParser import YmlParser
+
+# Number of 64 bits lanes decoded at once, bounds the memory of a chunk (32 MB)
+CHUNK_LANES = 1 << 22
+
+class DumpError(Exception):
+    """ Dump file not matching the register block """
+    pass
+
+def fieldColumns(model, start, words, regs=None) -> list:
+    """
+    The fields found in a sample
+    Parameters:
+        :param model: the register model (RegModel)
+        :param start: byte address of the first word of a sample
+        :param words: number of words of a sample
+        :param regs: names of the registers to decode, None for all
+    Return:
+        :[(column name, word index in the sample, msb, lsb),] in address order.
+         A field wider than 64 bits is split into 64 bits columns <field>_0, <field>_1, ... from the lsb
+    """
+    size = model.reg_width // 8
+    columns = []
+    for reg in sorted(model, key=lambda reg: reg.addr):
+        if regs and reg.name not in regs:
+            continue
+        for i in range(reg.count):
+            addr = reg.addr + i * reg.stride
+            word = (addr - start) // size
+            if addr < start or word >= words:
+                continue
+            name = reg.name if reg.count == 1 else f'{reg.name}[{i}]'
+            for field in reg.fields:
+                if field.name == RSVR:
+                    continue
+                if field.size <= 64:
+                    columns.append((f'{name}.{field.name}', word, field.msb, field.lsb))
+                    continue
+                for lsb in range(field.lsb, field.msb + 1, 64):
+                    part = (lsb - field.lsb) // 64
+                    columns.append((f'{name}.{field.name}_{part}', word, min(field.msb, lsb + 63), lsb))
+    return columns
+
+def columnType(msb, lsb):
+    """ The smallest numpy unsigned type of a field """
+    size = msb - lsb + 1
+    return np.uint8 if size <= 8 else np.uint16 if size <= 16 else np.uint32 if size <= 32 else np.uint64
+
+def extract(lanes, laneBits, word, msb, lsb):
+    """
+    Extract one field of all the samples with a shift and a mask
+    Parameters:
+        :param lanes: (words, lanes of a word, samples) array, the lanes of a word from the lsb
+        :param laneBits: bits of a lane, 32 or 64
+        :param word: word index of the field
+        :param msb: msb of the field, at most 64 bits above lsb
+        :param lsb: lsb of the field
+    """
+    type = lanes.dtype.type
+    (lo, hi, shift) = (lsb // laneBits, msb // laneBits, lsb % laneBits)
+    value = lanes[word, lo] >> type(shift)
+    if hi != lo:
+        value |= lanes[word, hi] << type(laneBits - shift)
+    size = msb - lsb + 1
+    if size < laneBits:
+        value &= type((1 << size) - 1)
+    return value.astype(columnType(msb, lsb), copy=False)
+
+def hexTable():
+    """ Value of the hex digit of each byte, 255 for a non hex digit """
+    table = np.full(256, 255, dtype=np.uint8)
+    for (i, c) in enumerate('0123456789abcdef'):
+        table[ord(c)] = table[ord(c.upper())] = i
+    return table
+
+class Dump(object):
+    """ Memory mapped register dump, read as chunks of samples """
+
+    def __init__(self, path, width, words, hex=False, bigEndian=False):
+        """
+        Parameters:
+            :param path: the dump file
+            :param width: register width in bits
+            :param words: number of words of a sample
+            :param hex: hex dump instead of a binary dump
+            :param bigEndian: big endian words of a binary dump
+        """
+        self.path     = path
+        self.words    = words
+        self.laneBits = 32 if width == 32 else 64
+        self.lanes    = width // self.laneBits   # lanes of a word
+        self.hex      = hex
+        empty = os.path.getsize(path) == 0
+        if not hex:
+            type = np.dtype(f'u{self.laneBits // 8}').newbyteorder('>' if bigEndian else '<')
+            self.data = np.zeros(0, dtype=type) if empty else np.memmap(path, dtype=type, mode='r')
+            self.bigEndian = bigEndian
+            count = len(self.data) // self.lanes
+            if len(self.data) % (self.lanes * words):
+                raise DumpError(f'{path}: {count} words is not a multiple of the {words} words of a sample')
+        else:
+            self.data = np.zeros(0, dtype=np.uint8) if empty else np.memmap(path, dtype=np.uint8, mode='r')
+            count = self.scanHex(width // 4)
+            if count % words:
+                raise DumpError(f'{path}: {count} words is not a multiple of the {words} words of a sample')
+        self.samples = count // words
+
+    def scanHex(self, digits) -> int:
+        """
+        Find the token length (the hex digits and the white spaces after them) of a hex dump
+        Return:
+            :number of words of the dump
+        """
+        self.digits = digits
+        self.table = hexTable()
+        head = bytes(self.data[:digits + 8])
+        self.step = digits + len(head[digits:]) - len(head[digits:].lstrip())
+        # the white spaces at the end of the file are not a token
+        tail = bytes(self.data[-4096:])
+        size = len(self.data) - (len(tail) - len(tail.rstrip()))
+        if not size:
+            return 0
+        if self.step == digits:
+            self.step += 1
+        count = (size + self.step - 1) // self.step
+        if size - (count - 1) * self.step != digits:
+            raise DumpError(f'{self.path}: the words are not {digits} hex digits separated by white spaces')
+        return count
+
+    def readHex(self, first, count):
+        """ The lanes of count words from the word first of a hex dump """
+        (step, digits) = (self.step, self.digits)
+        text = self.data[first * step:(first + count) * step]
+        if len(text) < count * step:
+            text = np.concatenate([text, np.full(count * step - len(text), ord('\n'), dtype=np.uint8)])
+        text = text.reshape(count, step)
+        if not np.isin(text[:, digits:], np.frombuffer(b' \t\r\n', dtype=np.uint8)).all():
+            raise DumpError(f'{self.path}: the words are not {digits} hex digits separated by white spaces')
+        nibbles = self.table[text[:, :digits]]
+        bad = np.flatnonzero((nibbles == 255).any(axis=1))
+        if len(bad):
+            raise DumpError(f'{self.path}: word {first + bad[0]} is not a hex number')
+        type = np.uint32 if self.laneBits == 32 else np.uint64
+        laneDigits = self.laneBits // 4
+        lanes = np.zeros((count, self.lanes), dtype=type)
+        for lane in range(self.lanes):
+            # the lanes are from the lsb, the digits from the msb
+            end = digits - lane * laneDigits
+            for digit in range(end - laneDigits, end):
+                lanes[:, lane] <<= type(4)
+                lanes[:, lane] |= nibbles[:, digit]
+        return lanes
+
+    def chunks(self):
+        """
+        Yield the (first sample, number of samples, (words, lanes of a word, samples) array) of each chunk.
+        The chunk is transposed once so each field is extracted from a contiguous row.
+        """
+        size = max(1, CHUNK_LANES // (self.words * self.lanes))
+        for first in range(0, self.samples, size):
+            count = min(size, self.samples - first)
+            if self.hex:
+                lanes = self.readHex(first * self.words, count * self.words)
+            else:
+                lanes = self.data[first * self.words * self.lanes:(first + count) * self.words * self.lanes]
+            lanes = lanes.reshape(count, self.words, self.lanes)
+            if not self.hex and self.bigEndian:
+                lanes = lanes[:, :, ::-1]
+            yield (first, count, np.ascontiguousarray(lanes.transpose(1, 2, 0)))
+
+def writeCsv(dump, columns, path, hexValue=False):
+    """
+    Write the fields of all the samples in a CSV file, one column per field
+    Parameters:
+        :param dump: the Dump
+        :param columns: the field columns (fieldColumns)
+        :param path: the CSV file, - for the standard output
+        :param hexValue: write the values in hex
+    """
+    FILE = sys.stdout if path == '-' else open(path, 'w')
+    try:
+        FILE.write(','.join(name for (name, word, msb, lsb) in columns) + '\n')
+        fmt = ','.join(['0x%x' if hexValue else '%d'] * len(columns))
+        for (first, count, lanes) in dump.chunks():
+            table = np.empty((count, len(columns)), dtype=np.uint64)
+            for (i, (name, word, msb, lsb)) in enumerate(columns):
+                table[:, i] = extract(lanes, dump.laneBits, word, msb, lsb)
+            np.savetxt(FILE, table, fmt=fmt)
+    finally:
+        if FILE is not sys.stdout:
+            FILE.close()
+
+def writeNpy(dump, columns, path):
+    """
+    Write the fields of all the samples in a structured .npy array, one named field per column.
+    The array is memory mapped, so the output can be larger than the memory.
+    """
+    type = np.dtype([(name, columnType(msb, lsb)) for (name, word, msb, lsb) in columns])
+    table = np.lib.format.open_memmap(path, mode='w+', dtype=type, shape=(dump.samples,))
+    for (first, count, lanes) in dump.chunks():
+        for (name, word, msb, lsb) in columns:
+            table[name][first:first + count] = extract(lanes, dump.laneBits, word, msb, lsb)
+    table.flush()
+    del table
+
+def writeColumns(dump, columns, path):
+    """
+    Write the fields of all the samples in a directory, one memory mapped <column>.npy array per column
+    """
+    os.makedirs(path, exist_ok=True)
+    tables = [np.lib.format.open_memmap(os.path.join(path, name + '.npy'), mode='w+',
+                                        dtype=columnType(msb, lsb), shape=(dump.samples,))
+              for (name, word, msb, lsb) in columns]
+    for (first, count, lanes) in dump.chunks():
+        for (table, (name, word, msb, lsb)) in zip(tables, columns):
+            table[first:first + count] = extract(lanes, dump.laneBits, word, msb, lsb)
+    for table in tables:
+        table.flush()
+
+def decode(yml, dump, out='-', format=None, start=0, words=None, regs=None, bigEndian=False, hexValue=False) -> int:
+    """
+    Decode a register dump
+    Parameters:
+        :param yml: the yml file of the register block
+        :param dump: the dump file
+        :param out: the output file, .npy for a structured array, a directory for one .npy file per column,
+                    CSV otherwise (- for the standard output)
+        :param format: bin or hex, None to use hex for the .hex, .mem and .txt dumps
+        :param start: byte address of the first word of a sample
+        :param words: number of words of a sample, None for the words from start to the last register
+        :param regs: names of the registers to decode, None for all
+        :param bigEndian: big endian words of a binary dump
+        :param hexValue: write the CSV values in hex
+    Return:
+        :number of samples
+    """
+    parser = YmlParser(yml)
+    parser.openYml()
+    parser.elaborateAllReg()
+    model = parser.model
+    size = model.reg_width // 8
+    if start % size:
+        raise DumpError(f'start address {hex(start)} is not a multiple of {size}')
+    if words == None:
+        end = max([reg.addr + reg.count * (reg.stride or size) for reg in model] + [start])
+        words = (end - start) // size
+    if words <= 0:
+        raise DumpError(f'no register from the start address {hex(start)}')
+    if format == None:
+        format = 'hex' if os.path.splitext(dump)[1] in ('.hex', '.mem', '.txt') else 'bin'
+    columns = fieldColumns(model, start, words, regs)
+    if regs:
+        missing = set(regs) - {reg.name for reg in model}
+        if missing:
+            raise DumpError(f'no register {", ".join(sorted(missing))} in {yml}')
+    samples = Dump(dump, model.reg_width, words, format == 'hex', bigEndian)
+    if out.endswith('/') or os.path.isdir(out):
+        writeColumns(samples, columns, out)
+    elif out.endswith('.npy'):
+        writeNpy(samples, columns, out)
+    else:
+        writeCsv(samples, columns, out, hexValue)
+    return samples.samples
+
+def main(argv=None):
+    """
+    Return the exit status: 0 if the dump is decoded, 1 otherwise
+    """
+    parser = argparse.ArgumentParser(description='Simple CSR register dump decoder.')
+    parser.add_argument('yml', type=str,
+                        help='yml file of the register block')
+    parser.add_argument('dump', type=str,
+                        help='dump file, a sequence of samples of the registers')
+    parser.add_argument('-o', type=str, default='-',
+                        help='Output file: a structured array for .npy, one .npy file per column for a directory '
+                             '(ending with /), CSV otherwise (default: CSV on the standard output)')
+    parser.add_argument('-format', type=str, choices=['bin', 'hex'],
+                        help='Dump format (default: hex for .hex, .mem and .txt files, bin otherwise)')
+    parser.add_argument('-endian', type=str, choices=['little', 'big'], default='little',
+                        help='Byte order of the words of a binary dump (default: little)')
+    parser.add_argument('-start', type=lambda x: int(x, 0), default=0,
+                        help='Byte address of the first word of a sample (default: 0)')
+    parser.add_argument('-words', type=int,
+                        help='Number of words of a sample (default: from the start address to the last register)')
+    parser.add_argument('-reg', type=str, action='append',
+                        help='Only decode this register, can be repeated (default: all)')
+    parser.add_argument('-hex', action='store_true',
+                        help='Write the CSV values in hex')
+    args = parser.parse_args(argv)
+    if np == None:
+        print('ERROR: the decoder needs numpy (pip install numpy)', file=sys.stderr)
+        return 1
+    try:
+        decode(args.yml, args.dump, args.o, args.format, args.start, args.words, args.reg,
+               args.endian == 'big', args.hex)
+    except SpecError as e:
+        for error in e.errors:
+            print(f'ERROR: {args.yml}: {error}', file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # the reader of the standard output is gone (| head), drop the rest quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (DumpError, OSError) as e:
+        print(f'ERROR: {e}', file=sys.stderr)
+        return 1
+    return 0
@@ -14,7 +14,8 @@
 import argparse
 import os
 import sys
-from shutil import rmtree
+from glob import glob
+from multiprocessing import Pool
 
 my_path = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(my_path + '/src')
@@ -23,55 +24,210 @@ from YmlParser import YmlParser
 from HtmlWriter import HtmlWriter
 from VerilogWriter import VerilogWriter
 from DriverWriter import DriverWriter
+from PythonWriter import PythonWriter
+from BusWriter import AxiLiteWriter, ApbWriter
+from BuildCache import BuildCache
+from Checker import Checker
+from common import SpecError
+from Emitter import emitAll
+from Profiler import Profiler, summary, writeChromeTrace, writeCProfile
+
+# All the output writers, a new backend is added here
+EMITTERS = (HtmlWriter, VerilogWriter, DriverWriter, PythonWriter)
+# Bus adapters of the CSR module, only generated with the -bus option
+BUS_EMITTERS = (AxiLiteWriter, ApbWriter)
 
 def createDir(path):
-    """ Create directory """
-    try:
-        os.makedirs(path)
-    except FileExistsError:
-        rmtree(path)
-        os.makedirs(path)
+    """ Create directory, the existing outputs are kept for the build cache """
+    os.makedirs(path, exist_ok=True)
 
-def main():
-    # Parse the argument
-    parser = argparse.ArgumentParser(description='Simple CSR Generator.')
-    parser.add_argument('yml', type=str,
-                        help='yml file containing register information')
-    parser.add_argument('-outdir', type=str,
-                        help='Output directory name')
-    args = parser.parse_args()
-    yml = args.yml
-    outdir = args.outdir
+def expandSpecs(specs):
+    """
+    Expand the command line specs into a list of yml files
+    parameter:
+        :param specs: yml files, directories (all the *.yml inside) or glob patterns
+    """
+    ymls = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            ymls += sorted(glob(os.path.join(spec, '*.yml')))
+        elif os.path.isfile(spec):
+            ymls.append(spec)
+        else:
+            # keep an unmatched spec so that it is reported as an error
+            ymls += sorted(glob(spec)) or [spec]
+    return ymls
+
+def generate(yml, outdir=None, force=False, only=None, bus=None, stream=False, check=False, profiler=None):
+    """
+    Run the whole flow (parser and all the writers) for one yml file
+    parameter:
+        :param yml: the yml file
+        :param outdir: output directory, None to use the default directory next to the yml file
+        :param force: ignore the build cache and write all the outputs
+        :param only: list of the backends to generate, None for all
+        :param bus: list of the bus adapters to generate, None for none
+        :param stream: parse and write one register at a time to keep the memory bounded
+        :param check: only check the spec, nothing is written. Raise SpecError for an invalid spec
+        :param profiler: Profiler measuring each stage, the writers are then run one at a time
+    """
+    profiler = profiler or Profiler(yml)
+    if check:
+        with profiler.stage('check'):
+            errors = Checker(yml).checkAll()
+        if errors:
+            raise SpecError(errors)
+        return
 
     fileName = os.path.basename(yml)
     filePath = os.path.dirname(os.path.abspath(yml))
     moduleName = fileName.replace('.yml', '')
-    rtlPath =  filePath + '/' + moduleName + '_csr/rtl' if (outdir == None) else outdir
-    docPath =  filePath + '/' + moduleName + '_csr/doc' if (outdir == None) else outdir
-    driPath =  filePath + '/' + moduleName + '_csr/driver' if (outdir == None) else outdir
+    csrPath =  filePath + '/' + moduleName + '_csr' if (outdir == None) else outdir
+    selected = [emitter for emitter in EMITTERS if only == None or emitter.backend in only]
+    selected += [emitter for emitter in BUS_EMITTERS if emitter.backend in (bus or ())]
+    emitters = [emitter(moduleName, csrPath + '/' + emitter.backend if (outdir == None) else outdir)
+                for emitter in selected]
 
-    createDir(rtlPath)
-    createDir(docPath)
-    createDir(driPath)
+    for emitter in emitters:
+        createDir(emitter.path)
+
+    # Unchanged spec: nothing to do for the writers
+    cache = BuildCache(csrPath + '/.' + moduleName + '_csr.cache', {'outdir': outdir != None})
+    specHash = cache.hashFile(yml)
+    emitters = [emitter for emitter in emitters
+                if force or not cache.hit(emitter.backend + '.spec', specHash, emitter.fullpath())]
+    if not emitters:
+        return
 
-    # Parse the yml file
     parser = YmlParser(yml)
-    parser.parserAllReg()
 
-    # Write the HTML document
-    hwriterInfo = parser.htmlwriter()
-    hwriter = HtmlWriter(hwriterInfo, moduleName, docPath)
-    hwriter.writeHtml()
+    # Streaming mode: the whole model is never in memory, so all the writers are run
+    if stream:
+        with profiler.stage('stream'):
+            emitAll(parser.model, emitters, parser.streamAllReg())
+        for emitter in emitters:
+            cache.update(emitter.backend, None)
+            cache.update(emitter.backend + '.spec', specHash)
+        cache.save()
+        return
+
+    # Parse the yml file, or load the parsed model from the model cache
+    modelFile = csrPath + '/.' + moduleName + '_csr.model'
+    with profiler.stage('load'):
+        loaded = not force and parser.loadModel(modelFile, specHash)
+        if not loaded:
+            parser.openYml()
+    if not loaded:
+        with profiler.stage('parse'):
+            parser.elaborateAllReg()
+        parser.saveModel(modelFile, specHash)
+
+    # Only the writers whose input has changed are run, all in one pass over the registers
+    changed = []
+    for emitter in emitters:
+        infoHash = cache.hashInfo(emitter.cacheInfo(parser.model))
+        if force or not cache.hit(emitter.backend, infoHash, emitter.fullpath()):
+            changed.append(emitter)
+        cache.update(emitter.backend, infoHash)
+        cache.update(emitter.backend + '.spec', specHash)
+    if profiler.enabled:
+        for emitter in changed:
+            with profiler.stage(emitter.backend):
+                emitAll(parser.model, [emitter])
+    else:
+        emitAll(parser.model, changed)
+    cache.save()
+
+def generateJob(job):
+    """
+    Run generate for one (yml, options, profile, cprofile, memory) job and catch the error
+    so a bad spec does not stop the other specs in the batch.
+    Return (yml, list of the error messages, profile records, hottest cProfile stage)
+    """
+    (yml, options, profile, cprofile, memory) = job
+    profiler = Profiler(yml, profile, cprofile, memory)
+    try:
+        with profiler.stage('total', outer=True):
+            generate(yml, profiler=profiler, **options)
+        errors = []
+    except SpecError as e:
+        errors = e.errors
+    except Exception as e:
+        errors = [f'{type(e).__name__}: {e}']
+    return (yml, errors, profiler.records, profiler.hottest)
+
+def main(argv=None, workers=None):
+    """
+    Parameters:
+        :param argv: the command line arguments (default: sys.argv)
+        :param workers: number of workers, it overrides -jobs. The server uses 1 so the specs
+                        are parsed in its process and kept in its memory cache
+    Return the exit status: 0 if all the specs are generated, 1 otherwise
+    """
+    # Parse the argument
+    parser = argparse.ArgumentParser(description='Simple CSR Generator.')
+    parser.add_argument('yml', type=str, nargs='+',
+                        help='yml file(s) containing register information. '
+                             'Directories and glob patterns are expanded to the *.yml files')
+    parser.add_argument('-outdir', type=str,
+                        help='Output directory name')
+    parser.add_argument('-only', type=str, action='append',
+                        choices=[emitter.backend for emitter in EMITTERS],
+                        help='Only generate the selected output, can be repeated (default: all)')
+    parser.add_argument('-bus', type=str, action='append',
+                        choices=[emitter.backend for emitter in BUS_EMITTERS],
+                        help='Also generate the bus adapter of the CSR module, can be repeated')
+    parser.add_argument('-stream', action='store_true',
+                        help='Parse and write one register at a time, for very large register maps')
+    parser.add_argument('-check', '--check', action='store_true',
+                        help='Only parse and check the specs, nothing is written')
+    parser.add_argument('-force', action='store_true',
+                        help='Ignore the build cache and regenerate all the outputs')
+    parser.add_argument('-profile', '--profile', action='store_true',
+                        help='Print the wall time and CPU time of each stage')
+    parser.add_argument('-memory', action='store_true',
+                        help='With -profile, also measure the tracemalloc peak of each stage. '
+                             'The tracing slows down the stages, the times are then not comparable')
+    parser.add_argument('-trace', type=str,
+                        help='With -profile, write the stages to this file in Chrome trace-event format')
+    parser.add_argument('-cprofile', type=str,
+                        help='With -profile, dump the cProfile stats of the slowest stage to this file')
+    parser.add_argument('-jobs', type=int, default=os.cpu_count(),
+                        help='Number of specs generated in parallel (default: number of cores)')
+    args = parser.parse_args(argv)
+    ymls = expandSpecs(args.yml)
+    outdir = args.outdir
+
+    options = {'outdir': outdir, 'force': args.force, 'only': args.only, 'bus': args.bus, 'stream': args.stream,
+               'check': args.check}
+    jobs = [(yml, options, args.profile, args.cprofile != None, args.memory) for yml in ymls]
+    workers = max(1, min((workers or args.jobs) or 1, len(jobs)))
+    if workers > 1:
+        with Pool(workers) as pool:
+            results = pool.map(generateJob, jobs)
+    else:
+        results = map(generateJob, jobs)
 
-    # Write the  Verilog File
-    verilogInfo = parser.verilogwriter()
-    vwriter = VerilogWriter(verilogInfo, moduleName, rtlPath)
-    vwriter.writeVerilog()
+    # Report the error for each spec
+    status = 0
+    records = []
+    hottest = None
+    for (yml, errors, profile, cprofile) in results:
+        for error in errors:
+            print(f'ERROR: {yml}: {error}', file=sys.stderr)
+            status = 1
+        records += profile
+        if cprofile and (hottest == None or cprofile[0] > hottest[0]):
+            hottest = cprofile
 
-    # Write the Driver document
-    hwriterInfo = parser.htmlwriter()
-    dwriter = DriverWriter(hwriterInfo, moduleName, driPath)
-    dwriter.writeDriver()
+    if args.profile:
+        print(summary(records), end='')
+        if args.trace:
+            writeChromeTrace(records, args.trace)
+        if args.cprofile and hottest:
+            writeCProfile(hottest[2], args.cprofile)
+            print(f'cProfile of the slowest stage ({hottest[1]}) written to {args.cprofile}')
+    return status
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Replay of SW bus transaction traces on the behavioral model (CsrModel).
+#   A trace is a numpy structured array (a memory mapped .npy file), one transaction
+#   per cycle:
+#       op:   0 idle cycle, 1 read, 2 write (any integer type)
+#       addr: byte address
+#       data: write data, or the expected read data. A register wider than 64 bits
+#             has (width / 64) uint64 lanes, from the lsb
+#       mask: optional, the bits of the read data compared (default: all)
+#   The trace is replayed by chunks: the columns of a chunk are converted to python
+#   integers at once and fed to the model in a tight loop, so a trace much larger
+#   than the memory is replayed at about a million transactions per second.
+#
+#########################################################################################
+
+import argparse
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # reported by main, the trace files need numpy
+
+from common import *
+from CsrModel import CsrModel
+from YmlParser import YmlParser
+
+# Transaction types of a trace
+IDLE  = 0
+READ  = 1
+WRITE = 2
+
+# Number of transactions converted at once
+CHUNK = 1 << 16
+
+def toInts(column) -> list:
+    """ A data column as a list of python integers, the uint64 lanes of a wide register are joined """
+    if column.ndim == 1:
+        return column.tolist()
+    return [sum(lane << (64 * i) for (i, lane) in enumerate(row)) for row in column.tolist()]
+
+def toLanes(values, lanes) -> list:
+    """ Split python integers into uint64 lanes, from the lsb """
+    if lanes == 0:
+        return values
+    return [[value >> (64 * i) & (2 ** 64 - 1) for i in range(lanes)] for value in values]
+
+def replay(model, trace, maxErrors=100, record=None) -> tuple:
+    """
+    Replay a trace on the model and compare the read data with the expected data
+    Parameters:
+        :param model: the CsrModel
+        :param trace: the trace (numpy structured array)
+        :param maxErrors: number of mismatches kept
+        :param record: None, or a writable copy of the trace where the data of the reads
+                       is replaced by the read data of the model (expected data for the RTL)
+    Return:
+        :(number of mismatches, [(transaction index, address, expected data, read data),])
+    """
+    names = trace.dtype.names or ()
+    if any(name not in names for name in ('op', 'addr', 'data')):
+        raise ValueError('the trace is not a structured array with the op, addr and data fields')
+    mask = 'mask' in names
+    lanes = trace.dtype['data'].shape[0] if trace.dtype['data'].shape else 0
+    (read, write, idle) = (model.read, model.write, model.idle)
+    recording = record is not None
+    count = 0
+    errors = []
+    for first in range(0, len(trace), CHUNK):
+        chunk = trace[first:first + CHUNK]
+        ops = chunk['op'].tolist()
+        addrs = chunk['addr'].tolist()
+        datas = toInts(chunk['data'])
+        masks = toInts(chunk['mask']) if mask else None
+        reads = []      # (index in the chunk, read data) kept for the record
+        for (i, (op, addr, data)) in enumerate(zip(ops, addrs, datas)):
+            if op == READ:
+                value = read(addr)
+                diff = value ^ data
+                if mask:
+                    diff &= masks[i]
+                if diff:
+                    count += 1
+                    if len(errors) < maxErrors:
+                        errors.append((first + i, addr, data, value))
+                if recording:
+                    reads.append((i, value))
+            elif op == WRITE:
+                write(addr, data)
+            else:
+                idle()
+        if reads:
+            record['data'][[first + i for (i, value) in reads]] = toLanes([value for (i, value) in reads], lanes)
+    return (count, errors)
+
+def makeTrace(ops, addrs, datas, masks=None, width=64):
+    """
+    Build a trace from its columns
+    Parameters:
+        :param ops: transaction types (IDLE, READ, WRITE)
+        :param addrs: byte addresses
+        :param datas: write data or expected read data, python integers for a register wider than 64 bits
+        :param masks: the bits of the read data compared, None to compare all of them
+        :param width: register width in bits
+    """
+    lanes = width // 64 if width > 64 else 0
+    shape = (lanes,) if lanes else ()
+    fields = [('op', np.uint8), ('addr', np.uint64), ('data', np.uint64, shape)]
+    if masks is not None:
+        fields.append(('mask', np.uint64, shape))
+    trace = np.zeros(len(ops), dtype=fields)
+    trace['op'] = ops
+    trace['addr'] = addrs
+    trace['data'] = toLanes(datas, lanes)
+    if masks is not None:
+        trace['mask'] = toLanes(masks, lanes)
+    return trace
+
+def loadModel(yml) -> CsrModel:
+    """ Parse a yml file and build its behavioral model """
+    parser = YmlParser(yml)
+    parser.openYml()
+    parser.elaborateAllReg()
+    return CsrModel(parser.model)
+
+def main(argv=None):
+    """
+    Return the exit status: 0 if all the reads of the trace match, 1 otherwise
+    """
+    parser = argparse.ArgumentParser(description='Simple CSR trace replay on the behavioral model.')
+    parser.add_argument('yml', type=str,
+                        help='yml file of the register block')
+    parser.add_argument('trace', type=str,
+                        help='trace file (.npy structured array with the op, addr, data and optional mask fields)')
+    parser.add_argument('-input', type=str, action='append', default=[],
+                        help='HW input port value, <port>=<value>, can be repeated (default: 0, FIFO ready: 1)')
+    parser.add_argument('-max-errors', type=int, default=10,
+                        help='Number of mismatches printed (default: 10)')
+    parser.add_argument('-record', type=str,
+                        help='Write the trace with the read data of the model to this .npy file')
+    args = parser.parse_args(argv)
+    if np == None:
+        print('ERROR: the trace replay needs numpy (pip install numpy)', file=sys.stderr)
+        return 1
+    try:
+        model = loadModel(args.yml)
+        for item in args.input:
+            if '=' not in item:
+                raise ValueError(f'-input {item}: expected <port>=<value>')
+            (port, value) = item.split('=', 1)
+            model.setInput(port, int(value, 0))
+        trace = np.load(args.trace, mmap_mode='r')
+        record = None
+        if args.record:
+            # the record is memory mapped as the trace, it starts as a copy of the trace
+            record = np.lib.format.open_memmap(args.record, mode='w+', dtype=trace.dtype, shape=trace.shape)
+            for first in range(0, len(trace), CHUNK):
+                record[first:first + CHUNK] = trace[first:first + CHUNK]
+        (count, errors) = replay(model, trace, args.max_errors, record)
+    except SpecError as e:
+        for error in e.errors:
+            print(f'ERROR: {args.yml}: {error}', file=sys.stderr)
+        return 1
+    except KeyError as e:
+        print(f'ERROR: {e.args[0]}', file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f'ERROR: {e}', file=sys.stderr)
+        return 1
+    if record is not None:
+        record.flush()
+    for (index, addr, expected, value) in errors:
+        print(f'MISMATCH: transaction {index}: read {hex(addr)}: expected {hex(expected)}, got {hex(value)}')
+    print(f'{len(trace)} transactions, {count} mismatch(es)')
+    return 1 if count else 0
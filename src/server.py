@@ -0,0 +1,111 @@
+#!/usr/bin/python
+#########################################################################################
+# Copyright 2020 by Heqing Huang (heqinghuangusc@gmail.com)
+#
+# Project: Simple CSR Generator
+# Author: Heqing Huang
+# Created: 10/18/2026
+#
+# Description:
+#   Generator server. It keeps python, PyYAML, the writers and the parsed models
+#   in memory and runs the generate requests of the client (client.py) received
+#   over a Unix socket, one JSON line per request:
+#       request:  {"argv": [...], "prog": "...", "cwd": "...", "env": {"SOURCE_DATE_EPOCH": ...}}
+#                 {"shutdown": true}
+#       response: {"status": 0, "stdout": "...", "stderr": "..."}
+#                 {"fallback": "<reason>"} if the client has to run the generator itself
+#   The requests are run one at a time, and the specs of a request are generated
+#   one at a time in the server process so all their models stay in the memory cache.
+#
+#########################################################################################
+
+import argparse
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+from contextlib import redirect_stdout, redirect_stderr
+
+my_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(my_path)
+
+import main
+from common import SOURCE_DATE_EPOCH
+from YmlParser import YmlParser
+from client import SOCKET
+
+class RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        """ Handle the requests of one connection """
+        for line in self.rfile:
+            try:
+                message = json.loads(line)
+            except ValueError as e:
+                self.reply({'status': 1, 'stdout': '', 'stderr': f'ERROR: bad request: {e}\n'})
+                continue
+            if message.get('shutdown'):
+                self.reply({'status': 0, 'stdout': '', 'stderr': ''})
+                # shutdown waits for serve_forever, which is running this handler
+                threading.Thread(target=self.server.shutdown).start()
+                return
+            self.reply(self.run(message))
+
+    def reply(self, response):
+        """ Send one response """
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+        self.wfile.flush()
+
+    def run(self, message) -> dict:
+        """ Run the generator for one request """
+        # The date is read when the modules are imported, so it can not change per request
+        if message.get('env', {}).get('SOURCE_DATE_EPOCH') != SOURCE_DATE_EPOCH:
+            return {'fallback': 'SOURCE_DATE_EPOCH is different from the server'}
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        cwd = os.getcwd()
+        prog = sys.argv[0]
+        try:
+            # argparse reports the errors with the name of the client
+            sys.argv[0] = message.get('prog', prog)
+            os.chdir(message.get('cwd', cwd))
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                # the specs parsed in the Pool workers would not be kept in the memory cache
+                status = main.main(message['argv'], workers=1)
+        except SystemExit as e:   # argparse error or -h
+            status = e.code if isinstance(e.code, int) else 1
+        except Exception as e:
+            stderr.write(f'ERROR: {type(e).__name__}: {e}\n')
+            status = 1
+        finally:
+            sys.argv[0] = prog
+            os.chdir(cwd)
+        return {'status': status, 'stdout': stdout.getvalue(), 'stderr': stderr.getvalue()}
+
+def serve(path=SOCKET):
+    """
+    Run the server until a shutdown request
+    Parameters:
+        :param path: the server socket
+    """
+    # keep the parsed models in memory between the requests
+    YmlParser.memoryCache = {}
+    if os.path.exists(path):
+        os.remove(path)
+    with socketserver.UnixStreamServer(path, RequestHandler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(path)
+
+def start():
+    parser = argparse.ArgumentParser(description='Simple CSR Generator server.')
+    parser.add_argument('-socket', type=str, default=SOCKET,
+                        help=f'Unix socket of the server (default: {SOCKET}, or SIMPLE_CSR_SOCKET)')
+    args = parser.parse_args()
+    serve(args.socket)
+
+if __name__ == '__main__':
+    start()